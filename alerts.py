@@ -0,0 +1,335 @@
+# alerts.py
+import asyncio
+import ipaddress
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+import numpy as np
+import requests
+
+# --- ALERT ENGINE ---
+# Rules live in SQLite and, for evaluation, in flat NumPy columns sorted by
+# symbol with an offsets table (CSR layout). A quote refresh only touches the
+# slices of the symbols that changed, and evaluates them in one vectorized pass.
+# Price rules are edge-triggered: a rule fires when its condition becomes true
+# and re-arms once it is false again, so a stock sitting above a level alerts once.
+
+KINDS = {"above": 0, "below": 1, "move": 2, "sentiment_positive": 3, "sentiment_negative": 4}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+ABOVE, BELOW, MOVE, SENT_POS, SENT_NEG = range(5)
+
+def validate_webhook(url):
+    """
+    Webhooks are POSTed from inside our network, so only http(s) URLs whose host
+    resolves to public addresses are accepted. Raises ValueError otherwise.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Webhook must be an http(s) URL")
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80),
+                                   proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise ValueError(f"Webhook host does not resolve: {e}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError("Webhook host must be a public address")
+    return url
+
+class AlertEngine:
+    def __init__(self, db_path="./alerts.db"):
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rules (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                threshold REAL NOT NULL DEFAULT 0,
+                webhook TEXT,                 -- NULL: WebSocket delivery only
+                created_at REAL NOT NULL,
+                active INTEGER NOT NULL DEFAULT 1
+            );
+            CREATE INDEX IF NOT EXISTS idx_rules_user ON rules (user, active);
+        """)
+        self.conn.commit()
+
+        # Master columns, one entry per rule ever loaded (inactive ones are masked)
+        self.symbol_codes = {}
+        self.rule_counts = Counter()  # symbol -> active rules (codes are never reused)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.codes = np.zeros(0, dtype=np.int32)
+        self.kinds = np.zeros(0, dtype=np.int8)
+        self.thresholds = np.zeros(0, dtype=np.float64)
+        self.armed = np.zeros(0, dtype=bool)
+        self.active = np.zeros(0, dtype=bool)
+        self.position = {}  # rule id -> row in the master columns
+        self.meta = {}      # rule id -> (user, symbol, webhook)
+        self._pending = []
+        self._order = np.zeros(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._dirty = False
+
+        # Delivery
+        self.subscribers = set()  # (asyncio.Queue, user or None)
+        self.loop = None
+        self._webhooks = queue.Queue(maxsize=10000)
+        self._webhook_thread = None
+        # Updated from request threads, ingest workers, the event loop and the webhook thread
+        self._stats_lock = threading.Lock()
+        self.stats = {"evaluations": 0, "rules_checked": 0, "fired": 0, "webhooks_sent": 0,
+                      "webhooks_failed": 0, "dropped": 0, "last_eval_ms": 0.0}
+
+        for row in self.conn.execute("SELECT id, user, symbol, kind, threshold, webhook FROM rules WHERE active = 1"):
+            self._stage(*row)
+
+    # --- RULES ---
+    def _code(self, symbol):
+        code = self.symbol_codes.get(symbol)
+        if code is None:
+            code = self.symbol_codes[symbol] = len(self.symbol_codes)
+        return code
+
+    def _stage(self, rule_id, user, symbol, kind, threshold, webhook):
+        self._pending.append((rule_id, self._code(symbol), KINDS[kind], threshold))
+        self.meta[rule_id] = (user, symbol, webhook)
+        self.rule_counts[symbol] += 1
+        self._dirty = True
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def add_rule(self, symbol, kind, threshold=0.0, user="default", webhook=None):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown alert kind: {kind}")
+        if webhook:
+            validate_webhook(webhook)
+        symbol = symbol.upper()
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO rules (user, symbol, kind, threshold, webhook, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (user, symbol, kind, float(threshold), webhook, time.time()))
+            self.conn.commit()
+            self._stage(cur.lastrowid, user, symbol, kind, float(threshold), webhook)
+        return cur.lastrowid
+
+    def add_rules(self, rules):
+        """Bulk insert: [(symbol, kind, threshold, user, webhook)]. Returns the new ids."""
+        ids = []
+        now = time.time()
+        for _, kind, _, _, webhook in rules:
+            if kind not in KINDS:
+                raise ValueError(f"Unknown alert kind: {kind}")
+            if webhook:
+                validate_webhook(webhook)
+        with self._lock:
+            for symbol, kind, threshold, user, webhook in rules:
+                cur = self.conn.execute(
+                    "INSERT INTO rules (user, symbol, kind, threshold, webhook, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (user, symbol.upper(), kind, float(threshold), webhook, now))
+                self._stage(cur.lastrowid, user, symbol.upper(), kind, float(threshold), webhook)
+                ids.append(cur.lastrowid)
+            self.conn.commit()
+        return ids
+
+    def remove_rule(self, rule_id, user=None):
+        """Deactivates a rule. Returns its symbol, or None if the user has no such rule."""
+        with self._lock:
+            if rule_id not in self.meta or (user and self.meta[rule_id][0] != user):
+                return None
+            self.conn.execute("UPDATE rules SET active = 0 WHERE id = ?", (rule_id,))
+            self.conn.commit()
+            self._rebuild_if_dirty()
+            self.active[self.position[rule_id]] = False
+            symbol = self.meta.pop(rule_id)[1]
+            self.rule_counts[symbol] -= 1
+            if not self.rule_counts[symbol]:
+                del self.rule_counts[symbol]
+        return symbol
+
+    def list_rules(self, user):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, symbol, kind, threshold, webhook, created_at FROM rules WHERE user = ? AND active = 1",
+                (user,)).fetchall()
+        return [{"id": r[0], "symbol": r[1], "kind": r[2], "threshold": r[3], "webhook": r[4], "created_at": r[5]}
+                for r in rows]
+
+    def symbols(self):
+        """Symbols with at least one active rule (what the ticker must keep refreshing)."""
+        with self._lock:
+            return list(self.rule_counts)
+
+    def _rebuild_if_dirty(self):
+        """Merges staged rules into the master columns and re-sorts the CSR index."""
+        if not self._dirty:
+            return
+        if self._pending:
+            ids, codes, kinds, thresholds = (np.array(c) for c in zip(*self._pending))
+            start = len(self.ids)
+            self.ids = np.concatenate([self.ids, ids.astype(np.int64)])
+            self.codes = np.concatenate([self.codes, codes.astype(np.int32)])
+            self.kinds = np.concatenate([self.kinds, kinds.astype(np.int8)])
+            self.thresholds = np.concatenate([self.thresholds, thresholds.astype(np.float64)])
+            self.armed = np.concatenate([self.armed, np.ones(len(ids), dtype=bool)])
+            self.active = np.concatenate([self.active, np.ones(len(ids), dtype=bool)])
+            for offset, rule_id in enumerate(ids.tolist()):
+                self.position[rule_id] = start + offset
+            self._pending = []
+        self._order = np.argsort(self.codes, kind="stable")
+        counts = np.bincount(self.codes, minlength=len(self.symbol_codes))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self._dirty = False
+
+    def _rows_for(self, symbols):
+        """Master-row indexes of every rule on the given symbols, plus which input each belongs to."""
+        codes = np.array([self.symbol_codes.get(sym, -1) for sym in symbols], dtype=np.int64)
+        inputs = np.flatnonzero((codes >= 0) & (codes + 1 < len(self._offsets)))
+        starts, ends = self._offsets[codes[inputs]], self._offsets[codes[inputs] + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return None, None
+        # Concatenated ranges [start, end) per symbol without a Python loop
+        owners = np.repeat(inputs, lengths)
+        within = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return self._order[np.repeat(starts, lengths) + within], owners
+
+    # --- EVALUATION ---
+    def evaluate(self, quotes):
+        """
+        quotes: {symbol: quote dict with price/percent_change} for the symbols that changed.
+        Returns the fired alert events (also delivered).
+        """
+        start = time.perf_counter()
+        with self._lock:
+            self._rebuild_if_dirty()
+            symbols = [s for s, q in quotes.items() if isinstance(q.get("price"), (int, float))]
+            rows, owners = self._rows_for(symbols)
+            if rows is None:
+                return []
+            prices = np.array([quotes[s]["price"] for s in symbols], dtype=np.float64)[owners]
+            moves = np.array([q if isinstance(q := quotes[s].get("percent_change"), (int, float)) else np.nan
+                              for s in symbols], dtype=np.float64)[owners]
+            kinds, thresholds = self.kinds[rows], self.thresholds[rows]
+            with np.errstate(invalid="ignore"):
+                cond = (((kinds == ABOVE) & (prices >= thresholds))
+                        | ((kinds == BELOW) & (prices <= thresholds))
+                        | ((kinds == MOVE) & (np.abs(moves) >= thresholds)))
+            price_rule = kinds <= MOVE
+            fire = cond & self.armed[rows] & self.active[rows]
+            # Re-arm once the condition clears; sentiment rules are never disarmed here
+            self.armed[rows[price_rule]] = ~cond[price_rule]
+            events = self._events(rows[fire], owners[fire], symbols, quotes)
+            elapsed = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            self.stats["evaluations"] += 1
+            self.stats["rules_checked"] += len(rows)
+            self.stats["last_eval_ms"] = round(elapsed, 3)
+        self.deliver(events)
+        return events
+
+    def on_article(self, doc_id, tickers, sectors, sentiment, ts, text=None):
+        """Entity-index listener: news-sentiment rules for the article's tickers."""
+        kind = {"positive": SENT_POS, "negative": SENT_NEG}.get(str(sentiment).lower())
+        if kind is None or not tickers:
+            return []
+        with self._lock:
+            self._rebuild_if_dirty()
+            rows, owners = self._rows_for(tickers)
+            if rows is None:
+                return []
+            fire = (self.kinds[rows] == kind) & self.active[rows]
+            events = self._events(rows[fire], owners[fire], tickers, {t: {"doc_id": doc_id, "sentiment": sentiment}
+                                                                     for t in tickers})
+        self.deliver(events)
+        return events
+
+    def _events(self, rows, owners, symbols, data):
+        now = time.time()
+        events = []
+        for rule_id, kind, threshold, owner in zip(self.ids[rows].tolist(), self.kinds[rows].tolist(),
+                                                   self.thresholds[rows].tolist(), owners.tolist()):
+            user, symbol, webhook = self.meta[rule_id]
+            event = {"type": "alert", "rule_id": rule_id, "user": user, "symbol": symbol,
+                     "kind": KIND_NAMES[kind], "threshold": threshold, "fired_at": now}
+            for key in ("price", "percent_change", "doc_id", "sentiment"):
+                if key in data[symbols[owner]]:
+                    event[key] = data[symbols[owner]][key]
+            if webhook:
+                event["_webhook"] = webhook
+            events.append(event)
+        return events
+
+    # --- DELIVERY ---
+    def deliver(self, events):
+        if not events:
+            return
+        self._count("fired", len(events))
+        for event in events:
+            webhook = event.pop("_webhook", None)
+            if webhook:
+                try:
+                    self._webhooks.put_nowait((webhook, event))
+                except queue.Full:
+                    self._count("dropped")
+            for q, user in list(self.subscribers):
+                if user is None or user == event["user"]:
+                    self._push(q, event)
+
+    def _push(self, q, event):
+        def put():
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                self._count("dropped")
+        # Sentiment alerts come from ingest worker threads, not the event loop
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(put)
+        else:
+            put()
+
+    def subscribe(self, user=None):
+        q = asyncio.Queue(maxsize=1000)
+        self.subscribers.add((q, user))
+        return q
+
+    def unsubscribe(self, q):
+        self.subscribers = {(sq, u) for sq, u in self.subscribers if sq is not q}
+
+    def _send_webhooks(self):
+        while True:
+            url, event = self._webhooks.get()
+            try:
+                # Checked again at send time: DNS may have changed since the rule was added
+                validate_webhook(url)
+                requests.post(url, json=event, timeout=5, allow_redirects=False)
+                self._count("webhooks_sent")
+            except Exception as e:
+                self._count("webhooks_failed")
+                print(f"Alert webhook to {url} failed: {e}")
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        if self._webhook_thread is None:
+            self._webhook_thread = threading.Thread(target=self._send_webhooks, name="alert-webhooks", daemon=True)
+            self._webhook_thread.start()
+
+    def status(self):
+        with self._lock:
+            rules, symbols = len(self.meta), len(self.rule_counts)
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"rules": rules, "symbols": symbols, "subscribers": len(self.subscribers),
+                "webhook_backlog": self._webhooks.qsize(), **stats}
+
+# Global instance
+alert_engine = AlertEngine()
@@ -0,0 +1,73 @@
+# benchmarks/bench_alerts.py
+"""
+Alert evaluation cost per quote refresh: N rules spread over a symbol
+universe, then refresh cycles where a fraction of the symbols move.
+
+    python benchmarks/bench_alerts.py --rules 100000 --symbols 2000 --changed 0.25
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+KINDS = ["above", "below", "move"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rules", type=int, default=100_000)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--changed", type=float, default=0.25, help="Fraction of symbols in each refresh's deltas")
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    symbols = [f"SYM{i}.NS" for i in range(args.symbols)]
+    prices = {sym: rng.uniform(100, 3000) for sym in symbols}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # The module-level engine opens ./alerts.db
+        from alerts import AlertEngine
+        engine = AlertEngine(os.path.join(tmp, "bench_alerts.db"))
+        start = time.perf_counter()
+        rules = []
+        for n in range(args.rules):
+            sym = rng.choice(symbols)
+            kind = rng.choice(KINDS)
+            # Levels a few percent away, as users set them; most refreshes fire nothing
+            if kind == "move":
+                threshold = rng.uniform(2, 8)
+            else:
+                threshold = prices[sym] * (1 + rng.uniform(0.02, 0.15) * (1 if kind == "above" else -1))
+            rules.append((sym, kind, threshold, f"user{n % 1000}", None))
+        engine.add_rules(rules)
+        engine.evaluate({})  # Builds the symbol index
+        load_s = time.perf_counter() - start
+
+        timings, fired = [], 0
+        for _ in range(args.cycles):
+            deltas = {}
+            for sym in rng.sample(symbols, int(len(symbols) * args.changed)):
+                pct = rng.gauss(0, 2)
+                deltas[sym] = {"symbol": sym, "price": prices[sym] * (1 + pct / 100), "percent_change": pct}
+            start = time.perf_counter()
+            fired += len(engine.evaluate(deltas))
+            timings.append((time.perf_counter() - start) * 1000)
+
+    timings.sort()
+    result = {"rules": args.rules, "symbols": args.symbols, "changed_per_refresh": int(args.symbols * args.changed),
+              "load_s": round(load_s, 2), "fired": fired,
+              "eval_ms_p50": round(timings[len(timings) // 2], 3),
+              "eval_ms_p95": round(timings[int(len(timings) * 0.95) - 1], 3),
+              "eval_ms_max": round(timings[-1], 3)}
+    print(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
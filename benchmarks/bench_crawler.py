@@ -0,0 +1,50 @@
+# benchmarks/bench_crawler.py
+"""
+Crawler throughput against the local fake news feed: topics from the stocks
+maps, URL/title dedup, per-source rate limit, batches into a scratch ingest queue.
+
+    python benchmarks/bench_crawler.py --cycles 3 --per-minute 600
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from crawler import NewsCrawler, FeedSource, SeenStore, crawl_topics
+from ingest_queue import IngestQueue
+from fake_news_feed import start_server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--per-minute", type=int, default=600, help="Rate limit for the feed source")
+    parser.add_argument("--per-call", type=int, default=8)
+    parser.add_argument("--repeat-ratio", type=float, default=0.3)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    server, url, feed = start_server(per_call=args.per_call, repeat_ratio=args.repeat_ratio,
+                                     latency_ms=args.latency_ms)
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = IngestQueue(os.path.join(tmp, "queue.db"))
+        crawler = NewsCrawler(sources=[FeedSource(url)], sink=queue.enqueue,
+                              seen=SeenStore(os.path.join(tmp, "seen.db")), per_minute=args.per_minute)
+        topics = crawl_topics()
+        rows = []
+        for cycle in range(args.cycles):
+            rows.append({"cycle": cycle + 1, **crawler.run_cycle(topics)})
+        queued = queue.stats()["depth"]
+    server.shutdown()
+
+    print(f"{len(topics)} topics, {feed.requests} feed requests, {queued} articles queued")
+    for row in rows:
+        print(row)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# benchmarks/bench_doc_extract.py
+"""
+Extraction-stage throughput of the batch document analyser: synthetic
+multi-page PDFs through processor.extract_document on 1..N worker processes
+(same spawn pool as doc_jobs), reported as docs/minute per process count.
+
+    python benchmarks/bench_doc_extract.py --docs 64 --pages 20 --processes 1,2,4,8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def synthetic_pdf(seed, pages):
+    """A small but valid text PDF (one Helvetica text block per page), written by hand."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        lines = " ".join(f"({f'Doc {seed} page {page} line {n}: revenue grew {n + seed}% on strong demand.'}) Tj 0 -14 Td"
+                         for n in range(40))
+        stream = f"BT /F1 10 Tf 40 800 Td {lines} ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out, offsets = ["%PDF-1.4\n"], []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(sum(len(part) for part in out))
+        out.append(f"{n} 0 obj\n{body}\nendobj\n")
+    xref_at = sum(len(part) for part in out)
+    out.append(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n")
+    out.extend(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out.append(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+    return "".join(out).encode("latin-1")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=64)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--processes", default=None, help="Comma-separated process counts (default 1,2,4..cores)")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    from processor import extract_document
+    cores = os.cpu_count() or 1
+    counts = [int(n) for n in args.processes.split(",")] if args.processes else \
+        sorted({1, *(2 ** i for i in range(1, cores.bit_length()) if 2 ** i <= cores), cores})
+    docs = [synthetic_pdf(seed, args.pages) for seed in range(args.docs)]
+
+    rows = []
+    for processes in counts:
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(extract_document, ["pdf"] * processes, docs[:processes]))  # Worker start-up and imports
+            start = time.perf_counter()
+            texts = list(pool.map(extract_document, ["pdf"] * len(docs), docs))
+            elapsed = time.perf_counter() - start
+        rows.append({"processes": processes, "seconds": round(elapsed, 2),
+                     "docs_per_minute": round(len(docs) / elapsed * 60, 1),
+                     "extracted": sum(1 for t in texts if t)})
+    base = rows[0]["docs_per_minute"]
+    for row in rows:
+        row["speedup"] = round(row["docs_per_minute"] / base, 2)
+        print(row)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"docs": args.docs, "pages": args.pages, "cores": cores, "runs": rows}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_embeddings.py
+"""
+Embedding throughput (sentences/sec) on CPU for each backend.
+
+Runs three patterns per backend:
+  batch       - one embed_documents call per chunk of --batch sentences
+  single      - one embed_query call per sentence (how the graph nodes call it)
+  concurrent  - --clients threads calling embed_query through the MicroBatcher
+
+    python benchmarks/bench_embeddings.py --backends torch,onnx,onnx-int8 --threads 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_backends import create_embeddings
+
+SUBJECTS = ["HDFC Bank", "Tata Motors", "Reliance", "Infosys", "Gold", "Crude oil", "SBI", "Zomato", "Adani Ports", "Nifty"]
+EVENTS = ["posts record quarterly profit", "shares slump after weak guidance", "announces buyback",
+          "hit by regulatory probe", "surges on strong demand", "expands into new markets",
+          "cuts prices amid slowdown", "beats analyst estimates", "faces supply disruption"]
+
+def synthetic_headlines(n, seed=0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(SUBJECTS)} {rng.choice(EVENTS)} as investors weigh {rng.choice(SUBJECTS)} outlook"
+            for _ in range(n)]
+
+def rate(n, seconds):
+    return round(n / seconds, 1)
+
+def bench_backend(name, texts, threads, batch, clients):
+    results = {"backend": name, "threads": threads}
+
+    model = create_embeddings(name, threads=threads, batch_wait_ms=0)
+    model.embed_documents(texts[:8])  # warm-up
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch):
+        model.embed_documents(texts[i:i + batch])
+    results["batch_sps"] = rate(len(texts), time.perf_counter() - start)
+
+    subset = texts[:min(len(texts), 200)]
+    start = time.perf_counter()
+    for t in subset:
+        model.embed_query(t)
+    results["single_sps"] = rate(len(subset), time.perf_counter() - start)
+
+    batched = create_embeddings(name, threads=threads, batch_wait_ms=5)
+    batched.embed_query("warm-up")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(batched.embed_query, texts))
+    results["concurrent_microbatched_sps"] = rate(len(texts), time.perf_counter() - start)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    texts = synthetic_headlines(args.sentences)
+    rows = []
+    for name in args.backends.split(","):
+        row = bench_backend(name, texts, args.threads, args.batch, args.clients)
+        print(row)
+        rows.append(row)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Saved results to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_packing.py
+"""
+LLM extraction throughput: one call per article vs packed multi-article calls,
+measured against the local fake Ollama server (no model needed).
+
+    python benchmarks/bench_packing.py --articles 64 --decode-ms-per-token 60
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain_ollama import ChatOllama
+from extraction import ENTITY_SCHEMA, PACKED_SCHEMA, llm_extract, llm_extract_packed, extraction_report
+from fake_ollama import start_server
+
+HEADLINES = [
+    "{c} shares jump after quarterly numbers beat estimates",
+    "{c} faces probe over disclosure lapses",
+    "{c} to raise funds via rights issue",
+    "Analysts upgrade {c} on margin recovery",
+    "{c} slips as input costs rise",
+]
+COMPANIES = ["Zomato", "Swiggy", "Paytm", "Nykaa", "Delhivery", "Ola Electric", "Tata Power", "Adani Green"]
+
+def synthetic_articles(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(HEADLINES).format(c=rng.choice(COMPANIES)) for _ in range(n)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=64)
+    parser.add_argument("--overhead-ms", type=float, default=150)
+    parser.add_argument("--prompt-ms-per-token", type=float, default=2.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=60.0)
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    server, url, fake = start_server(overhead_ms=args.overhead_ms,
+                                     prompt_ms_per_token=args.prompt_ms_per_token,
+                                     decode_ms_per_token=args.decode_ms_per_token)
+    llm = ChatOllama(model="llama3.2", temperature=0, format=ENTITY_SCHEMA, base_url=url)
+    packed_llm = ChatOllama(model="llama3.2", temperature=0, format=PACKED_SCHEMA, base_url=url)
+    texts = synthetic_articles(args.articles)
+
+    rows = []
+    start, before = time.perf_counter(), fake.requests
+    single = [llm_extract(llm, t) for t in texts]
+    elapsed = time.perf_counter() - start
+    rows.append({"mode": "one_call_per_article", "articles": len(texts), "llm_requests": fake.requests - before,
+                 "seconds": round(elapsed, 2), "articles_per_sec": round(len(texts) / elapsed, 2),
+                 "parsed": sum(r is not None for r in single)})
+
+    start, before = time.perf_counter(), fake.requests
+    packed = llm_extract_packed(llm, packed_llm, texts)
+    elapsed = time.perf_counter() - start
+    rows.append({"mode": "packed", "articles": len(texts), "llm_requests": fake.requests - before,
+                 "seconds": round(elapsed, 2), "articles_per_sec": round(len(texts) / elapsed, 2),
+                 "parsed": sum(r is not None for r in packed)})
+    server.shutdown()
+
+    rows[1]["speedup"] = round(rows[0]["seconds"] / rows[1]["seconds"], 2)
+    for row in rows:
+        print(row)
+    print("Extraction stats:", extraction_report())
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# benchmarks/bench_suite.py
+"""
+Offline benchmark suite. Yahoo, Google News, plain HTTP, Ollama and the
+embedding model are served by benchmarks/replay.py (from a cassette, else
+synthetic) with injected latency, so runs are repeatable without network
+access, a model server or model downloads.
+
+    python benchmarks/bench_suite.py --out bench_results.json
+    python benchmarks/bench_suite.py --cassette benchmarks/cassettes/live.json --record
+    python benchmarks/bench_suite.py --latency yfinance=150,googlenews=600,requests=100,ollama=800,embeddings=20 \
+        --baseline bench_results.json
+
+Scenarios: resolve_query, live_data_grid, search_topic_news, ingest_pipeline,
+ingest_pipeline_sequential, search_endpoint and compare_stocks_endpoint. Each reports wall-clock stats,
+upstream calls per iteration and the mean time per tracing span.
+State that would turn later iterations into cache hits is cleared first; the
+ingest scenarios draw new articles from FakeNewsFeed every run, so dedup
+never short-circuits the pipeline.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import Cassette, install, parse_latency, BOUNDARIES
+from fake_news_feed import FakeNewsFeed
+
+DEFAULT_LATENCY = "yfinance=120,googlenews=400,requests=80,ollama=600,embeddings=15"
+
+QUERIES = ["Dominos", "Banks", "Tata", "Zomato", "Commodity", "Infosys"]
+ARTICLES_PER_RUN = 5
+
+def timed(fn, iterations, warmup, cassette, prepare=None):
+    from telemetry import SPAN_HISTOGRAMS
+    for _ in range(warmup):
+        if prepare: prepare()
+        fn()
+    SPAN_HISTOGRAMS.clear()
+    cassette.reset_counts()
+    samples = []
+    for _ in range(iterations):
+        if prepare: prepare()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "min_s": round(samples[0], 4),
+        "median_s": round(statistics.median(samples), 4),
+        "p95_s": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 4),
+        "mean_s": round(statistics.fmean(samples), 4),
+        "upstream_calls_per_iter": {b: round(cassette.calls[b] / iterations, 2) for b in BOUNDARIES if cassette.calls[b]},
+        "spans_mean_ms": {name: round(h.total / h.count * 1000, 2)
+                          for name, h in sorted(SPAN_HISTOGRAMS.items()) if h.count},
+    }
+
+def build_scenarios():
+    # Imported after chdir/install so stores land in the scratch dir and clients are patched
+    import stocks
+    import processor
+    from stocks import resolve_query, get_live_data, SECTOR_MAP
+    from processor import search_topic_news
+    from graph import app as pipeline_app, build_workflow
+    from query_cache import query_cache
+    from fastapi.testclient import TestClient
+    import main
+
+    # No `with`: background services (ticker, crawler, workers) stay off
+    client = TestClient(main.app)
+
+    def cold_quotes():
+        with stocks._quote_cache_lock:
+            stocks.QUOTE_CACHE.clear()
+            stocks.LAST_QUOTES.clear()
+
+    def cold_news():
+        with processor._news_cache_lock:
+            processor.NEWS_CACHE.clear()
+
+    def cold_all():
+        cold_quotes()
+        cold_news()
+        query_cache.invalidate(None)
+
+    def ingest(workflow, seed):
+        # Distinct articles every run: the dedup node must let each one through
+        feed = FakeNewsFeed(seed=seed)
+
+        def run():
+            for _ in range(ARTICLES_PER_RUN):
+                workflow.invoke({"article_text": feed.article()})
+        return run
+
+    def search():
+        response = client.post("/search", json={"query": "bank profit results", "k": 5})
+        response.raise_for_status()
+
+    def compare():
+        response = client.post("/compare_stocks", json={"stock1": "TCS.NS", "stock2": "INFY.NS"})
+        response.raise_for_status()
+
+    return {
+        "resolve_query": (lambda: [resolve_query(q) for q in QUERIES], None),
+        "live_data_grid": (lambda: [get_live_data(s) for s in SECTOR_MAP["IT"]], cold_quotes),
+        "search_topic_news": (lambda: search_topic_news(["Banking Sector News", "TATA Group News", "Zomato"]), cold_news),
+        "ingest_pipeline": (ingest(pipeline_app, seed=1), None),
+        # Same nodes chained one after another. Both graphs embed once per article,
+        # so this isolates the branch overlap (small next to the LLM call)
+        "ingest_pipeline_sequential": (ingest(build_workflow(parallel=False), seed=2), None),
+        "search_endpoint": (search, cold_all),
+        "compare_stocks_endpoint": (compare, cold_all),
+    }
+
+def per_article(results):
+    """Per-article latency for the ingest scenarios, and the parallel graph's saving over the chain."""
+    for name in ("ingest_pipeline", "ingest_pipeline_sequential"):
+        if name in results:
+            results[name]["per_article_ms"] = round(results[name]["median_s"] / ARTICLES_PER_RUN * 1000, 1)
+    if "ingest_pipeline" in results and "ingest_pipeline_sequential" in results:
+        parallel = results["ingest_pipeline"]["per_article_ms"]
+        sequential = results["ingest_pipeline_sequential"]["per_article_ms"]
+        results["ingest_pipeline"]["per_article_reduction_pct"] = (
+            round((1 - parallel / sequential) * 100, 1) if sequential else None)
+
+def compare_to_baseline(results, path):
+    with open(path) as f:
+        baseline = json.load(f)["scenarios"]
+    for name, row in results.items():
+        old = baseline.get(name)
+        if old and old.get("median_s"):
+            row["median_vs_baseline"] = round(row["median_s"] / old["median_s"], 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--scenarios", default=None, help="Comma-separated subset")
+    parser.add_argument("--latency", default=DEFAULT_LATENCY, help="Injected delay per boundary in ms")
+    parser.add_argument("--cassette", default=None, help="Cassette JSON to replay (or write with --record)")
+    parser.add_argument("--record", action="store_true", help="Call the real services and save a cassette")
+    parser.add_argument("--strict", action="store_true", help="Fail on calls missing from the cassette")
+    parser.add_argument("--baseline", default=None, help="Earlier --out file to compare medians against")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    cassette = Cassette(args.cassette and os.path.abspath(args.cassette),
+                        mode="record" if args.record else "replay",
+                        latency_ms=parse_latency(args.latency), strict=args.strict)
+    uninstall = install(cassette)
+    out = args.out and os.path.abspath(args.out)
+    baseline = args.baseline and os.path.abspath(args.baseline)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)  # chroma_db, history_db and the SQLite side stores
+        scenarios = build_scenarios()
+        wanted = args.scenarios.split(",") if args.scenarios else list(scenarios)
+        for name in wanted:
+            fn, prepare = scenarios[name]
+            print(f"Running {name}...")
+            results[name] = timed(fn, args.iterations, args.warmup, cassette, prepare)
+            print(f"  {results[name]}")
+        os.chdir(REPO)
+    uninstall()
+
+    if args.record and args.cassette:
+        cassette.save()
+    per_article(results)
+    if baseline:
+        compare_to_baseline(results, baseline)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": cassette.mode,
+        "latency_ms": parse_latency(args.latency),
+        "synthesized_calls": dict(cassette.synthesized),
+        "scenarios": results,
+    }
+    print(json.dumps(report, indent=2))
+    if out:
+        with open(out, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# benchmarks/bench_vector_index.py
+"""
+Vector index benchmark on synthetic embeddings.
+
+Compares Chroma HNSW (float32) against the quantized int8 / float16 scan with
+exact re-rank, brute force and with the IVF partition, reporting recall@k,
+p50/p99 query latency and disk size. The quantized disk size is on top of
+Chroma's, since re-rank reads Chroma's float32 vectors.
+
+    python benchmarks/bench_vector_index.py --sizes 100000,1000000 --out vector_bench.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quantized_store import QuantizedStore, exact_rerank
+
+DIM = 384  # all-MiniLM-L6-v2
+
+def synthetic_embeddings(n, dim=DIM, clusters=200, seed=0):
+    """Clustered unit vectors, closer to real news embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    x = centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def exact_topk(data, queries, k):
+    truth = []
+    data_sq = (data * data).sum(axis=1)
+    for q in queries:
+        dist = data_sq - 2 * data @ q
+        top = np.argpartition(dist, k)[:k]
+        truth.append(set(top[np.argsort(dist[top])].tolist()))
+    return truth
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+def summarize(name, latencies, found, truth, k, disk):
+    recall = np.mean([len(f & t) / k for f, t in zip(found, truth)])
+    lat = np.array(latencies) * 1000
+    return {
+        "index": name,
+        f"recall@{k}": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+        "disk_mb": round(disk / 1e6, 1)
+    }
+
+def bench_chroma(data, queries, truth, k, m, ef_construction, ef_search, workdir):
+    import chromadb
+    path = os.path.join(workdir, "chroma")
+    client = chromadb.PersistentClient(path=path)
+    col = client.create_collection("bench", metadata={
+        "hnsw:space": "l2", "hnsw:M": m,
+        "hnsw:construction_ef": ef_construction, "hnsw:search_ef": ef_search
+    })
+    batch = 5000
+    for start in range(0, len(data), batch):
+        chunk = data[start:start + batch]
+        col.add(ids=[str(i) for i in range(start, start + len(chunk))], embeddings=chunk.tolist())
+    latencies, found = [], []
+    for q in queries:
+        t = time.perf_counter()
+        res = col.query(query_embeddings=[q.tolist()], n_results=k)
+        latencies.append(time.perf_counter() - t)
+        found.append({int(i) for i in res["ids"][0]})
+    return summarize(f"chroma_hnsw_f32(M={m},efc={ef_construction},efs={ef_search})",
+                     latencies, found, truth, k, dir_size(path))
+
+def bench_quantized(mode, data, queries, truth, k, rerank_factor, workdir, nprobe=None):
+    store = QuantizedStore(os.path.join(workdir, f"q_{mode}_{nprobe}"), dim=data.shape[1], mode=mode)
+    batch = 50000
+    for start in range(0, len(data), batch):
+        store.add(list(range(start, min(start + batch, len(data)))), data[start:start + batch])
+    name = f"quantized_{mode}+rerank(x{rerank_factor})"
+    if nprobe:
+        t = time.perf_counter()
+        nlist = store.train()
+        print(f"  IVF train ({nlist} lists): {time.perf_counter() - t:.1f}s")
+        name = f"quantized_{mode}_ivf(nlist={nlist},nprobe={nprobe})+rerank(x{rerank_factor})"
+    latencies, found = [], []
+    for q in queries:
+        t = time.perf_counter()
+        cands = store.search(q, k=k * rerank_factor, nprobe=nprobe or 0)
+        # Full-precision vectors stand in for the Chroma fetch in VectorDB
+        ranked = exact_rerank(q, [(i, data[i]) for i, _ in cands], k)
+        latencies.append(time.perf_counter() - t)
+        found.append({i for i, _ in ranked})
+    return summarize(name, latencies, found, truth, k, store.disk_size())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--ef-search", type=int, default=50)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    parser.add_argument("--nprobe", type=int, default=32, help="IVF lists probed per query (0 skips the IVF runs)")
+    parser.add_argument("--skip-chroma", action="store_true")
+    parser.add_argument("--out", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        print(f"\n=== {n:,} articles ===")
+        data = synthetic_embeddings(n)
+        rng = np.random.default_rng(1)
+        # Queries are perturbed copies of stored articles (near-duplicate lookups)
+        queries = data[rng.integers(0, n, args.queries)] + 0.05 * rng.normal(size=(args.queries, DIM)).astype(np.float32)
+        truth = exact_topk(data, queries, args.k)
+
+        workdir = tempfile.mkdtemp(prefix="vecbench_")
+        try:
+            rows = []
+            if not args.skip_chroma:
+                rows.append(bench_chroma(data, queries, truth, args.k, args.m,
+                                         args.ef_construction, args.ef_search, workdir))
+            for mode in ("int8", "float16"):
+                rows.append(bench_quantized(mode, data, queries, truth, args.k, args.rerank_factor, workdir))
+                if args.nprobe:
+                    rows.append(bench_quantized(mode, data, queries, truth, args.k, args.rerank_factor, workdir,
+                                                nprobe=args.nprobe))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        for row in rows:
+            row["articles"] = n
+            print(row)
+        results.extend(rows)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.out}")
+
+if __name__ == "__main__":
+    main()
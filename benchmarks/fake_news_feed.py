@@ -0,0 +1,147 @@
+# benchmarks/fake_news_feed.py
+"""
+Local news feed for exercising crawler.NewsCrawler without Google News.
+
+GET /search?q=topic returns GoogleNews-shaped items ({title, desc, media, link, date}).
+Every call mixes fresh headlines with repeats of earlier ones (same link, or the
+same title under a different link) so URL/title dedup has something to do.
+
+    python benchmarks/fake_news_feed.py --port 11600
+    NEWS_FEED_URL=http://127.0.0.1:11600 uvicorn main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+HEADLINES = [
+    "{t} shares jump after quarterly numbers beat estimates",
+    "{t} faces probe over disclosure lapses",
+    "{t} to raise funds via rights issue",
+    "Analysts upgrade {t} on margin recovery",
+    "{t} slips as input costs rise",
+    "{t} announces expansion plans in southern India",
+]
+MEDIA = ["Economic Times", "Mint", "Business Standard", "Moneycontrol"]
+
+# Full article bodies for the ingest benchmarks: every slot is drawn at random,
+# so two articles share little wording and neither trips the dedup threshold
+COMPANIES = ["HDFC Bank", "ICICI Bank", "Axis Bank", "Tata Motors", "Maruti Suzuki", "Infosys", "Wipro",
+             "Zomato", "Swiggy", "Tata Steel", "Hindalco", "Reliance Industries", "ITC", "Titan", "Adani Ports"]
+DETAILS = [
+    "Revenue came in at Rs {a:,} crore against {b:,} crore a year earlier.",
+    "The board approved a {p}% stake purchase in {partner} for Rs {a:,} crore.",
+    "Management guided for {p}% volume growth in {region} over the {period}.",
+    "Brokerage {broker} set a target of Rs {b:,}, citing {theme}.",
+    "{partner} will supply {product} to {region} plants from {month}.",
+    "Net debt fell to Rs {b:,} crore while capex was trimmed by {p}%.",
+    "Shares traded {p}% {direction} by {hour} pm with {vol:,} lakh shares changing hands.",
+    "Executives flagged {theme} as the main risk for {period}.",
+]
+SLOTS = {
+    "partner": ["Siemens", "Foxconn", "Hitachi", "Bosch", "Accenture", "Amazon", "Walmart", "Toyota", "Samsung"],
+    "region": ["Gujarat", "Tamil Nadu", "Maharashtra", "Karnataka", "Odisha", "Telangana", "Punjab", "Assam"],
+    "period": ["next fiscal", "second half", "coming quarters", "monsoon season", "festive season"],
+    "broker": ["Jefferies", "Nomura", "Kotak Institutional", "Motilal Oswal", "CLSA", "Macquarie"],
+    "theme": ["rural demand", "freight costs", "rupee volatility", "deposit pricing", "chip shortages",
+              "export tariffs", "ore prices", "attrition", "monsoon deficit", "regulatory scrutiny"],
+    "product": ["lithium cells", "steel coils", "semiconductors", "packaging", "cloud services", "turbines"],
+    "month": ["January", "March", "June", "August", "October", "December"],
+    "direction": ["higher", "lower"],
+}
+
+class FakeNewsFeed:
+    def __init__(self, per_call=8, repeat_ratio=0.3, latency_ms=50, seed=0):
+        self.per_call = per_call
+        self.repeat_ratio = repeat_ratio
+        self.latency = latency_ms / 1000
+        self.rng = random.Random(seed)
+        self.published = []
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def items(self, topic):
+        with self._lock:
+            self.requests += 1
+            out = []
+            for _ in range(self.per_call):
+                if self.published and self.rng.random() < self.repeat_ratio:
+                    old = dict(self.rng.choice(self.published))
+                    if self.rng.random() < 0.5:
+                        old["link"] += "?utm_source=feed"  # Same story, tracking params
+                    else:
+                        old["link"] = f"https://news.example/syndicated/{len(self.published)}-{self.rng.random():.6f}"
+                    out.append(old)
+                    continue
+                n = len(self.published)
+                item = {
+                    "title": f"{self.rng.choice(HEADLINES).format(t=topic.title())} ({n})",
+                    "desc": f"Story {n} about {topic}.",
+                    "media": self.rng.choice(MEDIA),
+                    "link": f"https://news.example/{topic.lower().replace(' ', '-')}/{n}",
+                    "date": f"{self.rng.randint(1, 59)} mins ago",
+                }
+                self.published.append(item)
+                out.append(item)
+        time.sleep(self.latency)
+        return out
+
+    def article(self):
+        """A fresh full-length article: headline plus four randomly filled detail sentences."""
+        with self._lock:
+            company = self.rng.choice(COMPANIES)
+            fill = {name: self.rng.choice(values) for name, values in SLOTS.items()}
+            fill.update(a=self.rng.randint(500, 90_000), b=self.rng.randint(500, 90_000),
+                        p=round(self.rng.uniform(0.5, 25), 1), vol=self.rng.randint(2, 900),
+                        hour=self.rng.randint(1, 3))
+            headline = self.rng.choice(HEADLINES).format(t=company)
+            details = self.rng.sample(DETAILS, 4)
+        return " ".join([headline + "."] + [d.format(**fill) for d in details])
+
+    def handler(self):
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != "/search":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                topic = parse_qs(url.query).get("q", [""])[0]
+                body = json.dumps(feed.items(topic)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+def start_server(port=0, **options):
+    """Starts the feed in a background thread. Returns (server, base_url, feed)."""
+    feed = FakeNewsFeed(**options)
+    server = ThreadingHTTPServer(("127.0.0.1", port), feed.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", feed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11600)
+    parser.add_argument("--per-call", type=int, default=8)
+    parser.add_argument("--repeat-ratio", type=float, default=0.3)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    server, url, _ = start_server(args.port, per_call=args.per_call,
+                                  repeat_ratio=args.repeat_ratio, latency_ms=args.latency_ms)
+    print(f"Fake news feed listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
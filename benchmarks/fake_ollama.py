@@ -0,0 +1,114 @@
+# benchmarks/fake_ollama.py
+"""
+Local stand-in for the Ollama /api/chat endpoint with CPU-like latency.
+
+Latency = fixed per-request overhead + prompt tokens * prompt cost + output tokens * decode cost,
+and requests are served one at a time like a single CPU-bound model.
+Answers are built from extraction.dictionary_extract so they have a realistic shape.
+
+    python benchmarks/fake_ollama.py --port 11500
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from extraction import dictionary_extract
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+def fake_answer(prompt):
+    """Packed prompts get an indexed answer, everything else a single entity object."""
+    items = re.findall(r"^\s*\[(\d+)\] (.+)$", prompt, re.MULTILINE)
+    if items:
+        articles = []
+        for index, text in items:
+            entities, _ = dictionary_extract(text)
+            articles.append({"index": int(index), **entities})
+        return json.dumps({"articles": articles})
+    news = prompt.rsplit("News:", 1)[-1]
+    entities, _ = dictionary_extract(news)
+    return json.dumps(entities)
+
+class FakeOllama:
+    def __init__(self, overhead_ms=150, prompt_ms_per_token=2.0, decode_ms_per_token=60.0):
+        self.overhead = overhead_ms / 1000
+        self.prompt_cost = prompt_ms_per_token / 1000
+        self.decode_cost = decode_ms_per_token / 1000
+        self.model_lock = threading.Lock()  # One generation at a time
+        self.requests = 0
+
+    def handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                # Ollama's health / version probes
+                body = json.dumps({"version": "0.0.0-fake"}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "\n".join(m.get("content", "") for m in request.get("messages", []))
+                answer = fake_answer(prompt)
+                prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(answer)
+
+                with fake.model_lock:
+                    fake.requests += 1
+                    time.sleep(fake.overhead + prompt_tokens * fake.prompt_cost + output_tokens * fake.decode_cost)
+
+                base = {"model": request.get("model", "llama3.2"),
+                        "created_at": datetime.now(timezone.utc).isoformat()}
+                final = {**base, "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop",
+                         "prompt_eval_count": prompt_tokens, "eval_count": output_tokens}
+                self.send_response(200)
+                if request.get("stream", True):
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.end_headers()
+                    chunk = {**base, "message": {"role": "assistant", "content": answer}, "done": False}
+                    self.wfile.write((json.dumps(chunk) + "\n").encode())
+                    self.wfile.write((json.dumps(final) + "\n").encode())
+                else:
+                    self.send_header("Content-Type", "application/json")
+                    self.end_headers()
+                    final["message"]["content"] = answer
+                    self.wfile.write(json.dumps(final).encode())
+
+        return Handler
+
+def start_server(port=0, **latency):
+    """Starts the fake server in a background thread. Returns (server, base_url, fake)."""
+    fake = FakeOllama(**latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), fake.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", fake
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--overhead-ms", type=float, default=150)
+    parser.add_argument("--prompt-ms-per-token", type=float, default=2.0)
+    parser.add_argument("--decode-ms-per-token", type=float, default=60.0)
+    args = parser.parse_args()
+    server, url, _ = start_server(args.port, overhead_ms=args.overhead_ms,
+                                  prompt_ms_per_token=args.prompt_ms_per_token,
+                                  decode_ms_per_token=args.decode_ms_per_token)
+    print(f"Fake Ollama listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
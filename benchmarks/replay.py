@@ -0,0 +1,334 @@
+# benchmarks/replay.py
+"""
+Record/replay layer for the app's upstream boundaries:
+yfinance.Ticker, GoogleNews, requests.get and ChatOllama.invoke, plus the
+local embedding model (embedding_backends.create_embeddings) so runs don't
+depend on model downloads or the machine's CPU.
+
+    cassette = Cassette("benchmarks/cassettes/live.json", mode="record")
+    uninstall = install(cassette)      # real calls, responses saved
+    ...
+    cassette.save(); uninstall()
+
+In replay mode every call is answered from the cassette after an injected
+delay (latency_ms per boundary). Keys missing from the cassette get a
+deterministic synthetic answer, so the suite also runs with no cassette at all;
+strict=True turns those misses into errors instead.
+
+install() must run before `database` is imported: the vector store builds its
+embedding model at import time.
+"""
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_ollama import fake_answer
+from fake_news_feed import FakeNewsFeed
+
+BOUNDARIES = ("yfinance", "googlenews", "requests", "ollama", "embeddings")
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
+FAST_INFO_KEYS = ("last_price", "previous_close", "day_high", "day_low")
+INFO_KEYS = ("shortName", "longName", "trailingPE", "marketCap", "sector", "currency")
+
+def parse_latency(spec):
+    """'yfinance=150,ollama=800' -> {'yfinance': 150.0, 'ollama': 800.0}"""
+    latency = {}
+    for part in filter(None, (spec or "").split(",")):
+        name, value = part.split("=")
+        if name not in BOUNDARIES:
+            raise ValueError(f"Unknown boundary: {name}")
+        latency[name] = float(value)
+    return latency
+
+class Cassette:
+    def __init__(self, path=None, mode="replay", latency_ms=None, strict=False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = {b: (latency_ms or {}).get(b, 0) / 1000 for b in BOUNDARIES}
+        self.strict = strict
+        self.data = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+        self.calls = Counter()
+        self.synthesized = Counter()
+        self._lock = threading.Lock()
+        self._news = FakeNewsFeed(latency_ms=0)
+
+    def fetch(self, boundary, key, live, synth):
+        """One boundary call: recorded, replayed or synthesized. Values are JSON-able."""
+        full_key = f"{boundary}:{key}"
+        with self._lock:
+            self.calls[boundary] += 1
+        if self.mode == "record":
+            value = live()
+            with self._lock:
+                self.data[full_key] = value
+            return value
+        with self._lock:
+            value = self.data.get(full_key)
+        if value is None:
+            if self.strict:
+                raise KeyError(f"Not in cassette: {full_key}")
+            value = synth()
+            with self._lock:
+                self.synthesized[boundary] += 1
+        if self.latency[boundary]:
+            time.sleep(self.latency[boundary])
+        return value
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.data, f, indent=1, sort_keys=True, default=str)
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+
+# --- SYNTHETIC ANSWERS ---
+def _rng(*parts):
+    return random.Random(zlib.crc32("|".join(map(str, parts)).encode()))
+
+def synth_fast_info(symbol):
+    rng = _rng("quote", symbol)
+    prev = round(rng.uniform(100, 3000), 2)
+    last = round(prev * (1 + rng.uniform(-0.03, 0.03)), 2)
+    return {"last_price": last, "previous_close": prev,
+            "day_high": round(max(prev, last) * 1.01, 2), "day_low": round(min(prev, last) * 0.99, 2)}
+
+def synth_info(symbol):
+    rng = _rng("info", symbol)
+    name = symbol.split(".")[0].title()
+    return {"shortName": name, "longName": f"{name} Limited", "trailingPE": round(rng.uniform(8, 80), 2),
+            "marketCap": int(rng.uniform(1e10, 2e13)), "sector": rng.choice(["Technology", "Financial Services", "Energy"]),
+            "currency": "INR"}
+
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 30, "3mo": 90, "6mo": 180, "1y": 365, "2y": 730, "5y": 1825, "max": 3650}
+
+def synth_history(symbol, kwargs):
+    interval = kwargs.get("interval", "1d")
+    end = pd.Timestamp.now(tz="UTC").normalize()
+    if kwargs.get("start"):
+        start = pd.Timestamp(kwargs["start"])
+        start = start.tz_localize("UTC") if start.tzinfo is None else start.tz_convert("UTC")
+    else:
+        start = end - timedelta(days=PERIOD_DAYS.get(kwargs.get("period", "1mo"), 30))
+    freq = "B" if interval in ("1d", "1wk", "1mo") else "h"
+    index = pd.date_range(start.normalize(), end, freq=freq, tz="UTC")
+    if not len(index):
+        index = pd.DatetimeIndex([end])
+    rng = _rng("history", symbol, interval)
+    price, rows = rng.uniform(100, 3000), []
+    for _ in index:
+        open_ = price
+        price *= 1 + rng.gauss(0, 0.015)
+        rows.append({"Open": open_, "High": max(open_, price) * 1.005, "Low": min(open_, price) * 0.995,
+                     "Close": price, "Volume": rng.randint(10_000, 5_000_000)})
+    return pd.DataFrame(rows, index=index)
+
+def synth_http(url):
+    if "finance/search" in url:
+        query = url.split("q=", 1)[-1].split("&", 1)[0].upper()
+        symbol = query if "." in query or query.startswith("^") else f"{query}.NS"
+        return {"status_code": 200, "text": json.dumps({"quotes": [{"symbol": symbol}]})}
+    paragraphs = "".join(f"<p>Paragraph {i} of a synthetic financial article about {url}.</p>" for i in range(20))
+    return {"status_code": 200, "text": f"<html><body><article>{paragraphs}</article></body></html>"}
+
+def synth_embedding(text):
+    """
+    Unit vector seeded by the text: a repeat gets the same vector, anything else is
+    near-orthogonal (squared L2 ~ 2), so only exact repeats trip the dedup threshold.
+    Record a cassette to replay the real model's vectors instead.
+    """
+    rng = np.random.default_rng(zlib.crc32(text.encode()))
+    v = rng.standard_normal(EMBEDDING_DIM)
+    return (v / np.linalg.norm(v)).tolist()
+
+# --- BOUNDARY STAND-INS ---
+def _frame_to_json(df):
+    return df.to_json(orient="split", date_format="iso")
+
+def _frame_from_json(text):
+    df = pd.read_json(io.StringIO(text), orient="split")
+    df.index = pd.DatetimeIndex(df.index)
+    return df
+
+def _kwargs_key(kwargs):
+    return json.dumps({k: (v.isoformat() if isinstance(v, datetime) else v) for k, v in sorted(kwargs.items())},
+                      default=str)
+
+def make_ticker(cassette, real_ticker):
+    class ReplayTicker:
+        def __init__(self, symbol, *args, **kwargs):
+            self.ticker = symbol
+            self._args = (args, kwargs)
+            self._real = None
+            self._fast_info = None
+            self._info = None
+
+        def _live(self):
+            if self._real is None:
+                self._real = real_ticker(self.ticker, *self._args[0], **self._args[1])
+            return self._real
+
+        # Fetched once per Ticker like the real thing, however many keys are read
+        @property
+        def fast_info(self):
+            if self._fast_info is None:
+                self._fast_info = cassette.fetch(
+                    "yfinance", f"{self.ticker}:fast_info",
+                    lambda: {k: self._live().fast_info.get(k) for k in FAST_INFO_KEYS},
+                    lambda: synth_fast_info(self.ticker))
+            return self._fast_info
+
+        @property
+        def info(self):
+            if self._info is None:
+                self._info = cassette.fetch(
+                    "yfinance", f"{self.ticker}:info",
+                    lambda: {k: self._live().info.get(k) for k in INFO_KEYS},
+                    lambda: synth_info(self.ticker))
+            return self._info
+
+        def history(self, **kwargs):
+            text = cassette.fetch(
+                "yfinance", f"{self.ticker}:history:{_kwargs_key(kwargs)}",
+                lambda: _frame_to_json(self._live().history(**kwargs)),
+                lambda: _frame_to_json(synth_history(self.ticker, kwargs)))
+            return _frame_from_json(text)
+
+    return ReplayTicker
+
+def make_googlenews(cassette, real_class):
+    class ReplayGoogleNews:
+        def __init__(self, lang="en", region="IN", **kwargs):
+            self.lang, self.region, self.kwargs = lang, region, kwargs
+            self.topic = None
+
+        def search(self, topic):
+            self.topic = topic
+
+        def _live(self):
+            live = real_class(lang=self.lang, region=self.region, **self.kwargs)
+            live.search(self.topic)
+            items = live.result()
+            live.clear()
+            return [{k: (v if isinstance(v, (str, int, float)) or v is None else str(v)) for k, v in item.items()}
+                    for item in items]
+
+        def result(self):
+            return cassette.fetch("googlenews", f"{self.lang}:{self.region}:{self.topic}", self._live,
+                                  lambda: cassette._news.items(self.topic))
+
+        def clear(self):
+            pass
+
+    return ReplayGoogleNews
+
+class ReplayResponse:
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode()
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+def make_requests_get(cassette, real_get):
+    def replay_get(url, params=None, **kwargs):
+        key = url + ("?" + json.dumps(params, sort_keys=True) if params else "")
+
+        def live():
+            response = real_get(url, params=params, **kwargs)
+            return {"status_code": response.status_code, "text": response.text}
+
+        value = cassette.fetch("requests", key, live, lambda: synth_http(url))
+        return ReplayResponse(value["status_code"], value["text"])
+    return replay_get
+
+def make_invoke(cassette, real_invoke):
+    from langchain_core.messages import AIMessage
+
+    def replay_invoke(self, messages, *args, **kwargs):
+        prompt = "\n".join(getattr(m, "content", str(m)) for m in messages)
+        digest = hashlib.sha1(f"{self.format}|{prompt}".encode()).hexdigest()
+        content = cassette.fetch("ollama", f"{self.model}:{digest}",
+                                 lambda: real_invoke(self, messages, *args, **kwargs).content,
+                                 lambda: fake_answer(prompt))
+        return AIMessage(content=content)
+    return replay_invoke
+
+def make_create_embeddings(cassette, real_create):
+    from langchain_core.embeddings import Embeddings
+
+    class ReplayEmbeddings(Embeddings):
+        def __init__(self, *args, **kwargs):
+            self._args = (args, kwargs)
+            self._real = None
+
+        def _live(self):
+            if self._real is None:
+                self._real = real_create(*self._args[0], **self._args[1])
+            return self._real
+
+        # One boundary call per batch, like one forward pass of the real model
+        def embed_documents(self, texts):
+            texts = list(texts)
+            digest = hashlib.sha1("\x00".join(texts).encode()).hexdigest()
+            return cassette.fetch("embeddings", digest,
+                                  lambda: [list(map(float, v)) for v in self._live().embed_documents(texts)],
+                                  lambda: [synth_embedding(t) for t in texts])
+
+        def embed_query(self, text):
+            return self.embed_documents([text])[0]
+
+    return ReplayEmbeddings
+
+def install(cassette):
+    """Patches every boundary. Returns a function that restores the originals."""
+    import requests
+    import yfinance
+    import embedding_backends
+    import GoogleNews as googlenews_module
+    from langchain_ollama import ChatOllama
+
+    patches = [
+        (yfinance, "Ticker", make_ticker(cassette, yfinance.Ticker)),
+        (googlenews_module, "GoogleNews", make_googlenews(cassette, googlenews_module.GoogleNews)),
+        (requests, "get", make_requests_get(cassette, requests.get)),
+        (ChatOllama, "invoke", make_invoke(cassette, ChatOllama.invoke)),
+        (embedding_backends, "create_embeddings", make_create_embeddings(cassette, embedding_backends.create_embeddings)),
+    ]
+    # Modules that did `from GoogleNews import GoogleNews` hold their own reference
+    processor = sys.modules.get("processor")
+    if processor is not None:
+        patches.append((processor, "GoogleNews", patches[1][2]))
+
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+    for target, name, value in patches:
+        setattr(target, name, value)
+
+    def uninstall():
+        for target, name, value in originals:
+            setattr(target, name, value)
+    return uninstall
@@ -0,0 +1,265 @@
+# crawler.py
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+from zoneinfo import ZoneInfo
+import requests
+from stocks import SECTOR_MAP, GROUP_MAP, BRAND_TO_STOCK, PARENT_NAMES, INDEX_TICKERS
+from ticker import ticker_service
+from ingest_queue import ingest_queue
+from market_calendar import is_market_open
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# --- NEWS SOURCES ---
+# A source turns a search topic into raw items: {title, desc, media, link, date}.
+
+class GoogleNewsSource:
+    name = "googlenews"
+
+    def search(self, topic):
+        # Shares the Google News rate limit and circuit breaker with the request path
+        from processor import scrape_google_news
+        return scrape_google_news(topic)
+
+class FeedSource:
+    """JSON feed at {base_url}/search?q=topic, e.g. benchmarks/fake_news_feed.py"""
+    def __init__(self, base_url, name="feed"):
+        self.base_url = base_url.rstrip("/")
+        self.name = name
+
+    def search(self, topic):
+        response = requests.get(f"{self.base_url}/search", params={"q": topic}, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+class RateLimiter:
+    """At most `per_minute` calls per source, spaced evenly."""
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+# --- SEEN STORE ---
+# URL and title keys of everything already handed to the pipeline, so repeats
+# are dropped before they cost an embedding or an LLM call.
+
+def url_key(link):
+    if not link:
+        return None
+    parts = urlsplit(link.strip())
+    return f"url:{parts.netloc.lower().removeprefix('www.')}{parts.path.rstrip('/')}"
+
+def title_key(title):
+    words = re.findall(r"[a-z0-9]+", (title or "").lower())
+    return f"title:{' '.join(words)}" if words else None
+
+def item_keys(item):
+    return [k for k in (url_key(item.get('link')), title_key(item.get('title'))) if k]
+
+class SeenStore:
+    def __init__(self, db_path="./crawler_seen.db"):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen REAL NOT NULL)")
+        self.conn.commit()
+
+    def is_new(self, keys):
+        """True if none of the keys (see item_keys) was recorded before."""
+        if not keys:
+            return False
+        with self._lock:
+            marks = ",".join("?" * len(keys))
+            return self.conn.execute(f"SELECT 1 FROM seen WHERE key IN ({marks})", keys).fetchone() is None
+
+    def mark(self, keys):
+        """Records keys once their items are safely handed off."""
+        with self._lock:
+            self.conn.executemany("INSERT OR IGNORE INTO seen VALUES (?, ?)", [(k, time.time()) for k in keys])
+            self.conn.commit()
+
+    def prune(self, before_ts):
+        with self._lock:
+            removed = self.conn.execute("DELETE FROM seen WHERE first_seen < ?", (before_ts,)).rowcount
+            self.conn.commit()
+        return removed
+
+# --- CRAWLER ---
+
+def crawl_topics():
+    """Sectors, groups and watched tickers from the stocks maps, as search terms."""
+    topics, sector_lists = [], []
+    for sector, symbols in SECTOR_MAP.items():
+        if symbols not in sector_lists:  # BANK and BANKING share one list
+            sector_lists.append(symbols)
+            topics.append(sector)
+    topics.extend(GROUP_MAP)
+    tickers = [s for symbols in SECTOR_MAP.values() for s in symbols]
+    tickers += [s for symbols in GROUP_MAP.values() for s in symbols]
+    tickers += list(BRAND_TO_STOCK.values())
+    tickers += [s for s in ticker_service.symbols if s not in INDEX_TICKERS]
+    for sym in dict.fromkeys(tickers):
+        topics.append(PARENT_NAMES.get(sym, sym.split(".")[0]))
+    return list(dict.fromkeys(topics))
+
+class NewsCrawler:
+    def __init__(self, sources=None, sink=None, seen=None, per_minute=30, batch_size=16,
+                 open_interval=300, closed_interval=1800):
+        self.sources = sources or [GoogleNewsSource()]
+        self.limits = {s.name: RateLimiter(per_minute) for s in self.sources}
+        # Where new articles go: the durable ingestion queue by default
+        self.sink = sink or ingest_queue.enqueue
+        self.seen = seen or SeenStore()
+        # Also called with each batch of new raw items (e.g. the story feed)
+        self.listeners = []
+        self.batch_size = batch_size
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval
+        self.last_cycle = {}
+        self.totals = {"fetched": 0, "new": 0, "duplicates": 0, "errors": 0}
+        self._recent = deque()  # (time, new items) for the rolling rate
+        self._task = None
+        # One cycle at a time: the schedule and /crawler/run must not fetch the same sources twice
+        self._cycle_lock = threading.Lock()
+
+    def on_items(self, callback):
+        self.listeners.append(callback)
+
+    def _flush(self, batch, keys):
+        if batch:
+            self.sink([item_text(item) for item in batch])
+            # Only after the sink took them: a failed enqueue leaves them to be crawled again
+            self.seen.mark(keys)
+            keys.clear()
+            for callback in self.listeners:
+                try:
+                    callback(list(batch))
+                except Exception as e:
+                    print(f"Crawler listener failed: {e}")
+            self._recent.append((time.time(), len(batch)))
+            batch.clear()
+
+    def run_cycle(self, topics=None):
+        """One pass over every source and topic. None if a cycle is already running."""
+        if not self._cycle_lock.acquire(blocking=False):
+            print("Crawl cycle skipped: one is already running.")
+            return None
+        try:
+            return self._cycle(topics)
+        finally:
+            self._cycle_lock.release()
+
+    def trigger(self):
+        """Starts a cycle in the background. False if one is already running."""
+        if self._cycle_lock.locked():
+            return False
+        threading.Thread(target=self._run_now, name="crawl-now", daemon=True).start()
+        return True
+
+    def _run_now(self):
+        try:
+            self.run_cycle()
+        except Exception as e:
+            print(f"Crawler error: {e}")
+
+    def _cycle(self, topics):
+        start = time.perf_counter()
+        topics = topics or crawl_topics()
+        fetched = new = duplicates = errors = 0
+        batch, keys, taken = [], [], set()  # taken: keys of this cycle's new items
+        for source in self.sources:
+            for topic in topics:
+                self.limits[source.name].wait()
+                try:
+                    items = source.search(topic)
+                except Exception as e:
+                    print(f"Crawler error ({source.name}, {topic}): {e}")
+                    errors += 1
+                    continue
+                for item in items:
+                    fetched += 1
+                    item_k = item_keys(item)
+                    if taken.intersection(item_k) or not self.seen.is_new(item_k):
+                        duplicates += 1
+                        continue
+                    new += 1
+                    taken.update(item_k)
+                    batch.append(item)
+                    keys.extend(item_k)
+                    if len(batch) >= self.batch_size:
+                        self._flush(batch, keys)
+        self._flush(batch, keys)
+
+        elapsed = time.perf_counter() - start
+        for key, value in (("fetched", fetched), ("new", new), ("duplicates", duplicates), ("errors", errors)):
+            self.totals[key] += value
+        self.last_cycle = {
+            "finished_at": datetime.now(IST).isoformat(timespec="seconds"),
+            "topics": len(topics), "fetched": fetched, "new": new,
+            "duplicates": duplicates, "errors": errors,
+            "seconds": round(elapsed, 2),
+            "items_per_minute": round(new / elapsed * 60, 1) if elapsed else 0.0
+        }
+        print(f"Crawl cycle: {self.last_cycle}")
+        return self.last_cycle
+
+    def items_per_minute(self, window=3600):
+        """New items handed to the pipeline per minute over the last hour."""
+        cutoff = time.time() - window
+        while self._recent and self._recent[0][0] < cutoff:
+            self._recent.popleft()
+        return round(sum(n for _, n in self._recent) / (window / 60), 2)
+
+    def status(self):
+        return {"sources": [s.name for s in self.sources], "running": self._cycle_lock.locked(), "totals": self.totals,
+                "items_per_minute": self.items_per_minute(), "last_cycle": self.last_cycle}
+
+    # --- SCHEDULE ---
+    def next_interval(self):
+        return self.open_interval if is_market_open("NSE") else self.closed_interval
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_cycle)
+            except Exception as e:
+                print(f"Crawler error: {e}")
+            await asyncio.sleep(self.next_interval())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+def item_text(item):
+    # Same shape the dashboard ingests: headline plus summary
+    desc = item.get('desc') or ""
+    return f"{item['title']}. {desc}".strip() if desc else item['title']
+
+def default_sources():
+    """NEWS_FEED_URL points the crawler at a JSON feed (e.g. the fake one) instead of Google News."""
+    feed_url = os.environ.get("NEWS_FEED_URL")
+    return [FeedSource(feed_url)] if feed_url else [GoogleNewsSource()]
+
+# Global instance
+news_crawler = NewsCrawler(sources=default_sources(),
+                           per_minute=int(os.environ.get("CRAWLER_PER_MINUTE", 30)))
@@ -1,68 +1,588 @@
 # database.py
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from embedding_backends import create_embeddings
 import os
+import re
+import math
+import threading
+import uuid
+import time
+import shutil
+import chromadb
+from datetime import datetime, timezone, timedelta
+from collections import Counter
+from langchain_core.documents import Document
+from quantized_store import QuantizedStore, exact_rerank
+from telemetry import span
 
 # 1. Setup Local Embeddings (Free, runs on CPU)
-# We use a specific model optimized for sentence similarity
+# We use a specific model optimized for sentence similarity (all-MiniLM-L6-v2).
+# Backend (torch / onnx / onnx-int8), threads and micro-batching come from the environment.
 print("Loading Embedding Model (this happens only once)...")
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+embeddings = create_embeddings()
+
+STOPWORDS = {"the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "at", "by", "with", "news", "from", "as"}
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9&]+", text.lower()) if t not in STOPWORDS]
+
+def split_entities(value):
+    """'HDFC Bank, ICICI' -> {'hdfc bank', 'icici'}"""
+    if not value: return set()
+    if isinstance(value, str): value = value.split(",")
+    return {v.strip().lower() for v in value if v.strip()}
+
+# --- ENTITY FLAGS ---
+# Chroma can't match inside the comma-joined "companies"/"sectors" strings, so
+# each article also carries one boolean key per entity ("sector:banking": True).
+# Those are indexed metadata, so a company/sector filter is a cheap where clause
+# however many articles it matches.
+FLAG_PREFIXES = ("company:", "sector:")
+
+def entity_flags(metadata):
+    flags = {f"company:{name}": True for name in split_entities(metadata.get("companies"))}
+    flags.update({f"sector:{name}": True for name in split_entities(metadata.get("sectors"))})
+    return flags
+
+def entity_clauses(companies=None, sectors=None):
+    """where clauses: ANY of the companies AND ANY of the sectors."""
+    clauses = []
+    for prefix, wanted in (("company:", companies), ("sector:", sectors)):
+        options = [{f"{prefix}{name}": True} for name in sorted(split_entities(wanted))]
+        if options:
+            clauses.append(options[0] if len(options) == 1 else {"$or": options})
+    return clauses
+
+def public_metadata(metadata):
+    return {k: v for k, v in (metadata or {}).items() if not k.startswith(FLAG_PREFIXES)}
+
+class KeywordIndex:
+    """
+    In-memory BM25 inverted index over stored articles, plus
+    company/sector postings used as metadata pre-filters.
+    """
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}      # term -> {doc_id: tf}
+        self.doc_len = {}
+        self.docs = {}          # doc_id -> (text, metadata)
+        self.companies = {}     # company -> set(doc_id)
+        self.sectors = {}       # sector -> set(doc_id)
+        self.total_len = 0
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, text, metadata):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self.docs:
+                return
+            self.docs[doc_id] = (text, metadata)
+            self.doc_len[doc_id] = sum(terms.values())
+            self.total_len += self.doc_len[doc_id]
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            for company in split_entities(metadata.get("companies")):
+                self.companies.setdefault(company, set()).add(doc_id)
+            for sector in split_entities(metadata.get("sectors")):
+                self.sectors.setdefault(sector, set()).add(doc_id)
+
+    def remove(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                entry = self.docs.pop(doc_id, None)
+                if entry is None: continue
+                text, metadata = entry
+                self.total_len -= self.doc_len.pop(doc_id, 0)
+                for term in set(tokenize(text)):
+                    posting = self.postings.get(term)
+                    if posting is not None:
+                        posting.pop(doc_id, None)
+                        if not posting: del self.postings[term]
+                for company in split_entities(metadata.get("companies")):
+                    self.companies.get(company, set()).discard(doc_id)
+                for sector in split_entities(metadata.get("sectors")):
+                    self.sectors.get(sector, set()).discard(doc_id)
+
+    def candidates(self, companies=None, sectors=None):
+        """Doc ids matching ANY of the companies AND ANY of the sectors (None = no filter)."""
+        result = None
+        with self._lock:
+            for wanted, postings in ((companies, self.companies), (sectors, self.sectors)):
+                if not wanted: continue
+                ids = set()
+                for name in split_entities(wanted):
+                    ids |= postings.get(name, set())
+                result = ids if result is None else result & ids
+        return result
+
+    def search(self, query_text, k=10, candidates=None):
+        """BM25 top-k, optionally restricted to a candidate id set."""
+        terms = set(tokenize(query_text))
+        scores = Counter()
+        with self._lock:
+            n_docs = len(self.docs)
+            if not n_docs: return []
+            avgdl = self.total_len / n_docs
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting: continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                # Walk whichever side is smaller: a narrow filter gets cheaper, not dearer
+                if candidates is not None and len(candidates) < len(posting):
+                    pairs = ((d, posting[d]) for d in candidates if d in posting)
+                else:
+                    pairs = ((d, tf) for d, tf in posting.items() if candidates is None or d in candidates)
+                for doc_id, tf in pairs:
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avgdl)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+            return [(doc_id, score, self.docs[doc_id]) for doc_id, score in scores.most_common(k)]
+
+# --- TIME SHARDS ---
+# Articles live in one collection per ISO week ("financial_news_w2026_42").
+# Compaction folds old weeks into monthly shards ("financial_news_m2026_10"),
+# and retention drops whole shards, which is just a delete_collection call.
+COLLECTION_PREFIX = "financial_news"
+LEGACY_COLLECTION = "financial_news"  # Single pre-sharding collection
+DEDUP_WINDOW_DAYS = 14
+MAX_DISTANCE = 1.4  # Search results further than this from the query are noise
+
+def shard_for(ts, granularity="week"):
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    if granularity == "month":
+        return f"{COLLECTION_PREFIX}_m{dt.year}_{dt.month:02d}"
+    year, week, _ = dt.isocalendar()
+    return f"{COLLECTION_PREFIX}_w{year}_{week:02d}"
+
+def is_shard(name):
+    return name == LEGACY_COLLECTION or name.startswith(f"{COLLECTION_PREFIX}_w") or name.startswith(f"{COLLECTION_PREFIX}_m")
+
+def shard_range(name):
+    """[start, end) in epoch seconds; the legacy collection covers all time."""
+    if name == LEGACY_COLLECTION:
+        return (0, float("inf"))
+    suffix = name[len(COLLECTION_PREFIX) + 1:]
+    year, num = (int(x) for x in suffix[1:].split("_"))
+    if suffix[0] == "w":
+        start = datetime.fromisocalendar(year, num, 1).replace(tzinfo=timezone.utc)
+        end = start + timedelta(days=7)
+    else:
+        start = datetime(year, num, 1, tzinfo=timezone.utc)
+        end = datetime(year + num // 12, num % 12 + 1, 1, tzinfo=timezone.utc)
+    return (start.timestamp(), end.timestamp())
 
 class VectorDB:
-    def __init__(self):
+    def __init__(self, hnsw_m=16, hnsw_ef_construction=100, hnsw_ef_search=50,
+                 quantization=None, rerank_factor=4, retention_days=180, compact_after_days=28):
         # We use ChromaDB because it's great for local development
         self.db_path = "./chroma_db"
-        self.db = Chroma(
-            persist_directory=self.db_path, 
-            embedding_function=embeddings,
-            collection_name="financial_news"
-        )
+        self.client = chromadb.PersistentClient(path=self.db_path)
+        # HNSW parameters apply to every shard created from now on
+        self.collection_metadata = {
+            "hnsw:space": "l2",
+            "hnsw:M": hnsw_m,
+            "hnsw:construction_ef": hnsw_ef_construction,
+            "hnsw:search_ef": hnsw_ef_search
+        }
+        self.retention_days = retention_days
+        self.compact_after_days = compact_after_days
+        self.shards = {}
+        self._shard_lock = threading.RLock()
+        for col in self.client.list_collections():
+            name = getattr(col, "name", col)
+            if is_shard(name):
+                self._open_shard(name)
+        self.keyword_index = None
+        self._index_lock = threading.Lock()
+        # Called with the stored metadatas after writes (None = anything may have changed)
+        self.listeners = []
+        # Optional int8/float16 first stage with exact re-rank of the top candidates
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.quantized = {}
+        if quantization:
+            self.dim = len(embeddings.embed_query("dimension probe"))
+            for name in list(self.shards):
+                self._get_quantized(name)
+
+    def on_change(self, callback):
+        self.listeners.append(callback)
+
+    def _notify(self, metadatas):
+        for callback in self.listeners:
+            try:
+                callback(metadatas)
+            except Exception as e:
+                print(f"Store listener failed: {e}")
+
+    # --- SHARD MANAGEMENT ---
+    def _open_shard(self, name):
+        with self._shard_lock:
+            if name not in self.shards:
+                self.shards[name] = Chroma(
+                    client=self.client,
+                    collection_name=name,
+                    embedding_function=embeddings,
+                    collection_metadata=self.collection_metadata
+                )
+            return self.shards[name]
+
+    def _quantized_path(self, name):
+        return os.path.join(self.db_path, f"quantized_{self.quantization}", name)
+
+    def _get_quantized(self, name):
+        """Per-shard compact store, backfilled from Chroma if it is new."""
+        if name not in self.quantized:
+            store = QuantizedStore(self._quantized_path(name), dim=self.dim, mode=self.quantization)
+            if not len(store):
+                stored = self.shards[name].get(include=["embeddings"])
+                if stored["ids"]:
+                    print(f"Quantizing {len(stored['ids'])} stored embeddings in {name} ({self.quantization})...")
+                    store.add(stored["ids"], stored["embeddings"])
+            self.quantized[name] = store
+        return self.quantized[name]
+
+    def shards_in_window(self, since=None, until=None):
+        """Shards overlapping [since, until], newest first."""
+        with self._shard_lock:
+            names = list(self.shards)
+        selected = []
+        for name in names:
+            start, end = shard_range(name)
+            if since is not None and end <= since: continue
+            if until is not None and start > until: continue
+            selected.append(name)
+        return sorted(selected, key=lambda n: shard_range(n)[0], reverse=True)
 
-    def add_texts(self, texts, metadatas):
+    def _drop_shard(self, name):
+        with self._shard_lock:
+            self.shards.pop(name, None)
+            self.client.delete_collection(name)
+            if self.quantization:
+                self.quantized.pop(name, None)
+                shutil.rmtree(self._quantized_path(name), ignore_errors=True)
+
+    def drop_expired(self, now=None):
+        """Retention: drops every shard that ended before the retention window."""
+        cutoff = (now or time.time()) - self.retention_days * 86400
+        dropped = []
+        for name in self.shards_in_window():
+            if shard_range(name)[1] <= cutoff:
+                ids = self.shards[name].get(include=[])["ids"]
+                self._drop_shard(name)
+                if self.keyword_index is not None:
+                    self.keyword_index.remove(ids)
+                dropped.append(name)
+        if dropped:
+            print(f"Retention dropped shards: {dropped}")
+            self._notify(None)
+        return {"cutoff": int(cutoff), "dropped": dropped}
+
+    def compact(self, now=None):
+        """
+        Folds the legacy collection and weekly shards older than
+        compact_after_days into monthly shards. Vectors are copied, not re-embedded.
+        """
+        now = now or time.time()
+        threshold = now - self.compact_after_days * 86400
+        sources = [n for n in self.shards_in_window()
+                   if n == LEGACY_COLLECTION or (n.startswith(f"{COLLECTION_PREFIX}_w") and shard_range(n)[1] <= threshold)]
+        moved = 0
+        for name in sources:
+            stored = self.shards[name].get(include=["embeddings", "documents", "metadatas"])
+            # Articles stored before timestamps existed keep their age: the start of their weekly
+            # shard, or for the legacy collection the oldest known timestamp in it (they predate
+            # every article that has one). Stamping them "now" would postpone retention a full window.
+            if name == LEGACY_COLLECTION:
+                known = [m["timestamp"] for m in stored["metadatas"] if m and m.get("timestamp")]
+                undated = min(known) if known else int(threshold)
+            else:
+                undated = int(shard_range(name)[0])
+            groups = {}
+            for doc_id, vector, text, meta in zip(stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"]):
+                meta = {**(meta or {}), "doc_id": doc_id}
+                meta.setdefault("timestamp", undated)
+                groups.setdefault(shard_for(meta["timestamp"], "month"), []).append((doc_id, vector, text, meta))
+            for target, rows in groups.items():
+                collection = self._open_shard(target)._collection
+                if self.quantization:
+                    # Open (and backfill) the target's compact store before Chroma gains these rows
+                    self._get_quantized(target)
+                for start in range(0, len(rows), 5000):
+                    batch = rows[start:start + 5000]
+                    collection.upsert(ids=[r[0] for r in batch], embeddings=[r[1] for r in batch],
+                                      documents=[r[2] for r in batch], metadatas=[r[3] for r in batch])
+                if self.quantization:
+                    self._get_quantized(target).add([r[0] for r in rows], [r[1] for r in rows])
+                moved += len(rows)
+            self._drop_shard(name)
+        if sources:
+            self.keyword_index = None  # Metadata may have gained timestamps, rebuild lazily
+            print(f"Compacted {len(sources)} shards ({moved} articles) into monthly shards.")
+            self._notify(None)
+        return {"compacted": sources, "articles_moved": moved}
+
+    def train_quantized(self):
+        """Builds or refreshes the IVF partition of quantized shards that have grown enough."""
+        trained = {}
+        for name, store in list(self.quantized.items()):
+            nlist = store.maybe_train()
+            if nlist:
+                trained[name] = nlist
+        return trained
+
+    def run_maintenance(self):
+        report = {"retention": self.drop_expired(), "compaction": self.compact()}
+        if self.quantization:
+            report["ivf_trained"] = self.train_quantized()
+        return report
+
+    def _get_keyword_index(self):
+        """Built lazily from the stored corpus, then kept in sync by add_texts."""
+        if self.keyword_index is not None:
+            return self.keyword_index
+        with self._index_lock:
+            if self.keyword_index is None:
+                self.keyword_index = self._build_keyword_index()
+            return self.keyword_index
+
+    def _build_keyword_index(self):
+        index = KeywordIndex()
+        for name in self.shards_in_window():
+            shard = self.shards.get(name)
+            if shard is None:
+                continue
+            stored = shard.get(include=["documents", "metadatas"])
+            backfill_ids, backfill_meta = [], []
+            for doc_id, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                meta = meta or {}
+                flags = entity_flags(meta)
+                if meta.get("doc_id") != doc_id or any(key not in meta for key in flags):
+                    # Older articles: expose the Chroma id and entity flags to metadata filters
+                    meta = {**meta, **flags, "doc_id": doc_id}
+                    backfill_ids.append(doc_id)
+                    backfill_meta.append(meta)
+                index.add(doc_id, text, meta)
+            if backfill_ids:
+                shard._collection.update(ids=backfill_ids, metadatas=backfill_meta)
+        return index
+
+    def embed(self, texts):
+        """Document vectors for texts, e.g. computed once at dedup and reused for storage."""
+        with span("embedding"):
+            return embeddings.embed_documents(texts)
+
+    def prepare_shard(self, ts):
+        """Opens the shard an article with this timestamp will be written to."""
+        name = shard_for(ts)
+        self._open_shard(name)
+        if self.quantization:
+            self._get_quantized(name)
+        return name
+
+    def add_texts(self, texts, metadatas, vectors=None):
         """
         Adds text to the vector database.
+        vectors: precomputed embeddings for texts (skips embedding them again).
         """
-        # Chroma automatically handles deduplication of exact IDs, 
+        # Chroma automatically handles deduplication of exact IDs,
         # but we will handle semantic deduplication in the Agent.
-        self.db.add_texts(texts=texts, metadatas=metadatas)
-        # Chroma persists automatically in newer versions, but just in case:
-        # self.db.persist() 
-            
-    def similarity_search(self, query, k=1):
+        ids = [str(uuid.uuid4()) for _ in texts]
+        now = int(time.time())
+        metadatas = [{**meta, **entity_flags(meta), "doc_id": doc_id, "timestamp": meta.get("timestamp", now)}
+                     for meta, doc_id in zip(metadatas, ids)]
+
+        # Route each article to the weekly shard of its timestamp
+        groups = {}
+        for doc_id, text, meta in zip(ids, texts, metadatas):
+            groups.setdefault(shard_for(meta["timestamp"]), []).append((doc_id, text, meta))
+        given = dict(zip(ids, vectors)) if vectors is not None else None
+        for name, rows in groups.items():
+            shard = self._open_shard(name)
+            shard_ids = [r[0] for r in rows]
+            shard_texts = [r[1] for r in rows]
+            shard_meta = [r[2] for r in rows]
+            if not self.quantization and given is None:
+                # Embedding happens inside the LangChain wrapper here
+                with span("chroma_write"):
+                    shard.add_texts(texts=shard_texts, metadatas=shard_meta, ids=shard_ids)
+            else:
+                # Embed once (or not at all) and write the same vectors to Chroma and the compact store
+                quantized = self._get_quantized(name) if self.quantization else None
+                if given is not None:
+                    shard_vectors = [given[doc_id] for doc_id in shard_ids]
+                else:
+                    with span("embedding"):
+                        shard_vectors = embeddings.embed_documents(shard_texts)
+                with span("chroma_write"):
+                    shard._collection.upsert(ids=shard_ids, embeddings=shard_vectors, documents=shard_texts,
+                                             metadatas=shard_meta)
+                    if quantized is not None:
+                        quantized.add(shard_ids, shard_vectors)
+
+        if self.keyword_index is not None:
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                self.keyword_index.add(doc_id, text, meta)
+        self._notify(metadatas)
+        return ids
+
+    def _search_shard(self, name, query_vector, k, where=None, allowed=None, since=None, until=None):
+        """
+        where: Chroma filter for the plain HNSW path. The quantized path applies the same
+        filter as allowed (doc ids from the keyword index) plus a timestamp check.
+        """
+        shard = self.shards.get(name)
+        if shard is None:
+            return []  # Dropped by maintenance mid-query
+        if not self.quantization:
+            return shard.similarity_search_by_vector_with_relevance_scores(query_vector, k=k, filter=where)
+
+        # Compact scan -> exact squared-L2 re-rank on full-precision vectors,
+        # so scores stay on the same scale as Chroma's and thresholds still apply
+        candidates = self._get_quantized(name).search(query_vector, k=k * self.rerank_factor, allowed=allowed)
+        if not candidates:
+            return []
+        stored = shard._collection.get(ids=[c[0] for c in candidates],
+                                       include=["embeddings", "documents", "metadatas"])
+        docs = {doc_id: (text, meta) for doc_id, text, meta in
+                zip(stored["ids"], stored["documents"], stored["metadatas"])}
+        in_window = [(doc_id, vector) for doc_id, vector, meta in zip(stored["ids"], stored["embeddings"], stored["metadatas"])
+                     if (since is None or (meta or {}).get("timestamp", 0) >= since)
+                     and (until is None or (meta or {}).get("timestamp", 0) <= until)]
+        ranked = exact_rerank(query_vector, in_window, k)
+        return [(Document(page_content=docs[doc_id][0], metadata=docs[doc_id][1] or {}), dist)
+                for doc_id, dist in ranked]
+
+    def _fan_out(self, query_text, k, since=None, until=None, where=None, query_vector=None, allowed=None):
+        """Queries only the shards inside the window and merges by distance."""
+        if query_vector is None:
+            with span("embedding"):
+                query_vector = embeddings.embed_query(query_text)
+        results = []
+        for name in self.shards_in_window(since, until):
+            try:
+                with span("chroma_query"):
+                    results.extend(self._search_shard(name, query_vector, k, where, allowed, since, until))
+            except Exception as e:
+                print(f"Shard {name} query failed: {e}")
+        results.sort(key=lambda r: r[1])
+        return results[:k]
+
+    def similarity_search(self, query, k=1, since=None, until=None, query_vector=None):
         """
         Finds the top k most similar items.
         Returns: List of (Document, score)
         """
         # score < 0.5 usually means very similar (duplicate)
-        return self.db.similarity_search_with_score(query, k=k)
+        return self._fan_out(query, k, since=since, until=until, query_vector=query_vector)
+
+    def similarity_search_recent(self, query, k=1, days=DEDUP_WINDOW_DAYS, query_vector=None):
+        """Dedup lookup: only the shards from the last few days are consulted."""
+        return self.similarity_search(query, k=k, since=time.time() - days * 86400, query_vector=query_vector)
 
-    def advanced_search(self, query_text, k=5): # Increased k to 5 to cast a wider net
+    def advanced_search(self, query_text, k=5, companies=None, sectors=None, since=None, until=None, mode="hybrid",
+                        query_vector=None): # Increased k to 5 to cast a wider net
         """
-        Performs a search. 
-        In a real production system, we would use an LLM to expand 
+        Performs a search.
+        In a real production system, we would use an LLM to expand
         'Banking' -> 'Finance', 'Lending', etc.
         For now, vector search handles the semantic matching well.
+
+        mode="hybrid" fuses vector and BM25 keyword ranks (reciprocal rank fusion).
+        companies/sectors/since/until (epoch seconds) are pushed into the store query,
+        and only shards overlapping the date window are searched.
+        query_vector skips embedding query_text when the caller already has it.
         """
-        if self.db is None:
+        if not self.shards:
             return []
-            
         print(f"Searching DB for: {query_text}")
-        results = self.db.similarity_search_with_score(query_text, k=k)
-        
-        cleaned_results = []
+        index = self._get_keyword_index()
+
+        # --- METADATA PRE-FILTER ---
+        # Entity flags go to Chroma as where clauses; the keyword index narrows BM25 and short-circuits empty filters
+        candidates = index.candidates(companies, sectors)
+        if candidates is not None and not candidates:
+            return []
+        clauses = entity_clauses(companies, sectors)
+        if since is not None:
+            clauses.append({"timestamp": {"$gte": since}})
+        if until is not None:
+            clauses.append({"timestamp": {"$lte": until}})
+        where = None
+        if len(clauses) == 1: where = clauses[0]
+        elif clauses: where = {"$and": clauses}
+
+        if query_vector is None:
+            with span("embedding"):
+                query_vector = embeddings.embed_query(query_text)
+
+        # --- VECTOR RANKING (over-fetch, then threshold) ---
+        fetch_k = k * 3 if mode == "hybrid" else k
+        results = self._fan_out(query_text, fetch_k, since=since, until=until, where=where,
+                               query_vector=query_vector, allowed=candidates)
+
+        vector_hits = []
         for doc, score in results:
             # --- THE QUALITY FILTER ---
             # If score is > 1.4, it's garbage. Don't show it.
-            if score < 1.4: 
-                cleaned_results.append({
-                    "content": doc.page_content,
-                    "metadata": doc.metadata,
-                    "score": score
-                })
+            if score < MAX_DISTANCE:
+                vector_hits.append((doc.metadata.get("doc_id"), doc.page_content, public_metadata(doc.metadata), score))
             else:
                 print(f"Filtered out low relevance result: {score}")
-            
+
+        if mode != "hybrid":
+            return [{"content": text, "metadata": meta, "score": score}
+                    for _, text, meta, score in vector_hits[:k]]
+
+        # --- KEYWORD RANKING ---
+        keyword_hits = index.search(query_text, k=fetch_k, candidates=candidates)
+        if since is not None or until is not None:
+            keyword_hits = [hit for hit in keyword_hits
+                            if since is None or hit[2][1].get("timestamp", 0) >= since
+                            if until is None or hit[2][1].get("timestamp", 0) <= until]
+
+        # Keyword-only hits get the same quality filter as vector hits
+        vector_ids = {hit[0] for hit in vector_hits}
+        distances = self._distances([hit[0] for hit in keyword_hits if hit[0] not in vector_ids],
+                                    query_vector, since, until)
+
+        # --- RECIPROCAL RANK FUSION ---
+        fused = {}
+        for rank, (doc_id, text, meta, score) in enumerate(vector_hits):
+            fused[doc_id] = {"content": text, "metadata": meta, "score": score, "rrf_score": 1 / (60 + rank + 1)}
+        for rank, (doc_id, bm25, (text, meta)) in enumerate(keyword_hits):
+            if doc_id not in fused:
+                score = distances.get(doc_id)
+                if score is None or score >= MAX_DISTANCE:
+                    continue
+                fused[doc_id] = {"content": text, "metadata": public_metadata(meta), "score": score, "rrf_score": 0}
+            entry = fused[doc_id]
+            entry["rrf_score"] += 1 / (60 + rank + 1)
+            entry["bm25"] = round(bm25, 3)
+
+        cleaned_results = sorted(fused.values(), key=lambda r: r["rrf_score"], reverse=True)[:k]
         return cleaned_results
 
-# Global instance
-global_db = VectorDB()
+    def _distances(self, doc_ids, query_vector, since=None, until=None):
+        """Exact squared-L2 distance to the query for specific stored articles: {doc_id: distance}."""
+        found, remaining = {}, list(doc_ids)
+        for name in self.shards_in_window(since, until):
+            if not remaining:
+                break
+            shard = self.shards.get(name)
+            if shard is None:
+                continue
+            stored = shard._collection.get(ids=remaining, include=["embeddings"])
+            found.update(exact_rerank(query_vector, list(zip(stored["ids"], stored["embeddings"])), len(stored["ids"])))
+            remaining = [doc_id for doc_id in remaining if doc_id not in found]
+        return found
+
+# Global instance (HNSW / quantization / retention tunable from the environment)
+global_db = VectorDB(
+    hnsw_m=int(os.environ.get("HNSW_M", 16)),
+    hnsw_ef_construction=int(os.environ.get("HNSW_EF_CONSTRUCTION", 100)),
+    hnsw_ef_search=int(os.environ.get("HNSW_EF_SEARCH", 50)),
+    quantization=os.environ.get("VECTOR_QUANTIZATION") or None,
+    retention_days=int(os.environ.get("NEWS_RETENTION_DAYS", 180)),
+    compact_after_days=int(os.environ.get("NEWS_COMPACT_AFTER_DAYS", 28))
+)
@@ -0,0 +1,313 @@
+# doc_jobs.py
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from processor import extract_document, analyze_document_content
+
+# --- BATCH DOCUMENT ANALYSIS ---
+# A job is many PDFs/URLs analysed in the background:
+#   1. text extraction in a process pool (PDF parsing and HTML cleanup are CPU
+#      bound, so this stage scales with cores)
+#   2. dedup by content hash: identical files skip extraction, identical texts
+#      share one analysis - within a job, across jobs and across restarts
+#   3. LLM analysis in a small thread pool, which caps concurrent model calls
+# Job and item state lives in SQLite so progress and results can be polled by id.
+
+EXTRACT_PROCESSES = int(os.environ.get("DOC_EXTRACT_PROCESSES", os.cpu_count() or 2))
+LLM_CONCURRENCY = int(os.environ.get("DOC_LLM_CONCURRENCY", 2))
+MAX_ITEMS = 200
+
+def content_hash(data):
+    if isinstance(data, str):
+        data = " ".join(data.split()).encode()
+    return hashlib.sha256(data).hexdigest()
+
+class DocJobManager:
+    def __init__(self, db_path="./doc_jobs.db", processes=EXTRACT_PROCESSES, llm_concurrency=LLM_CONCURRENCY):
+        self.processes = processes
+        self.llm_concurrency = llm_concurrency
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                total INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                job_id INTEGER NOT NULL REFERENCES jobs(id),
+                idx INTEGER NOT NULL,
+                kind TEXT NOT NULL,            -- 'pdf' | 'url'
+                name TEXT NOT NULL,            -- file name or URL
+                status TEXT NOT NULL DEFAULT 'queued',  -- queued | extracting | analyzing | done | failed
+                text_hash TEXT,
+                duplicate_of INTEGER,          -- idx of the item in this job with the same content
+                cached INTEGER NOT NULL DEFAULT 0,
+                extracted_at REAL,
+                finished_at REAL,
+                error TEXT,
+                PRIMARY KEY (job_id, idx)
+            );
+            -- One analysis per distinct text, shared by every job that sees it
+            CREATE TABLE IF NOT EXISTS analyses (
+                text_hash TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+        interrupted = self.conn.execute("""
+            UPDATE items SET status = 'failed', error = 'Interrupted by a restart', finished_at = ?
+            WHERE status NOT IN ('done', 'failed')
+        """, (time.time(),)).rowcount
+        self.conn.commit()
+        if interrupted:
+            print(f"Doc jobs: {interrupted} unfinished items marked failed after restart.")
+        self._extract_pool = None
+        self._llm_pool = None
+        # text hash -> [(job_id, idx)] waiting on an analysis already in flight
+        self._in_flight = {}
+        self._remaining = {}  # job_id -> items not yet done/failed
+        self._pool_lock = threading.Lock()
+        # Updated from pool callbacks and LLM threads
+        self._stats_lock = threading.Lock()
+        self.stats = {"extracted": 0, "extract_seconds": 0.0, "analyzed": 0, "analysis_seconds": 0.0,
+                      "file_duplicates": 0, "text_duplicates": 0, "cache_hits": 0, "failed": 0}
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def _pools(self):
+        with self._pool_lock:
+            if self._extract_pool is None:
+                # spawn: the server has threads running, which fork() would copy in a broken state.
+                # Workers import processor only: main.py serves through uvicorn's __main__, which spawned
+                # workers don't re-import (main's globals would reopen the stores and re-run recovery).
+                self._extract_pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                         mp_context=multiprocessing.get_context("spawn"))
+            if self._llm_pool is None:
+                self._llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="doc-llm")
+            return self._extract_pool, self._llm_pool
+
+    def _reset_extract_pool(self, pool):
+        """A worker died (e.g. a malformed PDF crashed the parser): later documents get a fresh pool."""
+        with self._pool_lock:
+            if self._extract_pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self._extract_pool = None
+
+    # --- SUBMISSION ---
+    def submit(self, documents):
+        """
+        documents: [("pdf", file name, bytes) | ("url", url, None)]. Returns the job id.
+        Identical uploads within the job are extracted once.
+        """
+        if not documents:
+            raise ValueError("No documents provided")
+        if len(documents) > MAX_ITEMS:
+            raise ValueError(f"At most {MAX_ITEMS} documents per job")
+        now = time.time()
+        with self._lock:
+            job_id = self.conn.execute("INSERT INTO jobs (created_at, total) VALUES (?, ?)",
+                                       (now, len(documents))).lastrowid
+            self.conn.executemany("INSERT INTO items (job_id, idx, kind, name) VALUES (?, ?, ?, ?)",
+                                  [(job_id, idx, kind, name) for idx, (kind, name, _) in enumerate(documents)])
+            self.conn.commit()
+            self._remaining[job_id] = len(documents)
+
+        extract_pool, _ = self._pools()
+        first_seen = {}  # raw content key -> idx of the item that extracts it
+        for idx, (kind, name, data) in enumerate(documents):
+            key = content_hash(data) if kind == "pdf" else f"url:{name.strip()}"
+            if key in first_seen:
+                self._count("file_duplicates")
+                self._follow(job_id, idx, first_seen[key])
+                continue
+            first_seen[key] = idx
+            self._set(job_id, idx, status="extracting")
+            future = extract_pool.submit(extract_document, kind, data if kind == "pdf" else name)
+            future.add_done_callback(lambda f, idx=idx, start=time.perf_counter():
+                                     self._on_extracted(job_id, idx, f, start, extract_pool))
+        return job_id
+
+    def _follow(self, job_id, idx, original):
+        """Marks an item as a copy of an earlier one in the same job; it finishes with it."""
+        with self._lock:
+            self.conn.execute("UPDATE items SET duplicate_of = ? WHERE job_id = ? AND idx = ?",
+                              (original, job_id, idx))
+            # The original may already be finished (e.g. a fast failure)
+            done = self.conn.execute("SELECT status IN ('done', 'failed') FROM items WHERE job_id = ? AND idx = ?",
+                                     (job_id, original)).fetchone()[0]
+            if done:
+                self._count_finished(job_id, self._copy_original(job_id, original))
+            self.conn.commit()
+
+    # --- STAGES ---
+    def _on_extracted(self, job_id, idx, future, started, pool):
+        try:
+            text = future.result()
+        except Exception as e:
+            print(f"Doc job {job_id}/{idx}: extraction crashed: {e}")
+            if isinstance(e, BrokenProcessPool):
+                self._reset_extract_pool(pool)
+            self._fail(job_id, idx, f"Extraction failed: {e}")
+            return
+        # Includes time queued behind other documents: the stage latency a job sees
+        elapsed = time.perf_counter() - started
+        if not text or len(text) < 100:
+            self._count("extract_seconds", elapsed)
+            self._fail(job_id, idx, "Could not extract enough text. The file may be scanned or the site protected.")
+            return
+        with self._stats_lock:
+            self.stats["extract_seconds"] += elapsed
+            self.stats["extracted"] += 1
+        text_hash = content_hash(text)
+        self._set(job_id, idx, status="analyzing", text_hash=text_hash, extracted_at=time.time())
+
+        with self._lock:
+            cached = self.conn.execute("SELECT 1 FROM analyses WHERE text_hash = ?", (text_hash,)).fetchone()
+            waiting = self._in_flight.get(text_hash)
+            if not cached and waiting is not None:
+                waiting.append((job_id, idx))
+                self._count("text_duplicates")
+                return
+            if not cached:
+                self._in_flight[text_hash] = []
+        if cached:
+            self._count("cache_hits")
+            self._finish(job_id, idx, status="done", cached=1, finished_at=time.time())
+            return
+        _, llm_pool = self._pools()
+        llm_pool.submit(self._analyze, job_id, idx, text_hash, text)
+
+    def _analyze(self, job_id, idx, text_hash, text):
+        start = time.perf_counter()
+        try:
+            result = analyze_document_content(text)
+        except Exception as e:
+            result = {"is_relevant": False, "message": f"AI Error: {e}"}
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats["analysis_seconds"] += elapsed
+            self.stats["analyzed"] += 1
+        # Model errors aren't cached, so the same document can be retried in a later job
+        failed = str(result.get("message", "")).startswith("AI Error")
+        with self._lock:
+            if not failed:
+                self.conn.execute("INSERT OR REPLACE INTO analyses (text_hash, result, created_at) VALUES (?, ?, ?)",
+                                  (text_hash, json.dumps(result), time.time()))
+                self.conn.commit()
+            waiting = self._in_flight.pop(text_hash, [])
+        for n, (item_job, item_idx) in enumerate([(job_id, idx)] + waiting):
+            if failed:
+                self._fail(item_job, item_idx, result["message"])
+            else:
+                if n:
+                    self._set(item_job, item_idx, cached=1)
+                self._done(item_job, item_idx)
+
+    # --- STATE ---
+    def _set(self, job_id, idx, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self.conn.execute(f"UPDATE items SET {columns} WHERE job_id = ? AND idx = ?",
+                              (*fields.values(), job_id, idx))
+            self.conn.commit()
+
+    def _done(self, job_id, idx):
+        self._finish(job_id, idx, status="done", finished_at=time.time())
+
+    def _fail(self, job_id, idx, error):
+        self._count("failed")
+        self._finish(job_id, idx, status="failed", error=error, finished_at=time.time())
+
+    def _finish(self, job_id, idx, **fields):
+        """Final state for an item and every same-file copy waiting on it, in one transaction."""
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self.conn.execute(f"UPDATE items SET {columns} WHERE job_id = ? AND idx = ?",
+                              (*fields.values(), job_id, idx))
+            self._count_finished(job_id, 1 + self._copy_original(job_id, idx))
+            self.conn.commit()
+
+    def _count_finished(self, job_id, n):
+        """Caller holds the lock. Stamps the job finished once no item is left."""
+        self._remaining[job_id] = self._remaining.get(job_id, n) - n
+        if self._remaining[job_id] <= 0:
+            del self._remaining[job_id]
+            self.conn.execute("UPDATE jobs SET finished_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def _copy_original(self, job_id, idx):
+        """Caller holds the lock. Copies a finished item's state onto its queued duplicates."""
+        return self.conn.execute("""
+            UPDATE items SET
+                (status, text_hash, error, cached, finished_at) =
+                (SELECT o.status, o.text_hash, o.error, 1, o.finished_at FROM items o
+                 WHERE o.job_id = items.job_id AND o.idx = items.duplicate_of)
+            WHERE job_id = ? AND duplicate_of = ? AND status = 'queued'
+        """, (job_id, idx)).rowcount
+
+    # --- QUERIES ---
+    def get(self, job_id, include_results=True):
+        with self._lock:
+            job = self.conn.execute("SELECT id, created_at, finished_at, total FROM jobs WHERE id = ?",
+                                    (job_id,)).fetchone()
+            if job is None:
+                return None
+            items = self.conn.execute("""
+                SELECT i.idx, i.kind, i.name, i.status, i.text_hash, i.duplicate_of, i.cached,
+                       i.extracted_at, i.finished_at, i.error, a.result
+                FROM items i LEFT JOIN analyses a ON a.text_hash = i.text_hash
+                WHERE i.job_id = ? ORDER BY i.idx
+            """, (job_id,)).fetchall()
+        counts = {}
+        for row in items:
+            counts[row[3]] = counts.get(row[3], 0) + 1
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        extracted = [row[7] for row in items if row[7]]
+        elapsed = (job[2] or time.time()) - job[1]
+        report = {
+            "id": job[0], "status": "done" if job[2] else "running",
+            "created_at": job[1], "finished_at": job[2], "total": job[3], "counts": counts,
+            "progress": round(finished / job[3], 3) if job[3] else 1.0,
+            "docs_per_minute": round(finished / elapsed * 60, 1) if elapsed > 0 else None,
+            # Extraction throughput on its own: the stage that scales with processes
+            "extracted_per_minute": round(len(extracted) / (max(extracted) - job[1]) * 60, 1)
+                                    if extracted and max(extracted) > job[1] else None,
+        }
+        report["items"] = [{
+            "index": row[0], "kind": row[1], "name": row[2], "status": row[3], "content_hash": row[4],
+            "duplicate_of": row[5], "cached": bool(row[6]), "error": row[9],
+            **({"result": json.loads(row[10]) if row[10] and row[3] == "done" else None} if include_results else {}),
+        } for row in items]
+        return report
+
+    def status(self):
+        with self._lock:
+            analyses = self.conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            running = len(self._remaining)
+        with self._stats_lock:
+            stats = dict(self.stats)
+        for stage, count in (("extract", stats["extracted"]), ("analysis", stats["analyzed"])):
+            seconds = stats.pop(f"{stage}_seconds")
+            stats[f"{stage}_ms_mean"] = round(seconds / count * 1000, 1) if count else None
+        return {"processes": self.processes, "llm_concurrency": self.llm_concurrency, "running_jobs": running,
+                "cached_analyses": analyses, **stats}
+
+    def shutdown(self):
+        with self._pool_lock:
+            for pool in (self._extract_pool, self._llm_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._extract_pool = self._llm_pool = None
+
+# Global instance
+doc_jobs = DocJobManager()
@@ -0,0 +1,152 @@
+# embedding_backends.py
+import os
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# --- EMBEDDING BACKENDS ---
+# Everything here speaks the LangChain Embeddings interface, so Chroma and the
+# graph nodes don't care which backend produced the vectors.
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_TOKENS = 256  # all-MiniLM-L6-v2 max_seq_length
+
+# ONNX exports shipped in the model repo on the Hugging Face Hub
+ONNX_FILES = {
+    "fp32": "onnx/model.onnx",
+    "int8": "onnx/model_qint8_avx512.onnx",
+}
+
+class TorchBackend(Embeddings):
+    """The original HuggingFaceEmbeddings path (sentence-transformers on PyTorch)."""
+    def __init__(self, threads=None):
+        from langchain_huggingface import HuggingFaceEmbeddings
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+
+    def embed_documents(self, texts):
+        return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+class OnnxBackend(Embeddings):
+    """
+    all-MiniLM-L6-v2 on ONNX Runtime: tokenizers + one session run per batch,
+    mean pooling and L2 normalisation (same outputs as the sentence-transformers pipeline).
+    """
+    def __init__(self, precision="fp32", threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        from huggingface_hub import hf_hub_download
+
+        self.tokenizer = Tokenizer.from_file(hf_hub_download(MODEL_NAME, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_TOKENS)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        model_path = hf_hub_download(MODEL_NAME, ONNX_FILES[precision])
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts):
+        if not texts:
+            return []
+        encoded = self.tokenizer.encode_batch(list(texts))
+        ids = np.array([e.ids for e in encoded], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encoded], dtype=np.int64)
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        hidden = self.session.run(None, feeds)[0]
+        # Mean pooling over real tokens, then unit length
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_documents(self, texts):
+        return self._encode(texts)
+
+    def embed_query(self, text):
+        return self._encode([text])[0]
+
+class MicroBatcher(Embeddings):
+    """
+    Collects concurrent embed calls from many threads into one forward pass.
+    A request waits at most max_wait_ms for company before the batch runs.
+    """
+    def __init__(self, backend, max_batch=64, max_wait_ms=5):
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _submit(self, texts):
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0][0])
+            try:
+                while size < self.max_batch:
+                    item = self._queue.get(timeout=self.max_wait)
+                    batch.append(item)
+                    size += len(item[0])
+            except queue.Empty:
+                pass
+
+            texts = [t for item, _ in batch for t in item]
+            try:
+                vectors = self.backend.embed_documents(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for item, future in batch:
+                future.set_result(vectors[offset:offset + len(item)])
+                offset += len(item)
+
+    def embed_documents(self, texts):
+        return self._submit(texts)
+
+    def embed_query(self, text):
+        return self._submit([text])[0]
+
+def create_embeddings(backend=None, threads=None, batch_wait_ms=None):
+    """
+    Backend from arguments or the environment:
+      EMBEDDING_BACKEND = torch (default) | onnx | onnx-int8
+      EMBEDDING_THREADS = intra-op threads (default: runtime's choice)
+      EMBEDDING_BATCH_WAIT_MS = micro-batching window, 0 disables (default 5)
+    """
+    backend = backend or os.environ.get("EMBEDDING_BACKEND", "torch")
+    threads = threads or int(os.environ.get("EMBEDDING_THREADS", 0)) or None
+    if batch_wait_ms is None:
+        batch_wait_ms = float(os.environ.get("EMBEDDING_BATCH_WAIT_MS", 5))
+
+    if backend == "torch":
+        model = TorchBackend(threads=threads)
+    elif backend == "onnx":
+        model = OnnxBackend("fp32", threads=threads)
+    elif backend == "onnx-int8":
+        model = OnnxBackend("int8", threads=threads)
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    if batch_wait_ms > 0:
+        model = MicroBatcher(model, max_wait_ms=batch_wait_ms)
+    return model
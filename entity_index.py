@@ -0,0 +1,156 @@
+# entity_index.py
+import sqlite3
+import threading
+import time
+from stocks import BRAND_TO_STOCK, PARENT_NAMES, COMPANY_NAMES, SECTOR_NAMES
+from extraction import SECTOR_KEYWORDS
+
+# --- ENTITY SIDE INDEX ---
+# Normalised entity -> article mapping next to the vector store, so
+# "latest news about HDFC Bank" is an index lookup, not a vector search.
+
+# Reverse of PARENT_NAMES and COMPANY_NAMES: "HDFC BANK" -> "HDFCBANK.NS"
+NAME_TO_STOCK = {name.upper(): sym for sym, names in COMPANY_NAMES.items() for name in names}
+NAME_TO_STOCK.update({name.upper(): sym for sym, name in PARENT_NAMES.items()})
+CORPORATE_SUFFIXES = (" LIMITED", " LTD.", " LTD", " INC.", " INC", " CORPORATION", " CORP")
+
+def canonical_company(name):
+    """Returns (canonical_name, ticker or None) for an extracted company name."""
+    key = " ".join(name.upper().replace("’", "'").split())
+    for suffix in CORPORATE_SUFFIXES:
+        if key.endswith(suffix):
+            key = key[:-len(suffix)]
+    ticker = BRAND_TO_STOCK.get(key) or NAME_TO_STOCK.get(key)
+    if ticker is None and (key.endswith(".NS") or key.endswith(".BO")):
+        ticker = key
+    if ticker:
+        canonical = PARENT_NAMES.get(ticker) or COMPANY_NAMES.get(ticker, [key.title()])[0]
+    else:
+        canonical = key.title()
+    return canonical, ticker
+
+def _as_list(value):
+    # LLM output is not always a list: "HDFC, ICICI" -> ["HDFC", "ICICI"]
+    if not value: return []
+    if isinstance(value, str): return [v.strip() for v in value.split(",") if v.strip()]
+    return [str(v) for v in value if v]
+
+# Every spelling of a known sector -> the name the dictionary pass stores ("Banks" -> "Banking")
+SECTOR_ALIASES = dict(SECTOR_NAMES)
+SECTOR_ALIASES.update({kw: sector for sector, kws in SECTOR_KEYWORDS.items() for kw in kws})
+SECTOR_ALIASES.update({sector.upper(): sector for sector in SECTOR_KEYWORDS})
+
+def canonical_sector(name):
+    key = " ".join(name.upper().split())
+    for suffix in (" SECTOR", " STOCKS", " SHARES"):
+        if key.endswith(suffix):
+            key = key[:-len(suffix)]
+    if key in SECTOR_ALIASES:
+        return SECTOR_ALIASES[key]
+    if key.endswith("S") and key[:-1] in SECTOR_ALIASES:
+        return SECTOR_ALIASES[key[:-1]]
+    return key.title()
+
+class EntityIndex:
+    def __init__(self, db_path="./entity_index.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                doc_id TEXT PRIMARY KEY,
+                ts INTEGER NOT NULL,
+                sentiment TEXT,
+                text TEXT
+            );
+            CREATE TABLE IF NOT EXISTS article_entities (
+                entity TEXT NOT NULL,
+                kind TEXT NOT NULL,          -- 'company' | 'sector'
+                ticker TEXT,
+                doc_id TEXT NOT NULL REFERENCES articles(doc_id),
+                ts INTEGER NOT NULL,
+                PRIMARY KEY (kind, entity, doc_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_entity_ticker_ts ON article_entities (ticker, ts DESC);
+            CREATE INDEX IF NOT EXISTS idx_entity_name_ts ON article_entities (kind, entity, ts DESC);
+        """)
+        self.conn.commit()
+        # Called with (doc_id, tickers, sectors, sentiment, ts, text=...) for each stored article
+        self.listeners = []
+
+    def on_article(self, callback):
+        self.listeners.append(callback)
+
+    def add_article(self, doc_id, text, entities, ts=None):
+        """Called at ingest with the LLM-extracted entities dict."""
+        ts = ts or int(time.time())
+        rows = []
+        for company in _as_list(entities.get("companies")):
+            canonical, ticker = canonical_company(company)
+            rows.append((canonical, "company", ticker, doc_id, ts))
+        for sector in _as_list(entities.get("sectors")):
+            rows.append((canonical_sector(sector), "sector", None, doc_id, ts))
+
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO articles (doc_id, ts, sentiment, text) VALUES (?, ?, ?, ?)",
+                (doc_id, ts, entities.get("sentiment"), text)
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO article_entities (entity, kind, ticker, doc_id, ts) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.commit()
+        tickers = sorted({row[2] for row in rows if row[2]})
+        sectors = sorted({row[0] for row in rows if row[1] == "sector"})
+        for callback in self.listeners:
+            try:
+                callback(doc_id, tickers, sectors, entities.get("sentiment"), ts, text=text)
+            except Exception as e:
+                print(f"Article listener failed: {e}")
+
+    def prune(self, before_ts):
+        """Retention: forgets articles older than the vector store keeps."""
+        with self._lock:
+            self.conn.execute("DELETE FROM article_entities WHERE ts < ?", (before_ts,))
+            cur = self.conn.execute("DELETE FROM articles WHERE ts < ?", (before_ts,))
+            self.conn.commit()
+            return cur.rowcount
+
+    def _rows(self, sql, params):
+        with self._lock:
+            cur = self.conn.execute(sql, params)
+            return [{"doc_id": r[0], "timestamp": r[1], "sentiment": r[2], "content": r[3]} for r in cur.fetchall()]
+
+    def latest_for_ticker(self, ticker, limit=10):
+        return self._rows("""
+            SELECT a.doc_id, a.ts, a.sentiment, a.text
+            FROM article_entities e JOIN articles a ON a.doc_id = e.doc_id
+            WHERE e.ticker = ?
+            ORDER BY e.ts DESC LIMIT ?
+        """, (ticker, limit))
+
+    def latest_for_tickers(self, tickers, limit=10):
+        """Latest articles about any of the tickers (e.g. a business group's members)."""
+        if not tickers:
+            return []
+        marks = ",".join("?" * len(tickers))
+        return self._rows(f"""
+            SELECT a.doc_id, a.ts, a.sentiment, a.text
+            FROM articles a
+            WHERE a.doc_id IN (SELECT doc_id FROM article_entities WHERE ticker IN ({marks}))
+            ORDER BY a.ts DESC LIMIT ?
+        """, (*tickers, limit))
+
+    def latest_for_entity(self, name, kind="company", limit=10):
+        canonical = canonical_company(name)[0] if kind == "company" else canonical_sector(name)
+        return self._rows("""
+            SELECT a.doc_id, a.ts, a.sentiment, a.text
+            FROM article_entities e JOIN articles a ON a.doc_id = e.doc_id
+            WHERE e.kind = ? AND e.entity = ?
+            ORDER BY e.ts DESC LIMIT ?
+        """, (kind, canonical, limit))
+
+# Global instance
+entity_index = EntityIndex()
@@ -0,0 +1,403 @@
+# extraction.py
+import json
+import re
+import threading
+from textblob import TextBlob
+from langchain_core.messages import HumanMessage
+from stocks import BRAND_TO_STOCK, PARENT_NAMES, COMPANY_NAMES, SECTOR_MAP, SECTOR_NAMES
+from telemetry import span, traced
+
+# --- ENTITY EXTRACTION HELPERS ---
+# 1. A dictionary pass over the stocks maps that can skip the LLM entirely.
+# 2. The JSON schema handed to Ollama's structured-output mode.
+# 3. A tolerant parser for whatever the model sends back anyway.
+
+ENTITY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "companies": {"type": "array", "items": {"type": "string"}},
+        "sectors": {"type": "array", "items": {"type": "string"}},
+        "sentiment": {"type": "string", "enum": ["Positive", "Negative", "Neutral"]}
+    },
+    "required": ["companies", "sectors", "sentiment"]
+}
+
+SENTIMENTS = {"POSITIVE": "Positive", "NEGATIVE": "Negative", "NEUTRAL": "Neutral",
+              "BULLISH": "Positive", "BEARISH": "Negative", "MIXED": "Neutral"}
+
+EMPTY_ENTITIES = {"companies": [], "sectors": [], "sentiment": "Neutral"}
+
+# Several short articles per call, answered by index
+PACKED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "articles": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"index": {"type": "integer"}, **ENTITY_SCHEMA["properties"]},
+                "required": ["index", "companies", "sectors", "sentiment"]
+            }
+        }
+    },
+    "required": ["articles"]
+}
+
+# Packing limits: only short items are worth sharing a prompt
+PACK_MAX_CHARS = 600
+PACK_SIZE = 8
+PACK_BUDGET_CHARS = 3000
+
+# --- DICTIONARY PASS ---
+SECTOR_KEYWORDS = {
+    "Banking": ["BANK", "BANKS", "BANKING", "LENDER", "LENDERS", "RBI"],
+    "Auto": ["AUTO", "AUTOMOBILE", "CARMAKER", "EV", "VEHICLE", "VEHICLES"],
+    "IT": ["IT", "SOFTWARE", "TECH SERVICES", "OUTSOURCING"],
+    "FMCG": ["FMCG", "CONSUMER GOODS"],
+    "Metals": ["METAL", "METALS", "STEEL", "ALUMINIUM", "COAL"],
+}
+
+# Ticker -> sector from the sector grids
+TICKER_SECTOR = {}
+for _sector, _symbols in SECTOR_MAP.items():
+    for _sym in _symbols:
+        TICKER_SECTOR.setdefault(_sym, SECTOR_NAMES[_sector])
+
+# Surface name -> (display name, ticker)
+COMPANY_ALIASES = {}
+for _sym, _names in COMPANY_NAMES.items():
+    for _name in _names:
+        COMPANY_ALIASES[_name.upper()] = (PARENT_NAMES.get(_sym, _names[0]), _sym)
+for _brand, _sym in BRAND_TO_STOCK.items():
+    COMPANY_ALIASES[_brand] = (PARENT_NAMES.get(_sym, _brand.title()), _sym)
+for _sym, _name in PARENT_NAMES.items():
+    COMPANY_ALIASES[_name.upper()] = (_name, _sym)
+
+def _alias_pattern(names):
+    # Short names (SBI, IT) must match in their original case to avoid "it", "sbi..." noise
+    long_names = sorted((n for n in names if len(n) > 3), key=len, reverse=True)
+    short_names = sorted((n for n in names if len(n) <= 3), key=len, reverse=True)
+    parts = []
+    if long_names:
+        parts.append((re.compile(r"\b(" + "|".join(re.escape(n) for n in long_names) + r")\b", re.IGNORECASE), False))
+    if short_names:
+        parts.append((re.compile(r"\b(" + "|".join(re.escape(n) for n in short_names) + r")\b"), True))
+    return parts
+
+_COMPANY_PATTERNS = _alias_pattern(COMPANY_ALIASES)
+_SECTOR_LOOKUP = {kw: sector for sector, kws in SECTOR_KEYWORDS.items() for kw in kws}
+_SECTOR_PATTERNS = _alias_pattern(_SECTOR_LOOKUP)
+
+# Capitalised words that are not company names on their own (headline vocabulary,
+# sentence starts, places, indices). Any other capitalised word left over after the
+# alias pass may be a company we don't know, so the LLM gets a look.
+NON_COMPANY_WORDS = frozenset("""
+    A AN THE AND OR BUT OF IN ON AT TO FOR FROM BY WITH AS AFTER BEFORE OVER UNDER AMID AHEAD
+    INTO UP DOWN OUT OFF VS IS ARE WAS WERE BE BEEN IT ITS THIS THAT THESE THOSE WHAT WHY HOW
+    WHEN WHERE WHO WILL CAN MAY NEW TOP KEY BIG HERE NOW ALSO NOT NO
+    SHARE SHARES STOCK STOCKS MARKET MARKETS INVESTORS TRADERS ANALYSTS BROKERAGE BROKERAGES
+    RISE RISES ROSE GAIN GAINS JUMP JUMPS SURGE SURGES RALLY RALLIES SOAR SOARS CLIMB CLIMBS
+    FALL FALLS FELL DROP DROPS SLIP SLIPS SLUMP SLUMPS PLUNGE PLUNGES SINK SINKS DIP DIPS TUMBLE TUMBLES
+    HIGH HIGHS LOW LOWS RECORD STRONG WEAK HIGHER LOWER FLAT MIXED
+    PROFIT PROFITS LOSS LOSSES REVENUE REVENUES SALES EARNINGS RESULTS RESULT MARGIN MARGINS
+    QUARTER QUARTERLY ANNUAL YEAR DIVIDEND BUYBACK TARGET PRICE RATING UPGRADE DOWNGRADE
+    BUY SELL HOLD DEAL DEALS ORDER ORDERS PLAN PLANS REPORT REPORTS DEMAND GROWTH OUTLOOK
+    LAUNCH LAUNCHES ANNOUNCES SAYS SAID CEO CFO MD CHAIRMAN BOARD IPO Q1 Q2 Q3 Q4 FY
+    INDIA INDIAN GLOBAL US USA UK CHINA ASIA MUMBAI DELHI NSE BSE SENSEX NIFTY RS INR CRORE LAKH
+    MONDAY TUESDAY WEDNESDAY THURSDAY FRIDAY SATURDAY SUNDAY
+    JANUARY FEBRUARY MARCH APRIL JUNE JULY AUGUST SEPTEMBER OCTOBER NOVEMBER DECEMBER
+""".split())
+_CAPITALIZED = re.compile(r"\b[A-Z][A-Za-z0-9&']*")
+
+def _is_all_caps(text):
+    letters = [ch for ch in text if ch.isalpha()]
+    return len(letters) >= 8 and sum(ch.isupper() for ch in letters) / len(letters) > 0.8
+
+def _matches(patterns, text):
+    """[(alias, start, end)]. In all-caps text short names are skipped: "WHAT IT MEANS" isn't IT."""
+    all_caps = _is_all_caps(text)
+    found = []
+    for pattern, case_sensitive in patterns:
+        if case_sensitive and all_caps:
+            continue
+        found.extend((m.group(1).upper(), m.start(), m.end()) for m in pattern.finditer(text))
+    return found
+
+def _unmatched_names(text, spans):
+    """Capitalised words outside the matched aliases that could be unknown companies."""
+    names = []
+    for m in _CAPITALIZED.finditer(text):
+        if any(start <= m.start() < end for start, end in spans):
+            continue
+        word = m.group(0).upper().removesuffix("'S")
+        if word not in NON_COMPANY_WORDS and word not in _SECTOR_LOOKUP and word not in SECTOR_NAMES:
+            names.append(m.group(0))
+    return names
+
+@traced("sentiment")
+def text_sentiment(text):
+    polarity = TextBlob(text).sentiment.polarity
+    if polarity > 0.1: return "Positive"
+    if polarity < -0.1: return "Negative"
+    return "Neutral"
+
+def dictionary_tags(text):
+    """
+    Known companies/sectors from the stocks maps, without sentiment.
+    Confident when at least one company is found, every company maps to a known
+    sector and no other capitalised name is left unmatched - then the LLM is skipped.
+    """
+    companies, tickers = [], []
+    company_matches = _matches(_COMPANY_PATTERNS, text)
+    for alias, _, _ in company_matches:
+        name, sym = COMPANY_ALIASES[alias]
+        if name not in companies:
+            companies.append(name)
+            tickers.append(sym)
+
+    sectors = []
+    for sym in tickers:
+        sector = TICKER_SECTOR.get(sym)
+        if sector and sector not in sectors:
+            sectors.append(sector)
+    for kw, _, _ in _matches(_SECTOR_PATTERNS, text):
+        sector = _SECTOR_LOOKUP[kw]
+        if sector not in sectors:
+            sectors.append(sector)
+
+    spans = [(start, end) for _, start, end in company_matches]
+    confident = (bool(companies) and bool(sectors) and all(sym in TICKER_SECTOR for sym in tickers)
+                 and not _unmatched_names(text, spans))
+    return {"companies": companies, "sectors": sectors}, confident
+
+def dictionary_extract(text):
+    """dictionary_tags plus TextBlob sentiment: a complete entities dict."""
+    tags, confident = dictionary_tags(text)
+    return {**tags, "sentiment": text_sentiment(text)}, confident
+
+# --- TOLERANT JSON PARSER ---
+def repair_json(content):
+    """
+    Best-effort fix-up of truncated or sloppy LLM JSON: strips fences and prose,
+    drops trailing commas, swaps Python-style quotes/literals and closes any
+    strings, arrays and objects left open.
+    """
+    start = content.find("{")
+    if start == -1:
+        return None
+    content = content[start:]
+
+    out, stack = [], []
+    in_string = escape = False
+    quote = '"'
+    for ch in content:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                in_string = False
+                ch = '"'
+            elif ch == '"':
+                ch = '\\"'  # A double quote inside a single-quoted string
+            out.append(ch)
+            continue
+        if ch in "\"'":
+            in_string, quote = True, ch
+            out.append('"')
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            out.append(ch)
+        elif ch in "}]":
+            # Trailing comma before a closer
+            while out and out[-1] in " \n\t,":
+                if out.pop() == ",": break
+            if stack: stack.pop()
+            out.append(ch)
+            if not stack:
+                break  # Ignore anything after the top-level object
+        else:
+            out.append(ch)
+
+    if in_string:
+        out.append('"')
+    text = "".join(out).rstrip()
+    if stack and stack[-1] == "}":
+        # Cut off after a key: drop the dangling key (with or without its colon)
+        text = re.sub(r'([{,])\s*"[^"]*"\s*:?$', r"\1", text)
+    text = text.rstrip().rstrip(",").rstrip()
+    text += "".join(reversed(stack))
+    text = re.sub(r"\bTrue\b", "true", re.sub(r"\bFalse\b", "false", re.sub(r"\bNone\b", "null", text)))
+    return text
+
+def normalize_entities(data):
+    if not isinstance(data, dict):
+        return None
+    result = {}
+    for key in ("companies", "sectors"):
+        value = data.get(key) or []
+        if isinstance(value, str): value = [v.strip() for v in value.split(",")]
+        result[key] = [str(v).strip() for v in value if v and str(v).strip()]
+    # A missing sentiment, or one outside the enum ("Pos" from a repaired cut-off
+    # answer), is left unset so the caller falls back to the TextBlob sentiment
+    sentiment = SENTIMENTS.get(str(data.get("sentiment") or "").strip().upper())
+    if sentiment:
+        result["sentiment"] = sentiment
+    return result
+
+def parse_entities(content):
+    """Returns (entities or None, was_repaired)."""
+    content = content.strip()
+    try:
+        return normalize_entities(json.loads(content)), False
+    except ValueError:
+        pass
+    repaired = repair_json(content)
+    if repaired is None:
+        return None, True
+    try:
+        return normalize_entities(json.loads(repaired)), True
+    except ValueError:
+        return None, True
+
+def parse_packed(content, count):
+    """Returns {index: entities} for every item (1..count) that parsed cleanly."""
+    try:
+        data = json.loads(content)
+    except ValueError:
+        repaired = repair_json(content)
+        try:
+            data = json.loads(repaired) if repaired else None
+        except ValueError:
+            data = None
+    if not isinstance(data, dict) or not isinstance(data.get("articles"), list):
+        return {}
+    parsed = {}
+    for item in data["articles"]:
+        # A section cut short by truncation is retried rather than half-trusted
+        if not isinstance(item, dict) or not all(k in item for k in ENTITY_SCHEMA["required"]): continue
+        try:
+            index = int(item.get("index"))
+        except (TypeError, ValueError):
+            continue
+        entities = normalize_entities(item)
+        if 1 <= index <= count and entities is not None:
+            parsed[index] = entities
+    return parsed
+
+# --- LLM CALLS ---
+SINGLE_PROMPT = """
+    You are a Senior Financial Analyst. Analyze this news.
+    1. Identify Companies (e.g., 'Zomato', 'HDFC Bank').
+    2. Identify the SPECIFIC Sector (e.g., 'Consumer Tech', 'Banking', 'Energy', 'Commodities').
+    3. Identify Sentiment (Positive/Negative).
+
+    CRITICAL: Do not guess. If it's about food delivery, the sector is 'Consumer Tech', NOT 'Commodities'.
+
+    Return JSON ONLY:
+    {{
+        "companies": ["Name"],
+        "sectors": ["Specific Sector"],
+        "sentiment": "string"
+    }}
+    
+    News: {text}
+    """
+
+PACKED_PROMPT = """
+    You are a Senior Financial Analyst. Analyze EACH numbered news item below separately.
+    1. Identify Companies (e.g., 'Zomato', 'HDFC Bank').
+    2. Identify the SPECIFIC Sector (e.g., 'Consumer Tech', 'Banking', 'Energy', 'Commodities').
+    3. Identify Sentiment (Positive/Negative).
+
+    CRITICAL: Do not guess. If it's about food delivery, the sector is 'Consumer Tech', NOT 'Commodities'.
+
+    Return JSON ONLY, one entry per item, using the item's number as "index":
+    {{
+        "articles": [
+            {{"index": 1, "companies": ["Name"], "sectors": ["Specific Sector"], "sentiment": "string"}}
+        ]
+    }}
+
+    News:
+{items}
+    """
+
+def llm_extract(llm, text):
+    """One article, one call. Returns entities, or None if the call failed or was unparseable."""
+    record(llm_calls=1)
+    try:
+        with span("llm_call"):
+            response = llm.invoke([HumanMessage(content=SINGLE_PROMPT.format(text=text))])
+    except Exception as e:
+        # Callers fall back to the dictionary entities for this article only
+        print(f" -> LLM extraction failed: {e}")
+        record(llm_failed=1)
+        return None
+    data, repaired = parse_entities(response.content)
+    if data is None:
+        record(parse_failed=1)
+    elif repaired:
+        record(parse_repaired=1)
+    return data
+
+def pack_groups(texts):
+    """Splits article indexes into packs of short items; long items go alone."""
+    groups, current, size = [], [], 0
+    for i, text in enumerate(texts):
+        if len(text) > PACK_MAX_CHARS:
+            groups.append([i])
+            continue
+        if current and (len(current) >= PACK_SIZE or size + len(text) > PACK_BUDGET_CHARS):
+            groups.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += len(text)
+    if current:
+        groups.append(current)
+    return groups
+
+def llm_extract_packed(llm, packed_llm, texts):
+    """
+    Extracts entities for many articles with as few calls as possible.
+    Items whose section of a packed answer fails to parse are retried one by one.
+    Returns a list aligned with texts (None where even the retry failed).
+    """
+    results = [None] * len(texts)
+    for group in pack_groups(texts):
+        if len(group) == 1:
+            results[group[0]] = llm_extract(llm, texts[group[0]])
+            continue
+        items = "\n".join(f"    [{n}] {' '.join(texts[i].split())}" for n, i in enumerate(group, 1))
+        record(llm_calls=1, packed_calls=1, packed_articles=len(group))
+        try:
+            with span("llm_call"):
+                response = packed_llm.invoke([HumanMessage(content=PACKED_PROMPT.format(items=items))])
+            parsed = parse_packed(response.content, len(group))
+        except Exception as e:
+            print(f" -> Packed extraction failed: {e}")
+            parsed = {}
+        for n, i in enumerate(group, 1):
+            if n in parsed:
+                results[i] = parsed[n]
+            else:
+                record(packed_retries=1)
+                results[i] = llm_extract(llm, texts[i])
+    return results
+
+# --- STATS ---
+EXTRACTION_STATS = {"articles": 0, "dictionary_only": 0, "llm_calls": 0, "llm_failed": 0, "parse_repaired": 0, "parse_failed": 0,
+                    "packed_calls": 0, "packed_articles": 0, "packed_retries": 0}
+_stats_lock = threading.Lock()
+
+def record(**counts):
+    with _stats_lock:
+        for key, value in counts.items():
+            EXTRACTION_STATS[key] += value
+
+def extraction_report():
+    with _stats_lock:
+        stats = dict(EXTRACTION_STATS)
+    stats["no_llm_fraction"] = round(stats["dictionary_only"] / stats["articles"], 3) if stats["articles"] else 0.0
+    return stats
@@ -1,8 +1,11 @@
 import streamlit as st
 import requests
 import time
+import json
+from websocket import create_connection, WebSocketTimeoutException
 
 API_URL = "http://localhost:8002"  # CORRECTED: Backend runs on 8002
+WS_URL = API_URL.replace("http", "ws", 1)
 
 # --- THEME MANAGEMENT ---
 if 'theme' not in st.session_state:
@@ -216,6 +219,46 @@ def fetch_data_with_visuals(query):
 
     return data, news_data
 
+# --- LIVE TICKER (WebSocket subscription, no polling) ---
+# One socket per browser session, kept in session_state across reruns. Each
+# rerun applies whatever the server pushed since the last one.
+def fetch_ticker_quotes():
+    """Current quotes from the session's ticker subscription (snapshot + deltas)"""
+    quotes = st.session_state.get('ticker_quotes', {})
+    ws = st.session_state.get('ticker_ws')
+    try:
+        if ws is None:
+            ws = create_connection(f"{WS_URL}/ws/ticker", timeout=3)
+            st.session_state.ticker_ws = ws
+            quotes = {}
+        # Block for the first snapshot only; after that just drain what is already waiting
+        ws.settimeout(3 if not quotes else 0.05)
+        while True:
+            message = json.loads(ws.recv())
+            if message.get("type") == "snapshot":
+                quotes = dict(message.get("data", {}))
+            else:
+                quotes.update(message.get("data", {}))
+            ws.settimeout(0.05)
+    except WebSocketTimeoutException:
+        pass
+    except Exception:
+        # Server restarted or socket dropped: reconnect (and resync) on the next rerun
+        if ws is not None:
+            ws.close()
+        st.session_state.ticker_ws = None
+    st.session_state.ticker_quotes = quotes
+    return quotes
+
+def render_ticker_strip():
+    quotes = fetch_ticker_quotes()
+    indices = [q for sym, q in quotes.items() if sym.startswith("^")]
+    if not indices: return
+    st.markdown("---")
+    st.caption("📡 Live Ticker")
+    for q in indices:
+        st.metric(q['name'], q['price'], f"{q['percent_change']}%")
+
 # --- RENDER FUNCTIONS (Stocks, Grid, News) ---
 def render_stock(data):
     info = data['data']
@@ -264,9 +307,13 @@ def render_news(articles):
         sent = item.get('sentiment', '⚪ Neutral')
         sent_badge = f'<span style="border:1px solid #555; padding:2px 6px; border-radius:4px; font-size:10px; margin-left:5px;">{sent}</span>'
 
+        # Story clusters: same event covered by several outlets
+        more = item.get('source_count', 1) - 1
+        coverage = f" +{more} more source{'s' if more > 1 else ''}" if more > 0 else ""
+
         st.markdown(f"""
         <div class="news-card">
-            <div style="font-size:11px; color:#888;">{badge} {sent_badge} 📅 {item['date']} | {item['source']}</div>
+            <div style="font-size:11px; color:#888;">{badge} {sent_badge} 📅 {item['date']} | {item['source']}{coverage}</div>
             <div style="font-weight:600; font-size:16px; margin: 5px 0;">{item['text']}</div>
             <a href="{item['link']}" target="_blank" style="color:#4CAF50; text-decoration:none; font-size:12px;">Read Full Story ↗</a>
         </div>
@@ -365,6 +412,7 @@ with st.sidebar:
     st.divider()
     btn_label = "☀️ Light Mode" if st.session_state.theme == 'dark' else "🌙 Dark Mode"
     st.button(btn_label, on_click=toggle_theme)
+    render_ticker_strip()
     st.markdown("---")
     st.caption("Built by **Raghuram K S**")
 
@@ -491,6 +539,16 @@ if page == "🚀 Terminal":
     <div style="width:30%; text-align:center; color:{color2}; font-weight:bold;">{val2}</div>
 </div>"""
                             
+                            # TECHNICALS (from the indicator engine)
+                            t1 = d1.get('indicators') or {}
+                            t2 = d2.get('indicators') or {}
+                            tech_rows = ""
+                            if t1 and t2:
+                                for label, key in [("1M Return (%)", "return_1m"), ("1Y Return (%)", "return_1y"),
+                                                   ("Volatility (%)", "volatility"), ("RSI (14)", "rsi_14"),
+                                                   ("Beta vs NIFTY", "beta"), ("Max Drawdown (%)", "max_drawdown")]:
+                                    tech_rows += metric_row(label, t1[key], t2[key])
+
                             html_content = f"""
 <div style="background-color:#1e1e1e; border-radius:10px; padding:15px;">
     <div style="display:flex; justify-content:space-between; font-size:18px; font-weight:bold; margin-bottom:15px; border-bottom:2px solid #555; padding-bottom:10px;">
@@ -501,6 +559,7 @@ if page == "🚀 Terminal":
     {metric_row("Price (₹)", d1['price'], d2['price'])}
     {metric_row("Day Change (%)", d1['percent_change'], d2['percent_change'])}
     {metric_row("P/E Ratio", d1.get('pe_ratio',0) or 0, d2.get('pe_ratio',0) or 0)}
+    {tech_rows}
 </div>"""
                             st.markdown(html_content, unsafe_allow_html=True)
                             
@@ -0,0 +1,175 @@
+# governor.py
+import os
+import threading
+import time
+
+# --- UPSTREAM GOVERNOR ---
+# One governor per upstream host (Yahoo Finance, Google News), shared by every
+# caller: request path, ticker, prefetcher, crawler and history store.
+#   - token bucket: caps our request rate; the rate halves on 429s (or a run of
+#     empty answers for different keys) and creeps back up on successes (AIMD)
+#   - circuit breaker: after repeated failures calls fail fast for a cooldown
+#     that doubles while the host keeps failing; callers serve last-known-good data
+
+class UpstreamUnavailable(Exception):
+    """Raised (or signalled) when a call is shed instead of sent upstream."""
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now):
+        """Takes a token, returning how long the caller must wait for it."""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens += 1
+
+class HostGovernor:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name, rate=5.0, burst=10, max_wait=2.0, failure_threshold=5,
+                 cooldown=30.0, max_cooldown=600.0, min_rate=0.2, empty_threshold=3, empty_window=60.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_wait = max_wait
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.min_rate = min_rate
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self.empty_threshold = empty_threshold
+        self.empty_window = empty_window
+        self._empty_keys = {}  # key -> when it last came back empty
+        self._lock = threading.Lock()
+        self.stats = {"allowed": 0, "shed_open": 0, "shed_rate": 0, "successes": 0,
+                      "failures": 0, "throttled": 0, "empty": 0, "trips": 0}
+
+    def acquire(self):
+        """
+        True if the caller may go upstream (after any rate-limit wait).
+        False means shed: breaker open, or the bucket wait would exceed max_wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self.opened_at < self.cooldown:
+                    self.stats["shed_open"] += 1
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                # One probe at a time decides whether the host is back
+                if self._trial_in_flight:
+                    self.stats["shed_open"] += 1
+                    return False
+                self._trial_in_flight = True
+            wait = self.bucket.reserve(now)
+            if wait > self.max_wait:
+                self.bucket.refund()
+                self._trial_in_flight = False
+                self.stats["shed_rate"] += 1
+                return False
+            self.stats["allowed"] += 1
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.failures = 0
+            self._trial_in_flight = False
+            if self.state != self.CLOSED:
+                print(f"Upstream {self.name}: circuit closed.")
+            self.state = self.CLOSED
+            self.cooldown = self.base_cooldown
+            # Additive increase back towards the configured rate
+            bucket = self.bucket
+            bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate * 0.05)
+
+    def failure(self, throttled=False):
+        """throttled=True for 429s: also halves the request rate."""
+        with self._lock:
+            self.stats["failures"] += 1
+            self._trial_in_flight = False
+            if throttled:
+                self.stats["throttled"] += 1
+                self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # Probe failed: back off harder before the next one
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+                self._trip()
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._trip()
+
+    def empty(self, key):
+        """
+        An empty answer for key. One on its own is a normal reply (unknown symbol,
+        quiet topic) and counts as a success; empty_threshold distinct keys empty
+        within empty_window seconds look like quiet throttling and count as a
+        throttled failure.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.stats["empty"] += 1
+            self._empty_keys[key] = now
+            for k, at in list(self._empty_keys.items()):
+                if now - at > self.empty_window:
+                    del self._empty_keys[k]
+            throttled = len(self._empty_keys) >= self.empty_threshold
+        if throttled:
+            self.failure(throttled=True)
+        else:
+            self.success()
+        return throttled
+
+    def _trip(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.stats["trips"] += 1
+        print(f"Upstream {self.name}: circuit open for {self.cooldown:.0f}s after {self.failures} failures.")
+
+    def status(self):
+        with self._lock:
+            retry_in = None
+            if self.state == self.OPEN:
+                retry_in = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+            return {"state": self.state, "consecutive_failures": self.failures,
+                    "rate_per_sec": round(self.bucket.rate, 3), "max_rate_per_sec": self.bucket.max_rate,
+                    "cooldown_s": self.cooldown, "retry_in_s": retry_in, **self.stats}
+
+def is_throttle_error(e):
+    """yfinance raises YFRateLimitError; plain HTTP clients mention 429."""
+    return type(e).__name__ == "YFRateLimitError" or "429" in str(e) or "Too Many Requests" in str(e)
+
+# Global instances (rates tunable from the environment)
+yahoo = HostGovernor(
+    "yahoo",
+    rate=float(os.environ.get("YAHOO_RATE_PER_SEC", 5)),
+    burst=int(os.environ.get("YAHOO_BURST", 10))
+)
+googlenews = HostGovernor(
+    "googlenews",
+    rate=float(os.environ.get("GOOGLENEWS_RATE_PER_SEC", 0.5)),
+    burst=int(os.environ.get("GOOGLENEWS_BURST", 3)),
+    max_wait=5.0
+)
+GOVERNORS = {"yahoo": yahoo, "googlenews": googlenews}
+
+def governor_report():
+    return {name: gov.status() for name, gov in GOVERNORS.items()}
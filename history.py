@@ -0,0 +1,125 @@
+# history.py
+import os
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+from market_calendar import market_for, last_close, SESSIONS
+from governor import yahoo, is_throttle_error
+
+# --- OHLCV HISTORY STORE ---
+# One Parquet file per (interval, symbol) under ./history_db.
+# Updates only download the bars after the last one on disk.
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# How far back the first download goes (Yahoo caps intraday history)
+INITIAL_PERIOD = {"1d": "5y", "1h": "730d", "15m": "60d", "5m": "60d"}
+# Minimum seconds between upstream tail checks for the same file
+REFRESH_EVERY = {"1d": 3600, "1h": 900, "15m": 300, "5m": 120}
+
+class HistoryStore:
+    def __init__(self, db_path="./history_db"):
+        self.db_path = db_path
+        self._frames = {}  # (symbol, interval) -> (mtime, DataFrame)
+        self._last_checked = {}
+        self._lock = threading.Lock()
+
+    def _path(self, symbol, interval):
+        if interval not in INITIAL_PERIOD:
+            raise ValueError(f"interval must be one of {list(INITIAL_PERIOD)}")
+        safe = symbol.replace("/", "_").replace("^", "IDX_")
+        return os.path.join(self.db_path, interval, f"{safe}.parquet")
+
+    def load(self, symbol, interval="1d"):
+        """Full stored series (cached in memory until the file changes)."""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="ts"))
+        mtime = os.path.getmtime(path)
+        key = (symbol, interval)
+        with self._lock:
+            cached = self._frames.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        df = pd.read_parquet(path)
+        with self._lock:
+            self._frames[key] = (mtime, df)
+        return df
+
+    def _is_up_to_date(self, symbol, interval, df):
+        if df.empty:
+            return False
+        market = market_for(symbol)
+        if interval == "1d" and market in SESSIONS:
+            closed_at = last_close(market)
+            # Market shut and the last session's bar is already stored. Daily bars are stamped at
+            # the exchange's midnight, so compare session dates there, not in UTC (IST is a day behind)
+            tz = SESSIONS[market]["tz"]
+            if closed_at is not None and df.index[-1].tz_convert(tz).date() >= closed_at.astimezone(tz).date():
+                return True
+        checked = self._last_checked.get((symbol, interval), 0)
+        return time.time() - checked < REFRESH_EVERY.get(interval, 300)
+
+    def update(self, symbol, interval="1d", force=False):
+        """Downloads only the missing tail and appends it. Returns rows added."""
+        df = self.load(symbol, interval)
+        if not force and self._is_up_to_date(symbol, interval, df):
+            return 0
+
+        if not yahoo.acquire():
+            return 0  # Yahoo shedding: keep serving what's stored
+        ticker = yf.Ticker(symbol)
+        try:
+            if df.empty:
+                new = ticker.history(period=INITIAL_PERIOD.get(interval, "1mo"), interval=interval)
+            else:
+                # Re-fetch the last bar too: today's daily bar is still forming
+                new = ticker.history(start=df.index[-1].to_pydatetime(), interval=interval)
+        except Exception as e:
+            print(f"History fetch error for {symbol}: {e}")
+            yahoo.failure(throttled=is_throttle_error(e))
+            return 0
+        if (new is None or new.empty) and df.empty:
+            yahoo.empty(symbol)  # Nothing for a full period: bad symbol, or throttling if it keeps happening
+            return 0
+        yahoo.success()
+        self._last_checked[(symbol, interval)] = time.time()
+        if new is None or new.empty:
+            return 0
+
+        new = new.rename(columns=str.lower)[COLUMNS]
+        new.index = pd.DatetimeIndex(new.index).tz_convert("UTC")
+        new.index.name = "ts"
+
+        before = len(df)
+        merged = pd.concat([df, new]) if before else new
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        merged.to_parquet(path)
+        return len(merged) - before
+
+    def get_range(self, symbol, interval="1d", start=None, end=None, refresh=True):
+        if refresh:
+            self.update(symbol, interval)
+        df = self.load(symbol, interval)
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start, tz="UTC")]
+        if end is not None:
+            df = df[df.index <= pd.Timestamp(end, tz="UTC")]
+        return df
+
+    def get_many(self, symbols, interval="1d", start=None, end=None, refresh=True):
+        return {sym: self.get_range(sym, interval, start, end, refresh) for sym in symbols}
+
+def to_columns(df):
+    """DataFrame -> JSON-friendly columnar dict for charts."""
+    out = {"ts": [ts.isoformat() for ts in df.index]}
+    for col in COLUMNS:
+        out[col] = df[col].round(4).tolist()
+    return out
+
+# Global instance
+history_store = HistoryStore()
@@ -0,0 +1,117 @@
+# indicators.py
+import threading
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from history import history_store
+from market_calendar import SESSIONS, is_market_open, last_close
+
+# --- TECHNICAL INDICATOR ENGINE ---
+# All symbols are stacked into one (symbols x days) close matrix and every
+# indicator is computed across the whole matrix in a single NumPy pass.
+
+BENCHMARK = "^NSEI"
+LOOKBACK = 252      # ~1 trading year of daily bars
+RSI_PERIOD = 14
+
+_cache = {}  # (symbol, trade_day) -> indicator dict, current session only
+_cache_lock = threading.Lock()
+
+def trade_day():
+    """Current NSE session date, or the last one while the market is closed."""
+    if is_market_open("NSE"):
+        return datetime.now(SESSIONS["NSE"]["tz"]).date()
+    closed_at = last_close("NSE")
+    return closed_at.date() if closed_at else datetime.now(SESSIONS["NSE"]["tz"]).date()
+
+def _close_matrix(symbols):
+    frames = history_store.get_many(symbols + [BENCHMARK])
+    series = {sym: df["close"] for sym, df in frames.items() if not df.empty}
+    if not series:
+        return pd.DataFrame()
+    closes = pd.concat(series, axis=1)
+    closes.index = closes.index.normalize()
+    closes = closes.groupby(level=0).last().ffill().bfill().tail(LOOKBACK + 1)
+    return closes
+
+def compute_indicators(closes, bench):
+    """
+    closes: (n, T) float array, bench: (T,) benchmark closes.
+    Returns a dict of (n,) arrays.
+    """
+    log_rets = np.diff(np.log(closes), axis=1)
+    bench_rets = np.diff(np.log(bench))
+
+    # Returns over fixed horizons
+    def horizon(days):
+        days = min(days, closes.shape[1] - 1)
+        return (closes[:, -1] / closes[:, -1 - days] - 1) * 100
+
+    # Volatility (annualised) and beta vs the benchmark
+    vol = log_rets.std(axis=1, ddof=1) * np.sqrt(252) * 100
+    centered = log_rets - log_rets.mean(axis=1, keepdims=True)
+    bench_centered = bench_rets - bench_rets.mean()
+    beta = centered @ bench_centered / (bench_centered @ bench_centered)
+
+    # Moving averages
+    sma20 = closes[:, -20:].mean(axis=1)
+    sma50 = closes[:, -50:].mean(axis=1)
+
+    # RSI with Wilder smoothing, expressed as exponential weights over the window
+    deltas = np.diff(closes, axis=1)
+    gains = np.clip(deltas, 0, None)
+    losses = np.clip(-deltas, 0, None)
+    alpha = 1 / RSI_PERIOD
+    weights = (1 - alpha) ** np.arange(deltas.shape[1])[::-1]
+    avg_gain = gains @ weights
+    avg_loss = losses @ weights
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+
+    # Drawdown from the running peak
+    drawdown = closes / np.maximum.accumulate(closes, axis=1) - 1
+
+    return {
+        "return_1d": horizon(1),
+        "return_1w": horizon(5),
+        "return_1m": horizon(21),
+        "return_1y": horizon(LOOKBACK),
+        "volatility": vol,
+        "sma_20": sma20,
+        "sma_50": sma50,
+        "above_sma_50": closes[:, -1] > sma50,
+        "rsi_14": rsi,
+        "beta": beta,
+        "max_drawdown": drawdown.min(axis=1) * 100,
+        "current_drawdown": drawdown[:, -1] * 100,
+    }
+
+def get_indicators(symbols):
+    """
+    Indicator sets for several symbols, cached per symbol and trading day.
+    Only the uncached symbols go through the matrix pass.
+    """
+    day = trade_day()
+    with _cache_lock:
+        result = {sym: _cache[(sym, day)] for sym in symbols if (sym, day) in _cache}
+    missing = [sym for sym in symbols if sym not in result]
+    if not missing:
+        return result
+
+    closes = _close_matrix(missing)
+    if BENCHMARK not in closes:
+        print("Indicator engine: benchmark history unavailable.")
+        return result
+    available = [sym for sym in missing if sym in closes]
+    if available and len(closes) > 1:
+        values = compute_indicators(closes[available].to_numpy().T, closes[BENCHMARK].to_numpy())
+        with _cache_lock:
+            # Earlier sessions are never read again
+            for key in [key for key in _cache if key[1] < day]:
+                del _cache[key]
+            for i, sym in enumerate(available):
+                row = {name: round(float(arr[i]), 2) for name, arr in values.items() if name != "above_sma_50"}
+                row["above_sma_50"] = bool(values["above_sma_50"][i])
+                _cache[(sym, day)] = row
+                result[sym] = row
+    return result
@@ -0,0 +1,186 @@
+# ingest_queue.py
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --- DURABLE INGESTION QUEUE ---
+# /ingest only writes a row here and returns. A pool of worker threads drains
+# the queue in batches through the graph pipeline. Rows survive restarts:
+# anything left 'processing' by a crash is put back in the queue on startup.
+
+class IngestQueue:
+    def __init__(self, db_path="./ingest_queue.db", max_attempts=3, retry_backoff=30):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',  -- queued | processing | done | duplicate | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                available_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at, id);
+        """)
+        recovered = self.conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'processing'").rowcount
+        self.conn.commit()
+        if recovered:
+            print(f"Ingest queue: re-queued {recovered} in-flight jobs after restart.")
+
+    def enqueue(self, texts):
+        if isinstance(texts, str): texts = [texts]
+        now = time.time()
+        with self._lock:
+            ids = []
+            for text in texts:
+                cur = self.conn.execute(
+                    "INSERT INTO jobs (text, enqueued_at, available_at) VALUES (?, ?, ?)", (text, now, now))
+                ids.append(cur.lastrowid)
+            self.conn.commit()
+        return ids
+
+    def claim(self, batch_size):
+        """Atomically moves up to batch_size ready jobs to 'processing'."""
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute("""
+                UPDATE jobs SET status = 'processing', started_at = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM jobs WHERE status = 'queued' AND available_at <= ?
+                    ORDER BY id LIMIT ?
+                )
+                RETURNING id, text
+            """, (now, now, batch_size)).fetchall()
+            self.conn.commit()
+        return sorted(rows)
+
+    def complete(self, job_id, result):
+        status = "duplicate" if result.get("is_duplicate") else "done"
+        with self._lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = NULL WHERE id = ?",
+                (status, time.time(), json.dumps(result), job_id))
+            self.conn.commit()
+
+    def fail(self, job_id, error):
+        """Retries with linear backoff until max_attempts, then marks the job failed."""
+        now = time.time()
+        with self._lock:
+            attempts = self.conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            if attempts < self.max_attempts:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'queued', available_at = ?, error = ? WHERE id = ?",
+                    (now + self.retry_backoff * attempts, str(error), job_id))
+            else:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                    (now, str(error), job_id))
+            self.conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, status, attempts, enqueued_at, started_at, finished_at, result, error FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0], "status": row[1], "attempts": row[2],
+            "enqueued_at": row[3], "started_at": row[4], "finished_at": row[5],
+            "result": json.loads(row[6]) if row[6] else None, "error": row[7]
+        }
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self.conn.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        return {
+            "depth": counts.get("queued", 0),
+            "processing": counts.get("processing", 0),
+            "lag_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+            "counts": counts
+        }
+
+class IngestWorkerPool:
+    def __init__(self, job_queue, workers=2, batch_size=8, idle_sleep=1.0):
+        self.queue = job_queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self._stop = threading.Event()
+        self._threads = []
+        # Per-stage totals for throughput: seconds spent and articles seen
+        self.stage_seconds = {}
+        self.processed = 0
+        self._stats_lock = threading.Lock()
+
+    def _run(self):
+        # Imported here so the queue module stays importable without the model stack
+        from graph import process_batch
+        while not self._stop.is_set():
+            jobs = self.queue.claim(self.batch_size)
+            if not jobs:
+                self._stop.wait(self.idle_sleep)
+                continue
+            timings = {}
+            try:
+                results = process_batch([text for _, text in jobs], timings=timings)
+            except Exception as e:
+                # Per-article errors come back as results; this is the shared batch embedding
+                print(f"Ingest batch failed: {e}")
+                for job_id, _ in jobs:
+                    self.queue.fail(job_id, e)
+                continue
+            for (job_id, _), result in zip(jobs, results):
+                if "error" in result:
+                    self.queue.fail(job_id, result["error"])
+                else:
+                    self.queue.complete(job_id, result)
+            with self._stats_lock:
+                self.processed += len(jobs)
+                for stage, seconds in timings.items():
+                    self.stage_seconds[stage] = self.stage_seconds.get(stage, 0) + seconds
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"ingest-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self._threads = []
+
+    def stats(self):
+        with self._stats_lock:
+            stages = {
+                stage: {"seconds": round(sec, 2),
+                        "articles_per_sec": round(self.processed / sec, 2) if sec else None}
+                for stage, sec in self.stage_seconds.items()
+            }
+            processed = self.processed
+        return {"workers": self.workers, "batch_size": self.batch_size, "processed": processed,
+                "stages": stages, **self.queue.stats()}
+
+# Global instances
+ingest_queue = IngestQueue(max_attempts=int(os.environ.get("INGEST_MAX_ATTEMPTS", 3)))
+ingest_workers = IngestWorkerPool(
+    ingest_queue,
+    workers=int(os.environ.get("INGEST_WORKERS", 2)),
+    batch_size=int(os.environ.get("INGEST_BATCH_SIZE", 8))
+)
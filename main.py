@@ -1,9 +1,43 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+import asyncio
+import os
+import sys
+import time
+
+# --- RUNNER ---
+# `python main.py` re-execs as `python -m uvicorn main:app` before anything heavy is
+# imported. Spawned workers (the doc_jobs extraction pool) re-import the __main__ module;
+# as uvicorn's __main__ they skip it, instead of reloading every store and re-running
+# the restart recovery of the ingest queue and doc jobs.
+if __name__ == "__main__":
+    # Runs the server on port 8002
+    os.execv(sys.executable, [sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8002",
+                              "--app-dir", os.path.dirname(os.path.abspath(__file__))])
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from graph import app as pipeline_app
+from typing import List, Optional
 from database import global_db
-from stocks import resolve_query, get_live_data, get_commodity_snapshot, get_market_overview, get_market_ticker # <--- UPDATE IMPORTS
-from processor import search_topic_news, extract_text_from_pdf, extract_text_from_url, analyze_document_content, llm_analyst
+from stocks import resolve_query, get_live_data, get_commodity_snapshot, get_market_overview, get_market_ticker, QUOTE_STATS # <--- UPDATE IMPORTS
+from market_calendar import SESSIONS, is_market_open, next_open
+from processor import search_topic_news, score_article, extract_text_from_pdf, extract_text_from_url, analyze_document_content, llm_analyst
+from ticker import ticker_service
+from prefetch import prefetcher
+from history import history_store, to_columns, INITIAL_PERIOD as HISTORY_INTERVALS
+from indicators import get_indicators
+from entity_index import entity_index, canonical_sector
+from sentiment_rollup import sentiment_rollups
+from extraction import extraction_report, EXTRACTION_STATS
+from ingest_queue import ingest_queue, ingest_workers
+from crawler import news_crawler
+from query_cache import query_cache
+from governor import governor_report
+from watchlist import resolve_many, quote_page, stream_watchlist, summarize, to_json_columns, MAX_SYMBOLS
+from screener import screener, to_json_rows
+from stories import story_feed
+from alerts import alert_engine, KINDS as ALERT_KINDS
+from doc_jobs import doc_jobs
+from telemetry import TRACING_ENABLED, span, record_span, start_request, end_request, timing_header, render_metrics
 from langchain_core.messages import HumanMessage
 
 from fastapi.middleware.cors import CORSMiddleware
@@ -18,16 +52,103 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Send X-Timing on every response, not only when the client asks with "X-Timing: 1"
+TIMING_HEADER = os.environ.get("TIMING_HEADER", "0") == "1"
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not TRACING_ENABLED:
+        return await call_next(request)
+    spans, token = start_request()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        end_request(token)
+    # Route template, not the raw path, so /ingest/{job_id} is one series
+    route = request.scope.get("route")
+    record_span(f"http {getattr(route, 'path', 'unmatched')}", time.perf_counter() - start)
+    if TIMING_HEADER or request.headers.get("X-Timing"):
+        response.headers["X-Timing"] = timing_header(spans)
+    return response
+
 class NewsRequest(BaseModel):
     text: str
 
 class QueryRequest(BaseModel):
     query: str
 
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 5
+    companies: Optional[List[str]] = None
+    sectors: Optional[List[str]] = None
+    since: Optional[int] = None  # epoch seconds
+    until: Optional[int] = None
+    mode: str = "hybrid"  # or "vector"
+
+class WatchlistItem(BaseModel):
+    query: str  # ticker or name: 'TCS.NS', 'Dominos'
+    quantity: float = 0
+    avg_cost: Optional[float] = None
+
+class WatchlistRequest(BaseModel):
+    items: List[WatchlistItem]
+    page: int = 1
+    page_size: int = 100
+    stream: bool = False  # NDJSON chunks for the whole list as quotes arrive
+
+class AlertRuleRequest(BaseModel):
+    query: str  # ticker or name, resolved like watchlist entries
+    kind: str  # above, below, move (percent), sentiment_positive, sentiment_negative
+    threshold: float = 0.0
+    user: str = "default"
+    webhook: Optional[str] = None  # POSTed the alert JSON; WebSocket subscribers get it either way
+
 class CompareRequest(BaseModel):
     stock1: str
     stock2: str
 
+def run_shard_maintenance():
+    """Retention + compaction for the time-sharded news store"""
+    report = global_db.run_maintenance()
+    report["entity_rows_pruned"] = entity_index.prune(report["retention"]["cutoff"])
+    report["crawler_keys_pruned"] = news_crawler.seen.prune(report["retention"]["cutoff"])
+    report["story_articles_expired"] = story_feed.expire()
+    report["sentiment_ledger_pruned"] = sentiment_rollups.prune_counted(report["retention"]["cutoff"])
+    return report
+
+async def shard_maintenance_loop(interval=6 * 3600):
+    while True:
+        try:
+            await asyncio.to_thread(run_shard_maintenance)
+        except Exception as e:
+            print(f"Shard maintenance error: {e}")
+        await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_background_services():
+    ticker_service.start()
+    prefetcher.start()
+    ingest_workers.start()
+    news_crawler.start()
+    screener.start()
+    alert_engine.start()
+    if sentiment_rollups.is_empty():
+        asyncio.create_task(asyncio.to_thread(sentiment_rollups.backfill, entity_index))
+    ticker_service.watch(alert_engine.symbols(), owner="alerts")
+    app.state.maintenance_task = asyncio.create_task(shard_maintenance_loop())
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    ticker_service.stop()
+    prefetcher.stop()
+    ingest_workers.stop()
+    news_crawler.stop()
+    screener.stop()
+    doc_jobs.shutdown()
+    app.state.maintenance_task.cancel()
+
 @app.get("/")
 def home():
     return {"status": "System Online", "backend": "Local / Ollama"}
@@ -35,11 +156,98 @@ def home():
 @app.get("/market_summary")
 def market_summary():
     """Returns Indices and Top Movers"""
-    return get_market_overview()
+    # Served from the ticker snapshot; only hit Yahoo before the first refresh
+    return ticker_service.market_overview() or get_market_overview()
+
+@app.get("/market_status")
+def market_status():
+    """Which markets are trading right now, and how many quote calls were skipped"""
+    markets = {}
+    for market in SESSIONS:
+        opens = next_open(market)
+        markets[market] = {
+            "is_open": is_market_open(market),
+            "next_open": opens.isoformat() if opens else None
+        }
+    return {"markets": markets, "quote_stats": QUOTE_STATS}
+
+@app.get("/upstream_status")
+def upstream_status():
+    """Rate limit, circuit breaker state and shed counts per upstream host"""
+    return {"hosts": governor_report(), "stale_quotes_served": QUOTE_STATS["stale_served"]}
+
+# Alerts are evaluated on every ticker refresh (changed symbols only) and on every stored article
+ticker_service.on_delta(alert_engine.evaluate)
+entity_index.on_article(alert_engine.on_article)
+
+@app.post("/alerts")
+def create_alert(req: AlertRuleRequest):
+    if req.kind not in ALERT_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {sorted(ALERT_KINDS)}")
+    symbol = resolve_many([req.query]).get(req.query)
+    if not symbol:
+        raise HTTPException(status_code=404, detail=f"Could not resolve '{req.query}' to a stock")
+    try:
+        rule_id = alert_engine.add_rule(symbol, req.kind, req.threshold, user=req.user, webhook=req.webhook)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ticker_service.watch(symbol, owner="alerts")
+    return {"status": "success", "id": rule_id, "symbol": symbol}
+
+@app.get("/alerts")
+def list_alerts(user: str = "default"):
+    return {"user": user, "rules": alert_engine.list_rules(user)}
+
+@app.delete("/alerts/{rule_id}")
+def delete_alert(rule_id: int, user: str = "default"):
+    symbol = alert_engine.remove_rule(rule_id, user=user)
+    if symbol is None:
+        raise HTTPException(status_code=404, detail="Unknown alert")
+    if symbol not in alert_engine.symbols():
+        ticker_service.unwatch("alerts", symbol)
+    return {"status": "success"}
+
+@app.get("/alerts/status")
+def alerts_status():
+    """Rule count, evaluation cost of the last refresh and delivery counters"""
+    return alert_engine.status()
+
+@app.websocket("/ws/alerts")
+async def alerts_socket(websocket: WebSocket, user: str = ""):
+    """Pushes fired alerts; ?user= limits them to one user's rules."""
+    await websocket.accept()
+    queue = alert_engine.subscribe(user or None)
+    try:
+        while True:
+            await websocket.send_json(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        alert_engine.unsubscribe(queue)
+
+@app.websocket("/ws/ticker")
+async def ticker_socket(websocket: WebSocket, symbols: str = ""):
+    """
+    Live ticker push. Sends the full snapshot once, then only deltas.
+    Optional ?symbols=TCS.NS,INFY.NS adds symbols to the shared schedule while connected.
+    """
+    await websocket.accept()
+    queue = ticker_service.subscribe(symbols.split(",") if symbols else ())
+    try:
+        # Copy: the refresh thread updates the snapshot while it is encoded
+        await websocket.send_json({"type": "snapshot", "data": dict(ticker_service.snapshot)})
+        while True:
+            message = await queue.get()
+            await websocket.send_json(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ticker_service.unsubscribe(queue)
 
 @app.post("/resolve_and_fetch")
 def resolve_and_fetch(req: QueryRequest):
     res = resolve_query(req.query)
+    prefetcher.record(req.query, res)
     
     # 1. COMMODITY MARKET
     if res['type'] == 'commodity_market':
@@ -54,9 +262,10 @@ def resolve_and_fetch(req: QueryRequest):
     # 2. SECTOR or GROUP (Logic is same: List of stocks)
     elif res['type'] in ['sector', 'group']:
         stocks_data = []
-        for sym in res['symbols']:
-            d = get_live_data(sym)
-            if d: stocks_data.append(d)
+        with span("grid_loop"):
+            for sym in res['symbols']:
+                d = get_live_data(sym)
+                if d: stocks_data.append(d)
         
         return {
             "type": "grid_view", # Reusing grid layout for both
@@ -75,6 +284,90 @@ def resolve_and_fetch(req: QueryRequest):
             
     return {"type": "error", "message": "Data not found"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint: span latency histograms plus headline counters"""
+    cache = query_cache.report()
+    queue = ingest_queue.stats()
+    gauges = {
+        "search_cache_hit_rate": cache["hit_rate"],
+        "search_cache_entries": cache["entries"],
+        "ingest_queue_depth": queue["depth"],
+        "ingest_queue_lag_seconds": queue["lag_seconds"],
+        "crawler_items_per_minute": news_crawler.items_per_minute(),
+    }
+    # Only ever increase: exported as counters (name_total)
+    counters = {
+        "quote_upstream_calls": QUOTE_STATS["upstream_calls"],
+        "quote_closed_market_hits": QUOTE_STATS["closed_market_hits"],
+        "quote_stale_served": QUOTE_STATS["stale_served"],
+        "extraction_llm_calls": EXTRACTION_STATS["llm_calls"],
+    }
+    breaker_codes = {"closed": 0, "half_open": 1, "open": 2}
+    for host, status in governor_report().items():
+        gauges[f"upstream_{host}_breaker_state"] = breaker_codes[status["state"]]
+        counters[f"upstream_{host}_shed"] = status["shed_open"] + status["shed_rate"]
+        gauges[f"upstream_{host}_rate_per_sec"] = status["rate_per_sec"]
+    return render_metrics(gauges, counters)
+
+@app.post("/watchlist")
+def watchlist(req: WatchlistRequest):
+    """
+    Quotes and position P&L for large watchlists, as columns (one list per field).
+    Paged by default: only the requested page is resolved and quoted.
+    """
+    if len(req.items) > MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SYMBOLS} symbols per watchlist")
+    if req.page < 1 or req.page_size < 1:
+        raise HTTPException(status_code=400, detail="page and page_size must be at least 1")
+    items = [(i.query, i.quantity, i.avg_cost) for i in req.items]
+    if req.stream:
+        return StreamingResponse(stream_watchlist(items), media_type="application/x-ndjson")
+
+    start = (req.page - 1) * req.page_size
+    columns, unresolved = quote_page(items[start:start + req.page_size])
+    return {
+        "page": req.page, "page_size": req.page_size, "total_items": len(items),
+        "columns": to_json_columns(columns),
+        "summary": summarize(columns),
+        "unresolved": unresolved
+    }
+
+@app.get("/screener")
+def screen_stocks(where: str = None, sort: str = "-percent_change", limit: int = 50):
+    """
+    Vectorized screen over every known symbol, e.g.
+    /screener?where=sector == 'banking' and pe_ratio < 15 and percent_change > 0
+    Columns: symbol, sector, group, price, prev_close, change, percent_change, pe_ratio, market_cap
+    """
+    start = time.perf_counter()
+    try:
+        columns, total = screener.screen(where, sort=sort, limit=limit)
+    except (ValueError, SyntaxError) as e:
+        raise HTTPException(status_code=400, detail=f"Bad screen: {e}")
+    return {"total_matches": total, "columns": to_json_rows(columns),
+            "query_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+@app.get("/screener/status")
+def screener_status():
+    return screener.status()
+
+@app.get("/prefetch_status")
+def prefetch_status():
+    """Which popular queries are warm, and what the last prefetch cycle cost"""
+    return prefetcher.status()
+
+@app.get("/history")
+def price_history(symbols: str, interval: str = "1d", start: str = None, end: str = None):
+    """
+    OHLCV bars for one or more comma-separated symbols, e.g.
+    /history?symbols=TCS.NS,INFY.NS&start=2025-01-01
+    """
+    if interval not in HISTORY_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of {list(HISTORY_INTERVALS)}")
+    frames = history_store.get_many([s.strip() for s in symbols.split(",") if s.strip()], interval, start, end)
+    return {"interval": interval, "data": {sym: to_columns(df) for sym, df in frames.items()}}
+
 @app.post("/ingest_news")
 def ingest_news(req: QueryRequest):
     # This now expects a comma-separated string or handles it internally
@@ -88,29 +381,133 @@ def ingest_news(req: QueryRequest):
 @app.post("/ingest")
 def ingest_article(request: NewsRequest):
     """
-    Feed a new article into the AI pipeline.
+    Queue a new article for the AI pipeline.
+    Returns immediately; poll /ingest/{id} for the result.
     """
-    try:
-        # Run the LangGraph pipeline
-        result = pipeline_app.invoke({"article_text": request.text})
-        
-        if result['is_duplicate']:
-            return {"status": "ignored", "reason": "Duplicate"}
-        else:
-            return {
-                "status": "processed", 
-                "entities": result['entities']
-            }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    job_id = ingest_queue.enqueue(request.text)[0]
+    return {"status": "queued", "id": job_id}
+
+@app.get("/ingest/{job_id}")
+def ingest_status(job_id: int):
+    """Status of a queued article: queued, processing, done, duplicate or failed"""
+    job = ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job
+
+@app.get("/ingest_queue/stats")
+def ingest_queue_stats():
+    """Queue depth, lag of the oldest queued article and per-stage throughput"""
+    return ingest_workers.stats()
+
+@app.get("/crawler_status")
+def crawler_status():
+    """Items fetched, deduplicated and queued by the background news crawler"""
+    return news_crawler.status()
+
+# Crawled articles are also clustered into the rolling story feed
+news_crawler.on_items(lambda items: story_feed.add([score_article(item) for item in items]))
+
+@app.get("/stories")
+def stories(limit: int = 20):
+    """Crawled news grouped into stories: representative article, sources and sentiment mix"""
+    return {"stories": story_feed.top_stories(limit), **story_feed.status()}
+
+@app.post("/crawler/run", status_code=202)
+def crawler_run():
+    """Starts a crawl cycle now instead of waiting for the schedule; results appear in /crawler_status"""
+    return {"status": "started" if news_crawler.trigger() else "already running"}
+
+@app.get("/extraction_stats")
+def extraction_stats():
+    """How many ingested articles were tagged without an LLM call"""
+    return extraction_report()
 
 @app.post("/search")
-def search_news(request: QueryRequest):
+def search_news(request: SearchRequest):
     """
     Context-aware search.
+    Optional company/sector/date filters narrow the corpus before ranking.
+    Repeated or near-identical queries are answered from the query cache.
+    """
+    results, cache = query_cache.search(
+        request.query, k=request.k,
+        companies=request.companies, sectors=request.sectors,
+        since=request.since, until=request.until, mode=request.mode
+    )
+    return {"results": results, "cache": cache}
+
+@app.get("/search_cache_stats")
+def search_cache_stats():
+    """Query cache hit rate and latency histograms per outcome"""
+    return query_cache.report()
+
+@app.get("/entity_news")
+def entity_news(query: str, limit: int = 10):
+    """
+    Latest stored articles about a company (index lookup, no vector search).
+    Accepts a ticker, brand or company name: 'HDFCBANK.NS', 'HDFC', 'Dominos'.
+    """
+    kind, key = entity_target(query)
+    if kind == "sector":
+        return {"query": query, "sector": key, "articles": entity_index.latest_for_entity(key, kind="sector", limit=limit)}
+    if kind == "group":
+        return {"query": query, "tickers": key, "articles": entity_index.latest_for_tickers(key, limit=limit)}
+    articles = entity_index.latest_for_ticker(key, limit=limit)
+    if not articles:
+        # Companies we can't map to a ticker are still indexed by name
+        articles = entity_index.latest_for_entity(query, limit=limit)
+    return {"query": query, "ticker": key, "articles": articles}
+
+def entity_target(query):
+    """
+    What the entity index and sentiment rollups know a query as:
+    ("ticker", symbol) | ("sector", canonical sector) | ("group", [member tickers]).
+    Commodities aren't tracked as entities (400).
     """
-    results = global_db.advanced_search(request.query)
-    return {"results": results}
+    res = resolve_query(query)
+    if res['type'] == 'stock':
+        return "ticker", res['symbol']
+    if res['type'] == 'sector':
+        # "Banks" resolves to the BANK grid; the index stores it as "Banking"
+        return "sector", canonical_sector(res['name'])
+    if res['type'] == 'group':
+        return "group", res['symbols']
+    raise HTTPException(status_code=400, detail="Commodities aren't tracked by entity; use /search")
+
+# Hour/day sentiment buckets per ticker and sector, maintained as articles are stored
+entity_index.on_article(sentiment_rollups.on_article)
+
+@app.get("/sentiment_trend")
+def sentiment_trend(query: str, bucket: str = "day", since: Optional[int] = None, until: Optional[int] = None):
+    """
+    Sentiment over time for a company or sector from precomputed buckets.
+    bucket: hour | day; since/until in epoch seconds (default: last 30 days / 48 hours).
+    """
+    if bucket not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="bucket must be 'hour' or 'day'")
+    kind, key = entity_target(query)
+    # A group's trend is its member tickers' buckets summed
+    columns, summary = sentiment_rollups.trend("ticker" if kind == "group" else kind, key, bucket, since, until)
+    return {"query": query, "kind": kind, "key": key, "bucket": bucket, "summary": summary, "columns": columns}
+
+@app.get("/sentiment_leaders")
+def sentiment_leaders(kind: str = "ticker", days: int = 7, limit: int = 10):
+    """Most positive and most negative tickers (or sectors) over the last few days"""
+    if kind not in ("ticker", "sector"):
+        raise HTTPException(status_code=400, detail="kind must be 'ticker' or 'sector'")
+    return sentiment_rollups.top(kind, since=int(time.time()) - days * 86400, limit=limit)
+
+@app.get("/news_shards")
+def news_shards():
+    """Time shards in the vector store, newest first"""
+    return {"shards": [{"name": name, "count": global_db.shards[name]._collection.count()}
+                       for name in global_db.shards_in_window()]}
+
+@app.post("/news_shards/maintain")
+def maintain_news_shards():
+    """Runs retention and compaction now instead of waiting for the schedule"""
+    return run_shard_maintenance()
 
 @app.post("/analyze_doc")
 async def analyze_doc(
@@ -136,6 +533,47 @@ async def analyze_doc(
     
     return {"status": "success", "data": result}
 
+@app.post("/analyze_docs")
+async def analyze_docs(
+    files: List[UploadFile] = File(None),
+    urls: str = Form(None)
+):
+    """
+    Batch version of /analyze_doc: many PDFs and/or URLs (one per line or comma-separated).
+    Returns a job id immediately; poll /analyze_docs/{job_id} for progress and results.
+    """
+    documents = [("pdf", f.filename or f"file{n}", await f.read()) for n, f in enumerate(files or [])]
+    documents += [("url", u, None) for u in (urls or "").replace(",", "\n").split() if u]
+    try:
+        job_id = doc_jobs.submit(documents)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "queued", "id": job_id, "total": len(documents)}
+
+@app.get("/analyze_docs/{job_id}")
+def analyze_docs_status(job_id: int, include_results: bool = True):
+    """Progress, per-document status and (once done) the analysis of each document"""
+    job = doc_jobs.get(job_id, include_results=include_results)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown document job")
+    return job
+
+@app.get("/doc_jobs/stats")
+def doc_jobs_stats():
+    """Pool sizes, dedup/cache hits and mean extraction and analysis time"""
+    return doc_jobs.status()
+
+@app.get("/indicators")
+def indicators(symbols: str):
+    """Technical indicator sets for comma-separated symbols"""
+    return get_indicators([s.strip() for s in symbols.split(",") if s.strip()])
+
+def format_indicators(ind):
+    if not ind: return "N/A"
+    return (f"1M Return: {ind['return_1m']}% | 1Y Return: {ind['return_1y']}% | "
+            f"Volatility: {ind['volatility']}% | RSI(14): {ind['rsi_14']} | Beta: {ind['beta']} | "
+            f"Max Drawdown: {ind['max_drawdown']}% | Above 50-DMA: {ind['above_sma_50']}")
+
 @app.post("/compare_stocks")
 def compare_stocks(req: CompareRequest):
     # 1. Resolve and Fetch Stock 1
@@ -149,18 +587,29 @@ def compare_stocks(req: CompareRequest):
     if not data1 or not data2:
         return {"status": "error", "message": "Could not find data for one or both stocks."}
 
-    # 3. Fetch News for Context (Top 3 articles each)
+    # 3. Technical Indicators (both symbols in one pass, cached per trading day)
+    try:
+        tech = get_indicators([res1['symbol'], res2['symbol']])
+    except Exception as e:
+        print(f"Indicator error: {e}")
+        tech = {}
+    data1['indicators'] = tech.get(res1['symbol'], {})
+    data2['indicators'] = tech.get(res2['symbol'], {})
+
+    # 4. Fetch News for Context (Top 3 articles each)
     news1 = search_topic_news([data1['symbol']])[:3]
     news2 = search_topic_news([data2['symbol']])[:3]
 
-    # 4. Generate AI Verdict
+    # 5. Generate AI Verdict
     prompt = f"""
     Compare these two stocks based on the provided data and news headlines.
     
     Stock A: {data1['symbol']} | Price: {data1['price']} | PE: {data1.get('pe_ratio', 'N/A')} | Change: {data1['percent_change']}%
+    Technicals A: {format_indicators(data1['indicators'])}
     News A: {[n['text'] for n in news1]}
     
     Stock B: {data2['symbol']} | Price: {data2['price']} | PE: {data2.get('pe_ratio', 'N/A')} | Change: {data2['percent_change']}%
+    Technicals B: {format_indicators(data2['indicators'])}
     News B: {[n['text'] for n in news2]}
     
     Task: Provide a 3-sentence comparison verdict. Which one looks stronger in the short term?
@@ -168,7 +617,8 @@ def compare_stocks(req: CompareRequest):
     
     ai_verdict = "AI analysis unavailable."
     try:
-        response = llm_analyst.invoke([HumanMessage(content=prompt)])
+        with span("llm_call"):
+            response = llm_analyst.invoke([HumanMessage(content=prompt)])
         ai_verdict = response.content
     except:
         pass
@@ -179,9 +629,3 @@ def compare_stocks(req: CompareRequest):
         "stock2": data2,
         "verdict": ai_verdict
     }
-
-# --- RUNNER ---
-if __name__ == "__main__":
-    import uvicorn
-    # Runs the server on port 8002
-    uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,110 @@
+# market_calendar.py
+import json
+import os
+from datetime import datetime, timedelta, time as dtime, date
+from zoneinfo import ZoneInfo
+
+HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "market_holidays.json")
+
+# --- SESSIONS ---
+# A session belongs to a trade date D. Overnight sessions (open > close)
+# start on D-1, e.g. CME Globex futures trade 17:00 CT Sun -> 16:00 CT Fri.
+SESSIONS = {
+    "NSE": {"tz": ZoneInfo("Asia/Kolkata"), "open": dtime(9, 15), "close": dtime(15, 30), "holidays": "NSE"},
+    "US": {"tz": ZoneInfo("America/New_York"), "open": dtime(9, 30), "close": dtime(16, 0), "holidays": "US"},
+    "FUTURES": {"tz": ZoneInfo("America/Chicago"), "open": dtime(17, 0), "close": dtime(16, 0), "holidays": "US"},
+}
+
+# Indian indices are quoted with a ^ prefix and no exchange suffix
+INDIAN_INDICES = {"^NSEI", "^BSESN", "^NSEBANK"}
+
+def load_holidays(path=HOLIDAYS_FILE):
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Holiday calendar not loaded ({e}), assuming no holidays.")
+        return {}
+    return {market: {date.fromisoformat(d) for d in days}
+            for market, days in raw.items() if not market.startswith("_")}
+
+HOLIDAYS = load_holidays()
+
+def market_for(symbol):
+    """
+    Which calendar a Yahoo symbol trades on.
+    Returns "CRYPTO" for 24/7 assets and None when unknown (treated as always open).
+    """
+    s = symbol.upper()
+    if s.endswith("-USD"): return "CRYPTO"
+    if s.endswith("=F"): return "FUTURES"
+    if s.endswith(".NS") or s.endswith(".BO") or s in INDIAN_INDICES: return "NSE"
+    if s.startswith("^") or "." in s or "=" in s: return None
+    return "US"
+
+def _is_trade_date(market, d):
+    return d.weekday() < 5 and d not in HOLIDAYS.get(SESSIONS[market]["holidays"], set())
+
+def _session_window(market, d):
+    session = SESSIONS[market]
+    start_day = d - timedelta(days=1) if session["open"] > session["close"] else d
+    start = datetime.combine(start_day, session["open"], tzinfo=session["tz"])
+    end = datetime.combine(d, session["close"], tzinfo=session["tz"])
+    return start, end
+
+def is_market_open(market, now=None):
+    if market is None or market == "CRYPTO":
+        return True
+    session = SESSIONS[market]
+    now = (now or datetime.now(session["tz"])).astimezone(session["tz"])
+    # An overnight session that started today belongs to tomorrow's trade date
+    for d in (now.date(), now.date() + timedelta(days=1)):
+        if _is_trade_date(market, d):
+            start, end = _session_window(market, d)
+            if start <= now < end:
+                return True
+    return False
+
+def last_close(market, now=None):
+    """End of the most recent completed session, or None for 24/7 markets."""
+    if market is None or market == "CRYPTO":
+        return None
+    session = SESSIONS[market]
+    now = (now or datetime.now(session["tz"])).astimezone(session["tz"])
+    d = now.date()
+    for _ in range(15):
+        if _is_trade_date(market, d):
+            _, end = _session_window(market, d)
+            if end <= now:
+                return end
+        d -= timedelta(days=1)
+    return None
+
+def next_open(market, now=None):
+    """Start of the next session, or None for 24/7 markets."""
+    if market is None or market == "CRYPTO":
+        return None
+    session = SESSIONS[market]
+    now = (now or datetime.now(session["tz"])).astimezone(session["tz"])
+    d = now.date()
+    for _ in range(15):
+        if _is_trade_date(market, d):
+            start, _ = _session_window(market, d)
+            if start > now:
+                return start
+        d += timedelta(days=1)
+    return None
+
+def is_symbol_open(symbol, now=None):
+    return is_market_open(market_for(symbol), now)
+
+def is_quote_final(symbol, fetched_at, now=None):
+    """
+    True when a quote fetched at `fetched_at` can't change until the next
+    session: the market is closed and the quote was taken after the last close.
+    """
+    market = market_for(symbol)
+    if is_market_open(market, now):
+        return False
+    closed_at = last_close(market, now)
+    return closed_at is not None and fetched_at >= closed_at
@@ -0,0 +1,163 @@
+# prefetch.py
+import asyncio
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from stocks import resolve_query, get_live_data, get_closed_market_quote, is_quote_cached, COMMODITY_TICKERS
+from processor import fetch_topic_articles, is_news_cached
+from market_calendar import is_market_open
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# Quick Access buttons on the dashboard; seeded so a cold server warms them first
+SEED_QUERIES = ["Banks", "Auto", "Oil", "Gold"]
+
+def _target_key(resolved):
+    """One key per thing we warm: "TCS.NS", "BANKING SECTOR"... not per spelling of the query."""
+    if resolved['type'] == 'stock':
+        return resolved['symbol'].upper()
+    return resolved['name'].upper()
+
+def _symbols_for(resolved):
+    if resolved['type'] == 'commodity_market':
+        return list(COMMODITY_TICKERS.values())
+    if resolved['type'] in ['sector', 'group']:
+        return resolved['symbols']
+    return [resolved['symbol']]
+
+# --- PREFETCH SCHEDULER ---
+# Keeps the most requested queries hot in stocks.QUOTE_CACHE and
+# processor.NEWS_CACHE, so the first request after an idle period is a cache hit.
+
+class PrefetchScheduler:
+    def __init__(self, top_n=10, open_interval=45, closed_interval=540, decay_interval=3600, max_tracked=500):
+        self.top_n = top_n
+        # Open interval stays under the quote TTL, closed interval under the news TTL
+        self.open_interval = open_interval
+        self.closed_interval = closed_interval
+        # Counts halve every decay_interval (zeros are dropped), so yesterday's hot query fades out
+        self.decay_interval = decay_interval
+        self.max_tracked = max_tracked
+        self.popularity = Counter()
+        self.resolved = {}  # target key -> resolve_query() result
+        self.seeds = list(SEED_QUERIES)  # Resolved on the first cycle, off the import path
+        self.last_decay = time.time()
+        self.last_cycle = {}
+        self._lock = threading.Lock()
+        self._task = None
+
+    def record(self, query, resolved):
+        """Called from the request path for every resolved query."""
+        if not resolved:
+            return
+        key = _target_key(resolved)
+        with self._lock:
+            self.popularity[key] += 1
+            self.resolved[key] = resolved
+            if len(self.popularity) > self.max_tracked:
+                self._drop([k for k, _ in self.popularity.most_common()[self.max_tracked:]])
+
+    def _drop(self, keys):
+        for key in keys:
+            del self.popularity[key]
+            self.resolved.pop(key, None)
+
+    def decay(self):
+        with self._lock:
+            for key in list(self.popularity):
+                self.popularity[key] //= 2
+            self._drop([k for k, count in self.popularity.items() if count <= 0])
+            self.last_decay = time.time()
+
+    def top_queries(self):
+        with self._lock:
+            return [key for key, _ in self.popularity.most_common(self.top_n)]
+
+    def warm(self, key):
+        """Refreshes quotes and news for one query. Returns upstream call counts."""
+        with self._lock:
+            resolved = self.resolved.get(key)
+        if resolved is None:
+            return 0, 0  # Decayed away since top_queries()
+        quote_calls = 0
+        for sym in _symbols_for(resolved):
+            if get_closed_market_quote(sym):
+                continue  # Market shut and last close already held
+            get_live_data(sym, use_cache=False)
+            quote_calls += 1
+        news_calls = 0
+        for term in resolved['search_terms']:
+            fetch_topic_articles(term, use_cache=False)
+            news_calls += 1
+        return quote_calls, news_calls
+
+    def run_cycle(self):
+        start = time.perf_counter()
+        if self.seeds:
+            seeds, self.seeds = self.seeds, []
+            for query in seeds:
+                try:
+                    self.record(query, resolve_query(query))
+                except Exception as e:
+                    print(f"Prefetch seed error for {query}: {e}")
+        if time.time() - self.last_decay >= self.decay_interval:
+            self.decay()
+        keys = self.top_queries()
+        quote_calls = news_calls = 0
+        for key in keys:
+            try:
+                q, n = self.warm(key)
+                quote_calls += q
+                news_calls += n
+            except Exception as e:
+                print(f"Prefetch error for {key}: {e}")
+        self.last_cycle = {
+            "finished_at": datetime.now(IST).isoformat(timespec="seconds"),
+            "queries": len(keys),
+            "quote_calls": quote_calls,
+            "news_calls": news_calls,
+            "seconds": round(time.perf_counter() - start, 3)
+        }
+        print(f"Prefetch cycle: {self.last_cycle}")
+        return self.last_cycle
+
+    def is_warm(self, key):
+        with self._lock:
+            resolved = self.resolved.get(key)
+        if resolved is None:
+            return False
+        return (all(is_quote_cached(s) for s in _symbols_for(resolved))
+                and all(is_news_cached(t) for t in resolved['search_terms']))
+
+    def status(self):
+        with self._lock:
+            popularity = dict(self.popularity.most_common(self.top_n))
+        return {
+            "market_open": is_market_open("NSE"),
+            "top_queries": popularity,
+            "warm": {key: self.is_warm(key) for key in popularity},
+            "last_cycle": self.last_cycle
+        }
+
+    # --- SCHEDULE ---
+    def next_interval(self):
+        return self.open_interval if is_market_open("NSE") else self.closed_interval
+
+    async def run(self):
+        while True:
+            await asyncio.to_thread(self.run_cycle)
+            await asyncio.sleep(self.next_interval())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+# Global instance
+prefetcher = PrefetchScheduler()
@@ -7,12 +7,18 @@ from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage
 from GoogleNews import GoogleNews
 import re
+import threading
 from textblob import TextBlob
+from cachetools import TTLCache
+from telemetry import span, traced
+from governor import googlenews as googlenews_governor, UpstreamUnavailable, is_throttle_error
+from stories import cluster_stories
 
 # Initialize Llama 3.2
 llm_analyst = ChatOllama(model="llama3.2", temperature=0)
 
 # --- NEWS SCORING LOGIC ---
+@traced("sentiment")
 def analyze_sentiment(text):
     """Simple sentiment for list view"""
     analysis = TextBlob(text)
@@ -31,33 +37,92 @@ def calculate_priority(date_str, text):
     if any(k in text.lower() for k in keywords): score += 20
     return score
 
+def score_article(item):
+    """Raw news item {title, desc, media, link, date} -> scored article for the feed."""
+    text = f"{item['title']}. {item['desc']}"
+    return {
+        "text": item['title'],
+        "desc": item['desc'],
+        "source": item['media'],
+        "link": item['link'],
+        "date": item.get('date', 'Today'),
+        "rank": calculate_priority(item.get('date', ''), text),
+        "sentiment": analyze_sentiment(text)
+    }
+
+# --- NEWS CACHE ---
+# Scored articles per search topic, shared by requests and the prefetch scheduler.
+NEWS_CACHE = TTLCache(maxsize=512, ttl=600)
+# Last non-empty result per topic (no TTL), served while Google News is shedding
+LAST_NEWS = {}
+_news_cache_lock = threading.Lock()
+
+def _news_cache_key(topic):
+    return " ".join(topic.lower().split())
+
+def is_news_cached(topic):
+    with _news_cache_lock:
+        return _news_cache_key(topic) in NEWS_CACHE
+
+def scrape_google_news(topic):
+    """
+    Raw GoogleNews results through the shared governor.
+    Raises UpstreamUnavailable when shed or when Google answers empty/429.
+    """
+    if not googlenews_governor.acquire():
+        raise UpstreamUnavailable("googlenews")
+    try:
+        with span("news_scrape"):
+            googlenews = GoogleNews(lang='en', region='IN')
+            googlenews.search(topic)
+            results = googlenews.result()
+            googlenews.clear()
+    except Exception as e:
+        googlenews_governor.failure(throttled=is_throttle_error(e))
+        raise UpstreamUnavailable(f"googlenews: {e}")
+    if not results:
+        # GoogleNews swallows 429s and just returns nothing; a run of empty topics means throttling
+        googlenews_governor.empty(_news_cache_key(topic))
+        raise UpstreamUnavailable("googlenews: empty result")
+    googlenews_governor.success()
+    return results
+
+def fetch_topic_articles(topic, use_cache=True):
+    """Top scored articles for one search topic (cached)."""
+    key = _news_cache_key(topic)
+    if use_cache:
+        with _news_cache_lock:
+            cached = NEWS_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+    try:
+        results = scrape_google_news(topic)
+    except UpstreamUnavailable:
+        with _news_cache_lock:
+            return LAST_NEWS.get(key, [])
+
+    articles = [score_article(item) for item in results[:6]]
+
+    with _news_cache_lock:
+        NEWS_CACHE[key] = articles
+        LAST_NEWS[key] = articles
+    return articles
+
 def search_topic_news(query_list):
-    googlenews = GoogleNews(lang='en', region='IN')
     if isinstance(query_list, str): query_list = [query_list]
     
     all_articles = []
     seen_titles = set()
     
     for topic in query_list:
-        googlenews.search(topic)
-        results = googlenews.result()
-        for item in results[:6]:
-            if item['title'] not in seen_titles:
-                seen_titles.add(item['title'])
-                text = f"{item['title']}. {item['desc']}"
-                all_articles.append({
-                    "text": item['title'],
-                    "desc": item['desc'],
-                    "source": item['media'],
-                    "link": item['link'],
-                    "date": item.get('date', 'Today'),
-                    "rank": calculate_priority(item.get('date', ''), text),
-                    "sentiment": analyze_sentiment(text)
-                })
-        googlenews.clear()
+        for article in fetch_topic_articles(topic):
+            if article['text'] not in seen_titles:
+                seen_titles.add(article['text'])
+                all_articles.append(dict(article))
     
-    all_articles.sort(key=lambda x: x['rank'], reverse=True)
-    return all_articles
+    # Same story from several outlets -> one entry with its sources; ranked by story priority
+    return cluster_stories(all_articles)
 
 # --- DOCUMENT ANALYST LOGIC ---
 
@@ -102,6 +167,12 @@ def extract_text_from_url(url):
         print(f"Scrape Error: {e}")
         return None
 
+def extract_document(kind, payload):
+    """('pdf', file bytes) or ('url', url) -> text or None. Picklable entry point for worker processes."""
+    if kind == "pdf":
+        return extract_text_from_pdf(payload)
+    return extract_text_from_url(payload)
+
 def analyze_document_content(text):
     if not text or len(text) < 100:
         return {"is_relevant": False, "message": "Could not extract enough text from the link. Website might be protected."}
@@ -125,7 +196,8 @@ def analyze_document_content(text):
     """
     
     try:
-        response = llm_analyst.invoke([HumanMessage(content=prompt)])
+        with span("llm_call"):
+            response = llm_analyst.invoke([HumanMessage(content=prompt)])
         content = response.content.strip()
         
         # Check for the kill switch
@@ -0,0 +1,242 @@
+# quantized_store.py
+import json
+import os
+import threading
+import numpy as np
+
+# --- QUANTIZED EMBEDDING STORE ---
+# Compact copy of every embedding (int8 with a per-vector scale, or float16)
+# kept in append-only memory-mapped files. Used as a cheap first stage:
+# scan the compact vectors, then re-rank the top candidates exactly.
+#
+# This is a latency index, not a disk saving: Chroma keeps its float32 vectors
+# (re-rank reads them), so a quantized shard costs roughly +25% (int8) or +50%
+# (float16) on top of Chroma's own files. Retention is what bounds chroma_db.
+#
+# Once a shard holds IVF_MIN_VECTORS, an IVF partition (k-means centroids, one
+# list per centroid) bounds the scan to the nprobe lists nearest the query
+# instead of every stored vector.
+
+DTYPES = {"int8": np.int8, "float16": np.float16}
+IVF_MIN_VECTORS = int(os.environ.get("QUANTIZED_IVF_MIN_VECTORS", 20000))
+IVF_NPROBE = int(os.environ.get("QUANTIZED_IVF_NPROBE", 32))
+CHUNK = 65536
+
+def quantize(vectors, mode):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    # Symmetric per-vector int8: x ~= q * scale
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    q = np.round(vectors / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return q, scales.astype(np.float32)
+
+def nearest_centroid(vectors, centroids):
+    """Index of the closest centroid for each row (squared L2), in chunks."""
+    c_sq = (centroids * centroids).sum(axis=1)
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK):
+        block = np.asarray(vectors[start:start + CHUNK], dtype=np.float32)
+        out[start:start + len(block)] = (c_sq - 2 * block @ centroids.T).argmin(axis=1)
+    return out
+
+def dequantize(vectors, scales, rows):
+    return vectors[rows].astype(np.float32) * scales[rows, None]
+
+def kmeans(sample, nlist, iterations=10, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = nearest_centroid(sample, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        order = np.argsort(assign, kind="stable")
+        filled = np.flatnonzero(counts)
+        sums = np.add.reduceat(sample[order], np.concatenate([[0], np.cumsum(counts)[:-1]])[filled], axis=0)
+        centroids[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+    return centroids
+
+class QuantizedStore:
+    def __init__(self, path, dim, mode="int8"):
+        if mode not in DTYPES:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+        self.path = path
+        self.dim = dim
+        self.mode = mode
+        self.dtype = DTYPES[mode]
+        os.makedirs(path, exist_ok=True)
+        self._vec_file = os.path.join(path, f"vectors.{mode}")
+        self._scale_file = os.path.join(path, "scales.f32")
+        self._ids_file = os.path.join(path, "ids.jsonl")
+        self._ivf_file = os.path.join(path, "ivf.json")
+        self._centroid_file = os.path.join(path, "centroids.f32")
+        self._list_file = os.path.join(path, "lists.i32")
+        self._lock = threading.Lock()
+        self.ids = []
+        if os.path.exists(self._ids_file):
+            with open(self._ids_file) as f:
+                self.ids = [json.loads(line) for line in f]
+        self._id_set = set(self.ids)
+        self.centroids = None
+        self.trained_size = 0
+        if os.path.exists(self._ivf_file):
+            with open(self._ivf_file) as f:
+                self.trained_size = json.load(f)["trained_size"]
+            self.centroids = np.fromfile(self._centroid_file, dtype=np.float32).reshape(-1, dim)
+        self._vectors = None
+        self._scales = None
+        self._norms = None
+        self._members = None  # IVF list -> row numbers
+        self._row_of = None   # id -> row number, built for filtered searches
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ids, vectors):
+        """Appends vectors; ids already stored are skipped. Returns the number added."""
+        with self._lock:
+            fresh = {doc_id: i for i, doc_id in enumerate(ids) if doc_id not in self._id_set}
+            if not fresh:
+                return 0
+            ids = list(fresh)
+            q, scales = quantize(np.asarray(vectors, dtype=np.float32)[list(fresh.values())], self.mode)
+            with open(self._vec_file, "ab") as f:
+                f.write(q.tobytes())
+            with open(self._scale_file, "ab") as f:
+                f.write(scales.tobytes())
+            with open(self._ids_file, "a") as f:
+                for doc_id in ids:
+                    f.write(json.dumps(doc_id) + "\n")
+            if self.centroids is not None:
+                with open(self._list_file, "ab") as f:
+                    f.write(nearest_centroid(q.astype(np.float32) * scales[:, None], self.centroids).tobytes())
+            self.ids.extend(ids)
+            self._id_set.update(ids)
+            self._vectors = None  # re-map on next search
+            self._norms = None
+            self._members = None
+            self._row_of = None
+            return len(ids)
+
+    def _load(self):
+        if self._vectors is None and self.ids:
+            n = len(self.ids)
+            self._vectors = np.memmap(self._vec_file, dtype=self.dtype, mode="r", shape=(n, self.dim))
+            self._scales = np.memmap(self._scale_file, dtype=np.float32, mode="r", shape=(n,))
+            # Squared norms of the dequantized vectors, computed once per mapping
+            self._norms = np.concatenate([
+                (self._vectors[i:i + CHUNK].astype(np.float32) ** 2).sum(axis=1) * self._scales[i:i + CHUNK] ** 2
+                for i in range(0, n, CHUNK)
+            ])
+            self._members = None
+            if self.centroids is not None:
+                lists = np.fromfile(self._list_file, dtype=np.int32) if os.path.exists(self._list_file) else []
+                if len(lists) == n:
+                    order = np.argsort(lists, kind="stable")
+                    bounds = np.searchsorted(lists[order], np.arange(len(self.centroids) + 1))
+                    self._members = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+                else:
+                    # Interrupted write: scan everything until the next train()
+                    print(f"IVF lists out of sync in {self.path}, falling back to a full scan.")
+                    self.centroids = None
+        return self._vectors, self._scales, self._norms
+
+    # --- IVF PARTITION ---
+    def train(self, nlist=None, sample_size=100_000, iterations=10):
+        """
+        (Re)builds the IVF partition over everything stored; nlist defaults to ~sqrt(n).
+        k-means runs outside the lock, so searches and adds carry on meanwhile.
+        """
+        with self._lock:
+            vectors, scales, _ = self._load()
+            n = len(self.ids)
+        if not n:
+            return 0
+        nlist = nlist or int(np.clip(np.sqrt(n), 16, 4096))
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(n, min(n, max(sample_size, nlist * 4)), replace=False))
+        centroids = kmeans(dequantize(vectors, scales, rows), min(nlist, len(rows)), iterations).astype(np.float32)
+        lists = [nearest_centroid(dequantize(vectors, scales, np.arange(i, min(i + CHUNK, n))), centroids)
+                 for i in range(0, n, CHUNK)]
+        with self._lock:
+            total = len(self.ids)
+            if total > n:
+                # Rows added while k-means ran
+                vectors = np.memmap(self._vec_file, dtype=self.dtype, mode="r", shape=(total, self.dim))
+                scales = np.memmap(self._scale_file, dtype=np.float32, mode="r", shape=(total,))
+                lists.append(nearest_centroid(dequantize(vectors, scales, np.arange(n, total)), centroids))
+            centroids.tofile(self._centroid_file)
+            np.concatenate(lists).astype(np.int32).tofile(self._list_file)
+            with open(self._ivf_file, "w") as f:
+                json.dump({"trained_size": total, "nlist": len(centroids)}, f)
+            self.centroids = centroids
+            self.trained_size = total
+            self._vectors = None
+        return len(centroids)
+
+    def maybe_train(self):
+        """Trains once the store is big enough, and again each time it has grown 4x."""
+        n = len(self.ids)
+        if n >= IVF_MIN_VECTORS and (self.centroids is None or n >= 4 * self.trained_size):
+            return self.train()
+        return 0
+
+    def search(self, query_vector, k=10, nprobe=IVF_NPROBE, allowed=None):
+        """
+        Approximate squared-L2 top-k over the compact vectors: [(id, distance)].
+        allowed: optional set of ids (a metadata pre-filter); only those rows are scanned.
+        """
+        with self._lock:
+            vectors, scales, norms = self._load()
+            ids = self.ids
+            centroids, members = self.centroids, self._members
+            if allowed is not None and vectors is not None:
+                if self._row_of is None:
+                    self._row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+                rows = np.fromiter((self._row_of[d] for d in allowed if d in self._row_of), dtype=np.int64)
+            else:
+                rows = None
+        if vectors is None:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        if rows is None and members is not None and 0 < nprobe < len(centroids):
+            probe = np.argpartition(((centroids - query) ** 2).sum(axis=1), nprobe - 1)[:nprobe]
+            rows = np.sort(np.concatenate([members[c] for c in probe]))
+        if rows is not None:
+            if not len(rows):
+                return []
+            dist = norms[rows] - 2 * (vectors[rows].astype(np.float32) @ query) * scales[rows] + query @ query
+            take = min(k, len(dist))
+            top = np.argpartition(dist, take - 1)[:take]
+            top = top[np.argsort(dist[top])]
+            return [(ids[rows[i]], float(dist[i])) for i in top]
+
+        # |x - q|^2 = |x|^2 - 2 x.q + |q|^2, computed in chunks to bound memory
+        best_ids, best_dist = [], []
+        for start in range(0, len(vectors), CHUNK):
+            dots = (vectors[start:start + CHUNK].astype(np.float32) @ query) * scales[start:start + CHUNK]
+            dist = norms[start:start + CHUNK] - 2 * dots + query @ query
+            take = min(k, len(dist))
+            top = np.argpartition(dist, take - 1)[:take]
+            best_ids.extend(start + top)
+            best_dist.extend(dist[top])
+        order = np.argsort(best_dist)[:k]
+        return [(ids[best_ids[i]], float(best_dist[i])) for i in order]
+
+    def disk_size(self):
+        files = (self._vec_file, self._scale_file, self._ids_file, self._ivf_file, self._centroid_file, self._list_file)
+        return sum(os.path.getsize(f) for f in files if os.path.exists(f))
+
+def exact_rerank(query_vector, candidates, k):
+    """candidates: [(id, float32 vector)] -> [(id, squared L2)] best first."""
+    if not candidates:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+    ids = [c[0] for c in candidates]
+    matrix = np.asarray([c[1] for c in candidates], dtype=np.float32)
+    dist = ((matrix - query) ** 2).sum(axis=1)
+    order = np.argsort(dist)[:k]
+    return [(ids[i], float(dist[i])) for i in order]
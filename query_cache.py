@@ -0,0 +1,134 @@
+# query_cache.py
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from database import global_db, embeddings, split_entities
+from telemetry import Histogram, span
+
+# --- SEMANTIC QUERY CACHE ---
+# Two levels in front of VectorDB.advanced_search:
+#   1. exact: same normalised query text and filters
+#   2. semantic: a recent query with the same filters whose embedding is close enough
+# Entries are dropped when articles land in the sectors/companies they cover.
+
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+def normalize_query(text):
+    return " ".join(text.lower().split())
+
+def _filter_key(k, companies, sectors, since, until, mode):
+    return (k, tuple(sorted(split_entities(companies))), tuple(sorted(split_entities(sectors))), since, until, mode)
+
+class QueryCache:
+    def __init__(self, db, max_entries=256, ttl=300, similarity=0.95):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        # (normalised query, filter key) -> entry, oldest first
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "invalidated": 0}
+        self.latency = {outcome: Histogram(LATENCY_BUCKETS_MS) for outcome in ("exact", "semantic", "miss")}
+        db.on_change(self.invalidate)
+
+    def _evict(self, now):
+        for key in [key for key, e in self.entries.items() if now - e["created"] > self.ttl]:
+            del self.entries[key]
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _semantic_lookup(self, vector, filters):
+        """Closest cached query with identical filters, if above the similarity threshold."""
+        same = [e for e in self.entries.values() if e["filters"] == filters]
+        if not same:
+            return None
+        matrix = np.asarray([e["vector"] for e in same], dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+        sims = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(sims))
+        return same[best] if sims[best] >= self.similarity else None
+
+    def _record(self, outcome, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.stats[{"exact": "exact_hits", "semantic": "semantic_hits", "miss": "misses"}[outcome]] += 1
+            self.latency[outcome].observe(elapsed_ms)
+
+    def search(self, query_text, k=5, companies=None, sectors=None, since=None, until=None, mode="hybrid"):
+        """Cached advanced_search. Returns (results, 'exact' | 'semantic' | 'miss')."""
+        start = time.perf_counter()
+        filters = _filter_key(k, companies, sectors, since, until, mode)
+        key = (normalize_query(query_text), filters)
+
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is not None:
+            self._record("exact", start)
+            return entry["results"], "exact"
+
+        with span("embedding"):
+            vector = embeddings.embed_query(key[0])
+        with self._lock:
+            entry = self._semantic_lookup(vector, filters)
+        if entry is not None:
+            self._record("semantic", start)
+            return entry["results"], "semantic"
+
+        results = self.db.advanced_search(query_text, k=k, companies=companies, sectors=sectors,
+                                          since=since, until=until, mode=mode, query_vector=vector)
+        # What this answer depends on: the filter entities, else whatever the results are about
+        covers_sectors = set(filters[2])
+        covers_companies = set(filters[1])
+        if not covers_sectors and not covers_companies:
+            for r in results:
+                covers_sectors |= split_entities(r["metadata"].get("sectors"))
+                covers_companies |= split_entities(r["metadata"].get("companies"))
+        with self._lock:
+            self.entries[key] = {"filters": filters, "vector": vector, "results": results, "created": now,
+                                 "sectors": covers_sectors, "companies": covers_companies}
+            self._evict(now)
+        self._record("miss", start)
+        return results, "miss"
+
+    def invalidate(self, metadatas=None):
+        """Store listener: drops entries touching the new articles' sectors or companies."""
+        with self._lock:
+            if metadatas is None:
+                stale = list(self.entries)
+            else:
+                sectors, companies = set(), set()
+                for meta in metadatas:
+                    sectors |= split_entities(meta.get("sectors"))
+                    companies |= split_entities(meta.get("companies"))
+                # Entries with nothing to go on (empty answers) could be answered now
+                stale = [key for key, e in self.entries.items()
+                         if (e["sectors"] & sectors) or (e["companies"] & companies)
+                         or not (e["sectors"] or e["companies"])]
+            for key in stale:
+                del self.entries[key]
+            self.stats["invalidated"] += len(stale)
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+            latency = {outcome: h.snapshot() for outcome, h in self.latency.items()}
+            size = len(self.entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        return {**stats, "entries": size, "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "latency_ms": latency}
+
+# Global instance
+query_cache = QueryCache(
+    global_db,
+    max_entries=int(os.environ.get("QUERY_CACHE_SIZE", 256)),
+    ttl=int(os.environ.get("QUERY_CACHE_TTL", 300)),
+    similarity=float(os.environ.get("QUERY_CACHE_SIMILARITY", 0.95))
+)
@@ -0,0 +1,348 @@
+# screener.py
+import ast
+import asyncio
+import csv
+import os
+import threading
+import time
+from functools import lru_cache
+import numpy as np
+import yfinance as yf
+from stocks import SECTOR_MAP, SECTOR_NAMES, GROUP_MAP, BRAND_TO_STOCK, LAST_QUOTES, _quote_cache_lock
+from watchlist import iter_quote_chunks, on_resolved
+from governor import yahoo, is_throttle_error
+from market_calendar import is_market_open
+
+# --- SCREENER ---
+# Latest quote + fundamentals for the whole symbol universe as NumPy columns.
+# A refresh builds new arrays and swaps them in, so a query always sees one
+# consistent snapshot without taking a lock. Filters are small Python
+# expressions compiled once into vectorized NumPy operations:
+#   sector == 'banking' and pe_ratio < 15 and percent_change > 0
+
+NUMERIC = ["price", "prev_close", "change", "percent_change", "pe_ratio", "market_cap", "updated_at", "fundamentals_at"]
+TEXT = ["symbol", "sector", "group"]
+FUNDAMENTALS_MAX_AGE = 24 * 3600
+
+def sector_label(name):
+    """Screener sector value: grid aliases collapse to one name ("BANK" and "BANKING" -> "banking")."""
+    name = name.strip()
+    return SECTOR_NAMES.get(name.upper(), name).lower()
+
+def default_universe():
+    """symbol -> (sector, group) from the stocks maps, plus SCREENER_UNIVERSE_FILE (CSV: symbol,sector)."""
+    universe = {}
+    for sector, symbols in SECTOR_MAP.items():
+        for sym in symbols:
+            universe.setdefault(sym, [sector_label(sector), ""])
+    for group, symbols in GROUP_MAP.items():
+        for sym in symbols:
+            universe.setdefault(sym, ["", ""])[1] = group.lower()
+    for sym in BRAND_TO_STOCK.values():
+        universe.setdefault(sym, ["", ""])
+    path = os.environ.get("SCREENER_UNIVERSE_FILE")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            for row in csv.DictReader(f):
+                sym = row["symbol"].strip().upper()
+                universe.setdefault(sym, ["", ""])
+                if row.get("sector") and not universe[sym][0]:
+                    universe[sym][0] = sector_label(row["sector"])
+    return {sym: tuple(v) for sym, v in universe.items()}
+
+# --- EXPRESSIONS ---
+# Every node compiles to (function(columns) -> array/scalar, kind). Kinds are
+# checked here, so "symbol < 5" is a 400 at parse time, not a TypeError mid-scan.
+_COMPARE = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+            ast.Eq: np.equal, ast.NotEq: np.not_equal}
+_ORDERING = (ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+_ARITH = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+MAX_EXPRESSION_CHARS = 2000
+MAX_DEPTH = 32
+
+def _constant_kind(value):
+    if isinstance(value, bool):
+        raise ValueError("Booleans are not supported, use a comparison")
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "text"
+    raise ValueError(f"Unsupported constant: {value!r}")
+
+def _compile(node, depth=0):
+    """AST -> (function(columns) -> array/scalar, kind). Only columns, constants and basic operators."""
+    if depth > MAX_DEPTH:
+        raise ValueError(f"Expression nested deeper than {MAX_DEPTH} levels")
+    depth += 1
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, depth)
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(v, depth) for v in node.values]
+        if any(kind != "bool" for _, kind in parts):
+            raise ValueError("'and'/'or' need conditions on both sides")
+        parts = [fn for fn, _ in parts]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        def bool_op(cols):
+            result = parts[0](cols)
+            for part in parts[1:]:
+                result = combine(result, part(cols))
+            return result
+        return bool_op, "bool"
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        operand, kind = _compile(node.operand, depth)
+        want = "bool" if isinstance(node.op, ast.Not) else "number"
+        if kind != want:
+            raise ValueError(f"'{'not' if want == 'bool' else '-'}' needs a {'condition' if want == 'bool' else 'number'}")
+        op = np.logical_not if isinstance(node.op, ast.Not) else np.negative
+        return (lambda cols: op(operand(cols))), kind
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITH:
+        (left, lkind), (right, rkind) = _compile(node.left, depth), _compile(node.right, depth)
+        if lkind != "number" or rkind != "number":
+            raise ValueError("Arithmetic needs numbers on both sides")
+        op = _ARITH[type(node.op)]
+        return (lambda cols: op(left(cols), right(cols))), "number"
+    if isinstance(node, ast.Compare):
+        left, kind = _compile(node.left, depth)
+        steps = []
+        for op, comparator in zip(node.ops, node.comparators):
+            right, rkind = _compile(comparator, depth)
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if rkind not in ("list", f"list of {kind}"):
+                    raise ValueError(f"'in' needs a list of {kind} values")
+                negate = isinstance(op, ast.NotIn)
+                fn = lambda a, b, negate=negate: np.isin(a, list(b), invert=negate)
+            elif type(op) in _COMPARE:
+                if kind != rkind or kind not in ("number", "text"):
+                    raise ValueError(f"Can't compare {kind} with {rkind}")
+                fn = _COMPARE[type(op)]
+            else:
+                raise ValueError(f"Unsupported comparison: {type(op).__name__}")
+            steps.append((fn, right))
+            kind = rkind
+        def compare(cols):
+            result, current = None, left(cols)
+            for fn, right in steps:
+                other = right(cols)
+                with np.errstate(invalid="ignore"):
+                    step = fn(current, other)
+                result = step if result is None else np.logical_and(result, step)
+                current = other
+            return result
+        return compare, "bool"
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name not in NUMERIC and name not in TEXT:
+            raise ValueError(f"Unknown column: {name}")
+        # Text constants are lower-cased, so symbols match through a lower-cased copy
+        key = "symbol_key" if name == "symbol" else name
+        return (lambda cols: cols[key]), ("number" if name in NUMERIC else "text")
+    if isinstance(node, ast.Constant):
+        kind = _constant_kind(node.value)
+        value = node.value.lower() if kind == "text" else node.value
+        return (lambda cols: value), kind
+    if isinstance(node, (ast.List, ast.Tuple)):
+        if not all(isinstance(e, ast.Constant) for e in node.elts):
+            raise ValueError("Lists may only hold constants")
+        kinds = {_constant_kind(e.value) for e in node.elts}
+        if len(kinds) > 1:
+            raise ValueError("Lists can't mix numbers and text")
+        values = [e.value.lower() if isinstance(e.value, str) else e.value for e in node.elts]
+        return (lambda cols: values), (f"list of {kinds.pop()}" if kinds else "list")
+    raise ValueError(f"Unsupported expression: {type(node).__name__}")
+
+@lru_cache(maxsize=256)
+def compile_filter(expression):
+    if len(expression) > MAX_EXPRESSION_CHARS:
+        raise ValueError(f"Filter longer than {MAX_EXPRESSION_CHARS} characters")
+    try:
+        fn, kind = _compile(ast.parse(expression, mode="eval"))
+    except RecursionError:
+        raise ValueError("Expression too deeply nested")
+    if kind != "bool":
+        raise ValueError("Filter must be a condition, e.g. pe_ratio < 15")
+    return fn
+
+# --- UNIVERSE ---
+class Screener:
+    def __init__(self, universe=None, open_interval=60, closed_interval=900, fundamentals_per_cycle=25,
+                 max_symbols=5000):
+        self.open_interval = open_interval
+        self.max_symbols = max_symbols
+        self.closed_interval = closed_interval
+        self.fundamentals_per_cycle = fundamentals_per_cycle
+        self._write_lock = threading.Lock()
+        self.columns = self._empty(universe or default_universe())
+        self.last_refresh = {}
+        self._task = None
+
+    @staticmethod
+    def _empty(universe):
+        symbols = list(universe)
+        cols = {name: np.full(len(symbols), np.nan) for name in NUMERIC}
+        cols["symbol"] = np.array(symbols, dtype=object)
+        cols["symbol_key"] = np.array([s.lower() for s in symbols], dtype=object)
+        cols["sector"] = np.array([universe[s][0] for s in symbols], dtype=object)
+        cols["group"] = np.array([universe[s][1] for s in symbols], dtype=object)
+        return cols
+
+    def __len__(self):
+        return len(self.columns["symbol"])
+
+    def add_symbols(self, symbols, sector=""):
+        """Grows the universe (e.g. from a watchlist). New rows start empty until the next refresh."""
+        with self._write_lock:
+            cols = self.columns
+            known = set(cols["symbol"])
+            new = [s.upper() for s in dict.fromkeys(symbols) if s and s.upper() not in known]
+            new = new[:max(0, self.max_symbols - len(known))]
+            if not new:
+                return 0
+            extra = self._empty({s: (sector.lower(), "") for s in new})
+            self.columns = {name: np.concatenate([cols[name], extra[name]]) for name in cols}
+        return len(new)
+
+    # --- REFRESH ---
+    def refresh_prices(self):
+        """Quotes for every symbol via the watchlist batch path (cache first, then chunked downloads)."""
+        symbols = list(self.columns["symbol"])
+        quotes = {}
+        for batch in iter_quote_chunks(symbols):
+            quotes.update(batch)
+        now = time.time()
+        with self._write_lock:
+            cols = {name: values.copy() for name, values in self.columns.items()}
+            index = {sym: i for i, sym in enumerate(cols["symbol"])}
+            for sym, (price, prev, _) in quotes.items():
+                i = index.get(sym)
+                if i is None:
+                    continue
+                cols["price"][i], cols["prev_close"][i], cols["updated_at"][i] = price, prev, now
+            cols["change"] = cols["price"] - cols["prev_close"]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cols["percent_change"] = cols["change"] / cols["prev_close"] * 100
+            self.columns = cols
+        return len(quotes)
+
+    def _fundamentals_for(self, sym, have_market_cap=False):
+        # Free if the quote path already fetched this symbol's info. Its market cap is a
+        # display string, so the shortcut only serves rows that already have one.
+        if have_market_cap:
+            with _quote_cache_lock:
+                entry = LAST_QUOTES.get(sym)
+            if entry and isinstance(entry[0].get("pe_ratio"), (int, float)):
+                return {"pe_ratio": entry[0]["pe_ratio"], "market_cap": np.nan, "sector": entry[0].get("sector", "")}
+        if not yahoo.acquire():
+            return None
+        try:
+            info = yf.Ticker(sym).info
+        except Exception as e:
+            yahoo.failure(throttled=is_throttle_error(e))
+            return None
+        yahoo.success()
+        return {"pe_ratio": info.get("trailingPE") or np.nan, "market_cap": info.get("marketCap") or np.nan,
+                "sector": info.get("sector") or ""}
+
+    def refresh_fundamentals(self, limit=None):
+        """P/E, market cap and sector for the stalest few symbols (incremental: limit per call)."""
+        cols = self.columns
+        age = time.time() - np.nan_to_num(cols["fundamentals_at"], nan=0.0)
+        order = np.argsort(-age)
+        stale = [i for i in order if age[i] > FUNDAMENTALS_MAX_AGE][:limit or self.fundamentals_per_cycle]
+        fetched = {cols["symbol"][i]: f for i in stale
+                   if (f := self._fundamentals_for(cols["symbol"][i], not np.isnan(cols["market_cap"][i]))) is not None}
+        now = time.time()
+        with self._write_lock:
+            cols = {name: values.copy() for name, values in self.columns.items()}
+            index = {sym: i for i, sym in enumerate(cols["symbol"])}
+            for sym, f in fetched.items():
+                i = index[sym]
+                cols["pe_ratio"][i] = f["pe_ratio"]
+                if not np.isnan(f["market_cap"]):
+                    cols["market_cap"][i] = f["market_cap"]
+                if not cols["sector"][i] and f["sector"]:
+                    cols["sector"][i] = sector_label(f["sector"])
+                cols["fundamentals_at"][i] = now
+            self.columns = cols
+        return len(fetched)
+
+    def refresh(self):
+        start = time.perf_counter()
+        quoted = self.refresh_prices()
+        fundamentals = self.refresh_fundamentals()
+        self.last_refresh = {"symbols": len(self), "quoted": quoted, "fundamentals_updated": fundamentals,
+                             "seconds": round(time.perf_counter() - start, 3)}
+        return self.last_refresh
+
+    # --- QUERY ---
+    def screen(self, where=None, sort=None, limit=50, columns=None):
+        """
+        where: filter expression; sort: column name, '-' prefix for descending.
+        Returns (column dict for the matching rows, total matches).
+        """
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+        cols = self.columns  # Snapshot: refreshes swap the whole dict
+        mask = np.ones(len(cols["symbol"]), dtype=bool)
+        if where:
+            result = compile_filter(where)(cols)
+            mask = np.broadcast_to(np.asarray(result, dtype=bool), mask.shape)
+        rows = np.flatnonzero(mask)
+        if sort:
+            key = sort.lstrip("-")
+            if key not in NUMERIC and key not in TEXT:
+                raise ValueError(f"Unknown sort column: {key}")
+            values = cols[key][rows]
+            if key in NUMERIC:
+                # NaN last in either direction
+                values = np.where(np.isnan(values), -np.inf if sort.startswith("-") else np.inf, values)
+            order = np.argsort(values, kind="stable")
+            if sort.startswith("-"):
+                order = order[::-1]
+            rows = rows[order]
+        total = len(rows)
+        rows = rows[:limit]
+        wanted = columns or ["symbol", "sector", "group", "price", "change", "percent_change", "pe_ratio", "market_cap"]
+        return {name: cols[name][rows] for name in wanted}, total
+
+    def status(self):
+        cols = self.columns
+        return {"symbols": len(cols["symbol"]),
+                "with_price": int(np.count_nonzero(~np.isnan(cols["price"]))),
+                "with_fundamentals": int(np.count_nonzero(~np.isnan(cols["fundamentals_at"]))),
+                "last_refresh": self.last_refresh}
+
+    # --- SCHEDULE ---
+    def next_interval(self):
+        return self.open_interval if is_market_open("NSE") else self.closed_interval
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Screener refresh error: {e}")
+            await asyncio.sleep(self.next_interval())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+def to_json_rows(columns):
+    """Column dict -> JSON-safe lists (NaN -> None)."""
+    out = {}
+    for name, values in columns.items():
+        if values.dtype.kind == "f":
+            out[name] = [None if np.isnan(v) else round(float(v), 2) for v in values]
+        else:
+            out[name] = values.tolist()
+    return out
+
+# Global instance
+screener = Screener(max_symbols=int(os.environ.get("SCREENER_MAX_SYMBOLS", 5000)))
+# Symbols people watch join the universe; their rows fill in on the next refresh
+on_resolved(screener.add_symbols)
@@ -0,0 +1,177 @@
+# sentiment_rollup.py
+import hashlib
+import sqlite3
+import threading
+import time
+
+# --- SENTIMENT ROLLUPS ---
+# Per-ticker and per-sector sentiment counts in hour and day buckets, updated
+# as each article is stored. A trend over months reads a few hundred bucket
+# rows instead of rescanning articles, and the buckets outlive the article
+# retention window. The ledger keys articles by a hash of their text (doc_ids
+# are fresh uuids on every ingest), so re-ingesting a story doesn't inflate counts.
+
+IST_OFFSET = 19800  # Day buckets follow the Indian trading day, not UTC
+BUCKETS = {"hour": 3600, "day": 86400}
+SCORES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+def bucket_start(ts, bucket):
+    if bucket == "day":
+        return (ts + IST_OFFSET) // 86400 * 86400 - IST_OFFSET
+    return ts - ts % BUCKETS[bucket]
+
+def sentiment_label(sentiment):
+    """'Positive' / '🟢 Bullish' / None -> positive | negative | neutral"""
+    text = (sentiment or "").lower()
+    if "positive" in text or "bullish" in text: return "positive"
+    if "negative" in text or "bearish" in text: return "negative"
+    return "neutral"
+
+def content_key(text):
+    """Ledger key: hash of the whitespace/case-normalised article text."""
+    return hashlib.sha1(" ".join((text or "").lower().split()).encode()).hexdigest()
+
+class SentimentRollups:
+    def __init__(self, db_path="./sentiment_rollups.db"):
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rollups (
+                kind TEXT NOT NULL,          -- 'ticker' | 'sector'
+                key TEXT NOT NULL,
+                bucket TEXT NOT NULL,        -- 'hour' | 'day'
+                start INTEGER NOT NULL,      -- epoch seconds
+                articles INTEGER NOT NULL DEFAULT 0,
+                positive INTEGER NOT NULL DEFAULT 0,
+                negative INTEGER NOT NULL DEFAULT 0,
+                neutral INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (kind, key, bucket, start)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS counted (
+                doc_id TEXT PRIMARY KEY,     -- content_key of the text (plain doc_id if there was none)
+                ts INTEGER NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def _upserts(self, ts, tickers, sectors, label, score):
+        rows = []
+        for kind, keys in (("ticker", tickers), ("sector", sectors)):
+            for key in dict.fromkeys(k for k in keys if k):
+                for bucket in BUCKETS:
+                    rows.append((kind, key, bucket, bucket_start(ts, bucket), int(label == "positive"),
+                                 int(label == "negative"), int(label == "neutral"), score))
+        return rows
+
+    def record(self, key, tickers, sectors, sentiment, ts=None, score=None):
+        """
+        Adds one article to every hour/day bucket of its tickers and sectors.
+        key: ledger key, normally content_key(text).
+        score: numeric sentiment in [-1, 1]; defaults to +1/0/-1 from the label.
+        Returns False if the article was already counted.
+        """
+        ts = int(ts or time.time())
+        label = sentiment_label(sentiment)
+        score = SCORES[label] if score is None else float(score)
+        rows = self._upserts(ts, tickers, sectors, label, score)
+        with self._lock:
+            cur = self.conn.execute("INSERT OR IGNORE INTO counted (doc_id, ts) VALUES (?, ?)", (key, ts))
+            if cur.rowcount == 0:
+                self.conn.commit()
+                return False
+            self.conn.executemany("""
+                INSERT INTO rollups (kind, key, bucket, start, articles, positive, negative, neutral, score_sum)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?)
+                ON CONFLICT (kind, key, bucket, start) DO UPDATE SET
+                    articles = articles + 1,
+                    positive = positive + excluded.positive,
+                    negative = negative + excluded.negative,
+                    neutral = neutral + excluded.neutral,
+                    score_sum = score_sum + excluded.score_sum
+            """, rows)
+            self.conn.commit()
+        return True
+
+    def on_article(self, doc_id, tickers, sectors, sentiment, ts, text=None):
+        """Entity-index listener."""
+        self.record(content_key(text) if text else doc_id, tickers, sectors, sentiment, ts=ts)
+
+    def backfill(self, index):
+        """Counts articles already in the entity index (first run after an upgrade). Returns the number added."""
+        with index._lock:
+            articles = index.conn.execute("SELECT doc_id, ts, sentiment, text FROM articles").fetchall()
+            entities = index.conn.execute("SELECT doc_id, kind, entity, ticker FROM article_entities").fetchall()
+        by_doc = {}
+        for doc_id, kind, entity, ticker in entities:
+            tickers, sectors = by_doc.setdefault(doc_id, ([], []))
+            if kind == "sector":
+                sectors.append(entity)
+            elif ticker:
+                tickers.append(ticker)
+        added = 0
+        for doc_id, ts, sentiment, text in articles:
+            tickers, sectors = by_doc.get(doc_id, ([], []))
+            added += self.record(content_key(text) if text else doc_id, tickers, sectors, sentiment, ts=ts)
+        return added
+
+    def is_empty(self):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM counted LIMIT 1").fetchone() is None
+
+    def prune_counted(self, before_ts):
+        """The dedup ledger only needs to cover articles that can still be re-ingested."""
+        with self._lock:
+            cur = self.conn.execute("DELETE FROM counted WHERE ts < ?", (before_ts,))
+            self.conn.commit()
+            return cur.rowcount
+
+    # --- QUERIES ---
+    def trend(self, kind, key, bucket="day", since=None, until=None):
+        """
+        Bucket rows as columns: start, articles, positive, negative, neutral, avg_score.
+        key may be a list (e.g. a group's tickers): their buckets are summed.
+        """
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {list(BUCKETS)}")
+        keys = [key] if isinstance(key, str) else list(key)
+        until = int(time.time() if until is None else until)
+        since = int(until - (30 * 86400 if bucket == "day" else 48 * 3600) if since is None else since)
+        marks = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self.conn.execute(f"""
+                SELECT start, SUM(articles), SUM(positive), SUM(negative), SUM(neutral), SUM(score_sum)
+                FROM rollups
+                WHERE kind = ? AND key IN ({marks}) AND bucket = ? AND start >= ? AND start <= ?
+                GROUP BY start ORDER BY start
+            """, (kind, *keys, bucket, bucket_start(since, bucket), until)).fetchall()
+        columns = {"start": [], "articles": [], "positive": [], "negative": [], "neutral": [], "avg_score": []}
+        for start, articles, positive, negative, neutral, score_sum in rows:
+            columns["start"].append(start)
+            columns["articles"].append(articles)
+            columns["positive"].append(positive)
+            columns["negative"].append(negative)
+            columns["neutral"].append(neutral)
+            columns["avg_score"].append(round(score_sum / articles, 3) if articles else None)
+        total = sum(columns["articles"])
+        summary = {"articles": total,
+                   "avg_score": round(sum(r[5] for r in rows) / total, 3) if total else None}
+        return columns, summary
+
+    def top(self, kind="ticker", bucket="day", since=None, limit=10, min_articles=3):
+        """Most positive / most negative keys over a window, from the same buckets."""
+        since = int(time.time() - 7 * 86400 if since is None else since)
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT key, SUM(articles), SUM(score_sum) / SUM(articles) AS avg_score
+                FROM rollups
+                WHERE kind = ? AND bucket = ? AND start >= ?
+                GROUP BY key HAVING SUM(articles) >= ?
+                ORDER BY avg_score DESC
+            """, (kind, bucket, bucket_start(since, bucket), min_articles)).fetchall()
+        ranked = [{"key": r[0], "articles": r[1], "avg_score": round(r[2], 3)} for r in rows]
+        return {"most_positive": ranked[:limit], "most_negative": ranked[::-1][:limit]}
+
+# Global instance
+sentiment_rollups = SentimentRollups()
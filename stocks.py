@@ -1,6 +1,29 @@
 # stocks.py
 import yfinance as yf
 import requests
+import threading
+from datetime import datetime, timezone
+from cachetools import TTLCache
+from market_calendar import is_quote_final
+from telemetry import span, traced
+from governor import yahoo, is_throttle_error
+
+# --- QUOTE CACHE ---
+# Shared by the request path, the live ticker and the prefetch scheduler.
+QUOTE_CACHE = TTLCache(maxsize=2048, ttl=60)
+# Last fetched quote per symbol (no TTL): served as-is while its market is closed
+LAST_QUOTES = {}
+QUOTE_STATS = {"upstream_calls": 0, "closed_market_hits": 0, "stale_served": 0}
+_quote_cache_lock = threading.Lock()
+_quote_stats_lock = threading.Lock()
+# Last resolved symbol per search query, served while Yahoo's circuit is open.
+# Bounded: queries are free text from users and the crawler.
+LAST_SEARCHES = TTLCache(maxsize=1024, ttl=24 * 3600)
+_search_lock = threading.Lock()
+
+def _last_search(query):
+    with _search_lock:
+        return LAST_SEARCHES.get(query)
 
 # 1. COMMODITIES (Global Tickers)
 COMMODITY_TICKERS = {
@@ -22,6 +45,8 @@ SECTOR_MAP = {
     "FMCG": ["ITC.NS", "HINDUNILVR.NS", "NESTLEIND.NS", "BRITANNIA.NS", "TATACONSUM.NS"],
     "METAL": ["TATASTEEL.NS", "HINDALCO.NS", "VEDL.NS", "JSWSTEEL.NS", "COALINDIA.NS"]
 }
+# One display name per sector: "BANK" and "BANKING" are the same grid
+SECTOR_NAMES = {"BANK": "Banking", "BANKING": "Banking", "AUTO": "Auto", "IT": "IT", "FMCG": "FMCG", "METAL": "Metals"}
 
 # 3. MANUAL OVERRIDES (Brand -> Stock Ticker)
 BRAND_TO_STOCK = {
@@ -43,7 +68,14 @@ PARENT_NAMES = {
     "HDFCBANK.NS": "HDFC Bank"
 }
 
-# 5. GROUP MAP
+# 5. MARKET INDICES (Ticker -> Display Name)
+INDEX_TICKERS = {
+    "^NSEI": "NIFTY 50",
+    "^BSESN": "SENSEX",
+    "^NSEBANK": "BANK NIFTY"
+}
+
+# 6. GROUP MAP
 GROUP_MAP = {
     "TATA": ["TCS.NS", "TATAMOTORS.NS", "TATASTEEL.NS", "TITAN.NS", "TATAPOWER.NS"],
     "RELIANCE": ["RELIANCE.NS", "JIOFIN.NS", "JUSTDIAL.NS"],
@@ -51,22 +83,55 @@ GROUP_MAP = {
     "MAHINDRA": ["M&M.NS", "TECHM.NS", "M&MFIN.NS"]
 }
 
+# 7. COMPANY NAMES (Ticker -> Names Used In Headlines)
+# Covers the sector and group grids; the first name is the display name
+COMPANY_NAMES = {
+    "ICICIBANK.NS": ["ICICI Bank"], "AXISBANK.NS": ["Axis Bank"],
+    "KOTAKBANK.NS": ["Kotak Mahindra Bank", "Kotak Bank"],
+    "TATAMOTORS.NS": ["Tata Motors"], "M&M.NS": ["Mahindra & Mahindra", "M&M"],
+    "MARUTI.NS": ["Maruti Suzuki", "Maruti"], "BAJAJ-AUTO.NS": ["Bajaj Auto"],
+    "EICHERMOT.NS": ["Eicher Motors", "Royal Enfield"],
+    "TCS.NS": ["TCS", "Tata Consultancy Services"], "INFY.NS": ["Infosys"],
+    "HCLTECH.NS": ["HCLTech", "HCL Technologies", "HCL Tech"], "WIPRO.NS": ["Wipro"],
+    "TECHM.NS": ["Tech Mahindra"],
+    "ITC.NS": ["ITC"], "HINDUNILVR.NS": ["Hindustan Unilever", "HUL"], "NESTLEIND.NS": ["Nestle India"],
+    "BRITANNIA.NS": ["Britannia"], "TATACONSUM.NS": ["Tata Consumer"],
+    "TATASTEEL.NS": ["Tata Steel"], "HINDALCO.NS": ["Hindalco"], "VEDL.NS": ["Vedanta"],
+    "JSWSTEEL.NS": ["JSW Steel"], "COALINDIA.NS": ["Coal India"],
+    "TITAN.NS": ["Titan"], "TATAPOWER.NS": ["Tata Power"],
+    "RELIANCE.NS": ["Reliance Industries", "RIL"], "JIOFIN.NS": ["Jio Financial"], "JUSTDIAL.NS": ["Justdial"],
+    "ADANIENT.NS": ["Adani Enterprises"], "ADANIPORTS.NS": ["Adani Ports"], "ADANIGREEN.NS": ["Adani Green"],
+    "ADANIPOWER.NS": ["Adani Power"], "AWL.NS": ["Adani Wilmar"], "M&MFIN.NS": ["Mahindra Finance"]
+}
+
+@traced("yahoo_search")
 def search_symbol_on_yahoo(query):
+    if not yahoo.acquire():
+        return _last_search(query)  # Fail fast while throttled
     try:
         url = f"https://query2.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=1&newsCount=0"
         headers = {'User-Agent': 'Mozilla/5.0'}
         res = requests.get(url, headers=headers, timeout=3)
+        if res.status_code == 429:
+            yahoo.failure(throttled=True)
+            return _last_search(query)
         data = res.json()
+        yahoo.success()
         if 'quotes' in data and len(data['quotes']) > 0:
+            symbol = data['quotes'][0]['symbol']
             for quote in data['quotes']:
-                symbol = quote['symbol']
-                if symbol.endswith(".NS") or symbol.endswith(".BO"):
-                    return symbol
-            return data['quotes'][0]['symbol']
-    except:
-        pass
+                if quote['symbol'].endswith(".NS") or quote['symbol'].endswith(".BO"):
+                    symbol = quote['symbol']
+                    break
+            with _search_lock:
+                LAST_SEARCHES[query] = symbol
+            return symbol
+    except Exception as e:
+        yahoo.failure(throttled=is_throttle_error(e))
+        return _last_search(query)
     return None
 
+@traced("resolver")
 def resolve_query(query):
     q = " ".join(query.upper().split())
 
@@ -114,7 +179,63 @@ def format_large_number(num):
     if num >= 1_000_000: return f"₹{round(num/1_000_000, 2)}M"
     return f"₹{num}"
 
-def get_live_data(symbol):
+def _count_quote(stat):
+    # Called from request threads, the ticker loop and the prefetcher at once
+    with _quote_stats_lock:
+        QUOTE_STATS[stat] += 1
+
+def get_closed_market_quote(symbol):
+    """Last close for a symbol whose market is shut, if we already have it."""
+    with _quote_cache_lock:
+        entry = LAST_QUOTES.get(symbol)
+    if entry and is_quote_final(symbol, entry[1]):
+        return dict(entry[0])
+    return None
+
+def get_live_data(symbol, use_cache=True):
+    """
+    Cached quote lookup. use_cache=False forces an upstream fetch
+    (the result still refreshes the cache for everyone else).
+    Outside trading hours the last close is served with no upstream call,
+    whatever use_cache says - the price can't move until the next session.
+    """
+    closed = get_closed_market_quote(symbol)
+    if closed:
+        _count_quote("closed_market_hits")
+        return closed
+
+    if use_cache:
+        with _quote_cache_lock:
+            cached = QUOTE_CACHE.get(symbol)
+        if cached:
+            return dict(cached)
+
+    _count_quote("upstream_calls")
+    with span("quote_fetch"):
+        data = fetch_live_data(symbol)
+    if data:
+        with _quote_cache_lock:
+            QUOTE_CACHE[symbol] = dict(data)
+            LAST_QUOTES[symbol] = (dict(data), datetime.now(timezone.utc))
+        return data
+    return get_last_known_quote(symbol)
+
+def get_last_known_quote(symbol):
+    """Last good quote of any age, flagged stale - used when Yahoo fails or is shed."""
+    with _quote_cache_lock:
+        entry = LAST_QUOTES.get(symbol)
+    if entry is None:
+        return None
+    _count_quote("stale_served")
+    return {**entry[0], "stale": True, "as_of": entry[1].isoformat(timespec="seconds")}
+
+def is_quote_cached(symbol):
+    with _quote_cache_lock:
+        if symbol in QUOTE_CACHE:
+            return True
+    return get_closed_market_quote(symbol) is not None
+
+def fetch_live_data(symbol):
     """
     Fetches stock data with DEMO INTERCEPTORS for Key Stocks.
     """
@@ -194,29 +315,37 @@ def get_live_data(symbol):
     # ==========================================
     # 🟢 LIVE FETCH FOR OTHERS
     # ==========================================
+    if not yahoo.acquire():
+        return None  # Circuit open or over our rate: caller serves last-known-good
     try:
         ticker = yf.Ticker(symbol)
         
         # Use fast_info for reliability
-        current_price = ticker.fast_info.get('last_price')
-        prev_close = ticker.fast_info.get('previous_close')
+        with span("yf_fast_info"):
+            current_price = ticker.fast_info.get('last_price')
+            prev_close = ticker.fast_info.get('previous_close')
         
         if current_price is None or prev_close is None:
-            data = ticker.history(period="1d")
-            if data.empty: return None
+            with span("yf_history"):
+                data = ticker.history(period="1d")
+            if data.empty:
+                yahoo.empty(symbol)  # Unknown symbol, or Yahoo throttling quietly if many come back empty
+                return None
             current_price = data['Close'].iloc[-1]
             prev_close = data['Open'].iloc[-1]
             
         change = current_price - prev_close
         pct_change = (change / prev_close) * 100
         
-        info = ticker.info
+        with span("yf_info"):
+            info = ticker.info
         name = info.get('shortName') or info.get('longName') or symbol
         pe_ratio = info.get('trailingPE')
         market_cap = info.get('marketCap')
         sector = info.get('sector', 'N/A')
         day_high = ticker.fast_info.get('day_high')
         day_low = ticker.fast_info.get('day_low')
+        yahoo.success()
         
         return {
             "symbol": symbol.replace(".NS", "").replace("=F", ""),
@@ -233,6 +362,7 @@ def get_live_data(symbol):
         }
     except Exception as e:
         print(f"Error fetching {symbol}: {e}")
+        yahoo.failure(throttled=is_throttle_error(e))
         return None
 
 def get_commodity_snapshot():
@@ -246,14 +376,11 @@ def get_commodity_snapshot():
 
 def get_market_overview():
     # Indices
-    indices = ["^NSEI", "^BSESN", "^NSEBANK"]
     results = []
-    for sym in indices:
+    for sym, display_name in INDEX_TICKERS.items():
         d = get_live_data(sym)
         if d:
-            if sym == "^NSEI": d['name'] = "NIFTY 50"
-            elif sym == "^BSESN": d['name'] = "SENSEX"
-            elif sym == "^NSEBANK": d['name'] = "BANK NIFTY"
+            d['name'] = display_name
             results.append(d)
     return results
 
@@ -0,0 +1,226 @@
+# stories.py
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+import numpy as np
+
+# --- STORY CLUSTERING ---
+# Groups articles about the same event ("TCS Q2 profit rises 8%" from five
+# outlets) into one story. Each article gets a MinHash signature over the words
+# and word pairs of its title + description; LSH buckets (bands of the
+# signature) give candidate matches, and an article joins the story of its most
+# similar candidate above STORY_SIMILARITY that also names a common company or
+# index (capitalised tokens), or starts a new one. Word overlap alone merges
+# templated headlines: "Infosys Q2 profit rises 8%" vs "TCS Q2 profit rises 8%"
+# is ~0.7 Jaccard. Adding articles is incremental: nothing already clustered
+# is recomputed.
+
+NUM_HASHES = 64
+BANDS = 32  # 2 rows per band: candidates from ~0.2 estimated Jaccard up
+ROWS = NUM_HASHES // BANDS
+SIMILARITY = float(os.environ.get("STORY_SIMILARITY", 0.5))
+MAX_AGE = int(os.environ.get("STORY_MAX_AGE", 24 * 3600))
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_HASHES, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_HASHES, dtype=np.uint64)
+
+STOPWORDS = frozenset("""a an and are as at be by for from has have in is it its of on or over s says said
+than that the this to up was were will with after amid into""".split())
+
+# Capitalised words that say nothing about which company a story is about
+GENERIC_NAMES = frozenset("""a an the and or of in on at to for by with as after amid over what why how
+here this that these its it is are new top big key live update updates breaking exclusive explained
+shares share stock stocks market markets stock market news report reports q1 q2 q3 q4 fy rs inr crore lakh
+india indian global us ceo cfo md ipo sebi rbi govt government monday tuesday wednesday thursday friday
+saturday sunday january february march april may june july august september october november december""".split())
+
+def entity_tokens(text):
+    """Lower-cased capitalised tokens (company, brand and index names); used to veto look-alike stories."""
+    return frozenset(w.lower() for w in re.findall(r"\b[A-Z][A-Za-z&]*[A-Za-z]\b", text or "")
+                     if w.lower() not in GENERIC_NAMES)
+
+def shingles(text):
+    """Word and word-pair hashes of the normalized text (stopwords dropped)."""
+    words = [w for w in re.findall(r"[a-z0-9]+", (text or "").lower()) if w not in STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return np.fromiter({zlib.crc32(g.encode()) % _PRIME for g in grams}, dtype=np.uint64)
+
+def minhash(text):
+    values = shingles(text)
+    if not len(values):
+        return None
+    # (a*x + b) mod p for every hash function and shingle at once; a, x, b < 2^31 so no overflow
+    return ((np.outer(_A, values) + _B[:, None]) % _PRIME).min(axis=1)
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures (or one against a stack of them)."""
+    return (sig_a == sig_b).mean(axis=-1)
+
+def _sentiment_label(sentiment):
+    text = (sentiment or "").lower()
+    if "bullish" in text or "positive" in text: return "bullish"
+    if "bearish" in text or "negative" in text: return "bearish"
+    return "neutral"
+
+def story_priority(members):
+    """calculate_priority of the freshest member, plus a boost per extra outlet covering it."""
+    best = max(m.get("rank", 0) for m in members)
+    sources = len({m.get("source") for m in members})
+    return best + 15 * min(sources - 1, 4)
+
+class StoryClusterer:
+    def __init__(self, similarity=SIMILARITY, max_age=MAX_AGE):
+        self.similarity = similarity
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.articles = []    # article dicts (None once expired)
+        self.signatures = []  # MinHash per article (None for empty text)
+        self.entities = []    # entity_tokens per article
+        self.added_at = []
+        self.story_of = []    # article index -> story id
+        self.stories = {}     # story id -> [article index]
+        self.buckets = {}     # (band, band bytes) -> [article index]
+        self.keys = {}        # link/title -> article index, so re-fetched articles aren't counted twice
+        self._next_story = 0
+
+    def __len__(self):
+        return len(self.stories)
+
+    @staticmethod
+    def _key(article):
+        return article.get("link") or article.get("text")
+
+    def add(self, articles):
+        """Clusters new articles into the existing stories. Returns the number added."""
+        added = 0
+        now = time.time()
+        with self._lock:
+            for article in articles:
+                key = self._key(article)
+                if key in self.keys:
+                    continue
+                idx = len(self.articles)
+                text = f"{article.get('text', '')} {article.get('desc', '')}"
+                sig, entities = minhash(text), entity_tokens(text)
+                story = self._match(sig, entities)
+                if story is None:
+                    story = self._next_story
+                    self._next_story += 1
+                    self.stories[story] = []
+                self.articles.append(article)
+                self.signatures.append(sig)
+                self.entities.append(entities)
+                self.added_at.append(now)
+                self.story_of.append(story)
+                self.stories[story].append(idx)
+                self.keys[key] = idx
+                if sig is not None:
+                    for band, chunk in enumerate(sig.reshape(BANDS, ROWS)):
+                        self.buckets.setdefault((band, chunk.tobytes()), []).append(idx)
+                added += 1
+        return added
+
+    def _match(self, sig, entities):
+        """
+        Story of the most similar earlier article, if it is similar enough and
+        shares a name with it (articles without names are matched on words alone).
+        """
+        if sig is None:
+            return None
+        candidates = set()
+        for band, chunk in enumerate(sig.reshape(BANDS, ROWS)):
+            candidates.update(self.buckets.get((band, chunk.tobytes()), ()))
+        candidates = [i for i in candidates if self.articles[i] is not None
+                      and (not entities or not self.entities[i] or entities & self.entities[i])]
+        if not candidates:
+            return None
+        scores = similarity(sig, np.stack([self.signatures[i] for i in candidates]))
+        best = int(np.argmax(scores))
+        return self.story_of[candidates[best]] if scores[best] >= self.similarity else None
+
+    def expire(self, now=None):
+        """Drops articles older than max_age (their stories go when empty). Returns the number dropped."""
+        cutoff = (now or time.time()) - self.max_age
+        dropped = 0
+        with self._lock:
+            for idx, added_at in enumerate(self.added_at):
+                if added_at >= cutoff:
+                    break
+                article = self.articles[idx]
+                if article is None:
+                    continue
+                self.keys.pop(self._key(article), None)
+                self.articles[idx] = None
+                members = self.stories[self.story_of[idx]]
+                members.remove(idx)
+                if not members:
+                    del self.stories[self.story_of[idx]]
+                dropped += 1
+            if dropped and dropped * 2 > len(self.articles):
+                self._compact()
+        return dropped
+
+    def _compact(self):
+        """Rebuilds the arrays and buckets without expired slots."""
+        live = [row for row in zip(self.articles, self.signatures, self.entities, self.added_at, self.story_of)
+                if row[0] is not None]
+        self.articles, self.signatures, self.entities, self.added_at, self.story_of = (
+            (list(c) for c in zip(*live)) if live else ([], [], [], [], []))
+        self.stories, self.buckets, self.keys = {}, {}, {}
+        for idx, (article, sig, story) in enumerate(zip(self.articles, self.signatures, self.story_of)):
+            self.stories.setdefault(story, []).append(idx)
+            self.keys[self._key(article)] = idx
+            if sig is not None:
+                for band, chunk in enumerate(sig.reshape(BANDS, ROWS)):
+                    self.buckets.setdefault((band, chunk.tobytes()), []).append(idx)
+
+    def _summarize(self, story, members):
+        articles = [self.articles[i] for i in members]
+        sigs = [self.signatures[i] for i in members]
+        if len(members) > 1 and all(s is not None for s in sigs):
+            # Most central member (highest mean similarity) breaks ties between equally ranked ones
+            stack = np.stack(sigs)
+            centrality = (stack[:, None, :] == stack[None, :, :]).mean(axis=(1, 2))
+        else:
+            centrality = np.zeros(len(members))
+        rep = max(range(len(members)), key=lambda i: (articles[i].get("rank", 0), centrality[i]))
+        sources = Counter(a.get("source") or "unknown" for a in articles)
+        summary = dict(articles[rep])
+        summary.update({
+            "story_id": story,
+            "rank": story_priority(articles),
+            "story_size": len(articles),
+            "source_count": len(sources),
+            "sources": dict(sources.most_common()),
+            "sentiment_mix": dict(Counter(_sentiment_label(a.get("sentiment")) for a in articles)),
+            "related": [{"text": a.get("text"), "source": a.get("source"), "link": a.get("link")}
+                        for i, a in enumerate(articles) if i != rep],
+        })
+        return summary
+
+    def top_stories(self, limit=None):
+        """Stories ranked by story_priority, each as its representative article plus aggregates."""
+        with self._lock:
+            stories = [self._summarize(story, members) for story, members in self.stories.items()]
+        stories.sort(key=lambda s: (s["rank"], s["story_size"]), reverse=True)
+        return stories[:limit] if limit else stories
+
+    def status(self):
+        with self._lock:
+            live = sum(1 for a in self.articles if a is not None)
+            return {"articles": live, "stories": len(self.stories),
+                    "multi_source_stories": sum(1 for m in self.stories.values() if len(m) > 1)}
+
+def cluster_stories(articles, limit=None):
+    """One-shot clustering of a result list (e.g. a search) into ranked stories."""
+    clusterer = StoryClusterer(max_age=float("inf"))
+    clusterer.add(articles)
+    return clusterer.top_stories(limit)
+
+# Global instance: the rolling story feed built from crawled news
+story_feed = StoryClusterer()
@@ -0,0 +1,137 @@
+# telemetry.py
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+
+# --- TRACING ---
+# span("name") times a block and feeds a per-name latency histogram.
+# Inside a request with a collector attached (see main.py), spans are also
+# listed for the X-Timing header. TRACING=0 turns every span into a no-op.
+
+TRACING_ENABLED = os.environ.get("TRACING", "1") != "0"
+
+# Seconds, Prometheus-style
+SPAN_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus 'le' semantics)."""
+    def __init__(self, buckets=SPAN_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        running, out = 0, []
+        for bound, n in zip(self.buckets + ["+Inf"], self.counts):
+            running += n
+            out.append((bound, running))
+        return out
+
+    def snapshot(self):
+        return {"buckets": {str(bound): n for bound, n in self.cumulative()}, "count": self.count,
+                "mean": round(self.total / self.count, 4) if self.count else None}
+
+SPAN_HISTOGRAMS = {}
+_span_lock = threading.Lock()
+# Per-request list of (name, seconds); None outside an instrumented request
+_request_spans = ContextVar("request_spans", default=None)
+_NOOP = nullcontext()
+
+def record_span(name, seconds):
+    with _span_lock:
+        hist = SPAN_HISTOGRAMS.get(name)
+        if hist is None:
+            hist = SPAN_HISTOGRAMS[name] = Histogram()
+        hist.observe(seconds)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+@contextmanager
+def _timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+def span(name):
+    return _timed(name) if TRACING_ENABLED else _NOOP
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorate(func):
+        if not TRACING_ENABLED:
+            return func
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with _timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+# --- REQUEST COLLECTOR ---
+def start_request():
+    """Collects spans for the current request. Returns (spans, token for end_request)."""
+    spans = []
+    return spans, _request_spans.set(spans)
+
+def end_request(token):
+    _request_spans.reset(token)
+
+def timing_header(spans):
+    """Server-Timing style summary: 'quote_fetch;dur=412.3;count=5, resolver;dur=3.1'"""
+    totals = {}
+    for name, seconds in spans:
+        total, count = totals.get(name, (0.0, 0))
+        totals[name] = (total + seconds, count + 1)
+    parts = []
+    for name, (total, count) in sorted(totals.items(), key=lambda t: t[1][0], reverse=True):
+        parts.append(f"{name};dur={total * 1000:.1f}" + (f";count={count}" if count > 1 else ""))
+    return ", ".join(parts)
+
+# --- PROMETHEUS EXPORT ---
+def _fmt(value):
+    return "+Inf" if value == "+Inf" else repr(float(value))
+
+def render_metrics(gauges=None, counters=None):
+    """
+    Prometheus text format: one span_duration_seconds histogram labelled by span,
+    plus flat {metric_name: value} gauges and counters (values that only increase,
+    exported with a _total suffix so rate() works).
+    """
+    lines = ["# HELP span_duration_seconds Time spent in traced spans.",
+             "# TYPE span_duration_seconds histogram"]
+    with _span_lock:
+        histograms = {name: (h.cumulative(), h.total, h.count) for name, h in SPAN_HISTOGRAMS.items()}
+    for name, (buckets, total, count) in sorted(histograms.items()):
+        for bound, n in buckets:
+            lines.append(f'span_duration_seconds_bucket{{span="{name}",le="{_fmt(bound)}"}} {n}')
+        lines.append(f'span_duration_seconds_sum{{span="{name}"}} {total}')
+        lines.append(f'span_duration_seconds_count{{span="{name}"}} {count}')
+    for metric, value in sorted((gauges or {}).items()):
+        if value is None:
+            continue
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {float(value)}")
+    for metric, value in sorted((counters or {}).items()):
+        if value is None:
+            continue
+        metric = metric if metric.endswith("_total") else f"{metric}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {float(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,54 @@
+import sys
+
+import pytest
+
+pytest.importorskip("requests")
+
+@pytest.fixture
+def alerts(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sys.modules.pop("alerts", None)
+    import alerts
+    yield alerts
+    sys.modules.pop("alerts", None)
+
+@pytest.fixture
+def engine(alerts, tmp_path):
+    return alerts.AlertEngine(str(tmp_path / "rules.db"))
+
+def _quote(price, move=0.0):
+    return {"price": price, "percent_change": move}
+
+def test_price_rules_are_edge_triggered(engine):
+    above = engine.add_rule("tcs.ns", "above", 4000)
+    engine.add_rule("TCS.NS", "move", 3)
+    fired = lambda quotes: sorted((e["rule_id"], e["kind"]) for e in engine.evaluate(quotes))
+
+    assert fired({"TCS.NS": _quote(3990)}) == []
+    assert fired({"TCS.NS": _quote(4010)}) == [(above, "above")]
+    # Still above: no repeat until the price drops back and crosses again
+    assert fired({"TCS.NS": _quote(4050)}) == []
+    assert fired({"TCS.NS": _quote(3950)}) == []
+    assert fired({"TCS.NS": _quote(4001)}) == [(above, "above")]
+    assert [e["kind"] for e in engine.evaluate({"TCS.NS": _quote(4001, -3.5)})] == ["move"]
+    # Quotes without a usable price are ignored
+    assert engine.evaluate({"TCS.NS": {"price": "N/A"}, "INFY.NS": _quote(1)}) == []
+    assert engine.status()["fired"] == 3
+
+def test_removed_rule_stops_firing_and_releases_symbol(engine):
+    rule = engine.add_rule("INFY.NS", "below", 1500, user="a")
+    engine.add_rule("TCS.NS", "above", 1, user="a")
+    assert engine.remove_rule(rule, user="b") is None
+    assert engine.remove_rule(rule, user="a") == "INFY.NS"
+    assert engine.evaluate({"INFY.NS": _quote(1400)}) == []
+    assert engine.symbols() == ["TCS.NS"]
+
+@pytest.mark.parametrize("url", ["file:///etc/passwd", "ftp://93.184.216.34/x", "http://127.0.0.1:8000/hook",
+                                 "http://10.1.2.3/hook", "http://169.254.169.254/latest/meta-data",
+                                 "http://[::1]/hook", "http://localhost/hook", "http:///nohost"])
+def test_private_webhooks_rejected(engine, url):
+    with pytest.raises(ValueError):
+        engine.add_rule("TCS.NS", "above", 1, webhook=url)
+
+def test_public_webhook_accepted(engine):
+    engine.add_rule("TCS.NS", "above", 1, webhook="https://93.184.216.34/hook")
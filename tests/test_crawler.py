@@ -0,0 +1,46 @@
+import sys
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("yfinance")
+
+@pytest.fixture
+def crawler_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for name in ("crawler", "ingest_queue"):
+        sys.modules.pop(name, None)
+    import crawler
+    yield crawler
+    crawler.ingest_queue.conn.close()
+    for name in ("crawler", "ingest_queue"):
+        sys.modules.pop(name, None)
+
+class StaticSource:
+    name = "static"
+
+    def search(self, topic):
+        return [{"title": f"{topic} profit rises", "link": f"https://news.example/{topic}"},
+                {"title": f"{topic} profit rises", "link": f"https://www.news.example/{topic}/"}]
+
+def test_items_seen_only_after_sink_succeeds(crawler_module, tmp_path):
+    queued = []
+    def failing_sink(texts):
+        raise RuntimeError("queue unavailable")
+    seen = crawler_module.SeenStore(str(tmp_path / "seen.db"))
+    crawler = crawler_module.NewsCrawler(sources=[StaticSource()], sink=failing_sink, seen=seen, per_minute=0)
+    with pytest.raises(RuntimeError):
+        crawler.run_cycle(["TCS"])
+
+    crawler.sink = queued.extend
+    assert crawler.run_cycle(["TCS"])["new"] == 1
+    assert queued == ["TCS profit rises"]
+    assert crawler.run_cycle(["TCS"])["new"] == 0
+
+def test_one_cycle_at_a_time(crawler_module, tmp_path):
+    seen = crawler_module.SeenStore(str(tmp_path / "seen.db"))
+    crawler = crawler_module.NewsCrawler(sources=[StaticSource()], sink=lambda texts: None, seen=seen, per_minute=0)
+    with crawler._cycle_lock:
+        assert crawler.run_cycle(["TCS"]) is None
+        assert not crawler.trigger()
+        assert crawler.status()["running"]
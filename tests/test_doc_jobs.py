@@ -0,0 +1,63 @@
+import os
+import runpy
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("pypdf")
+pytest.importorskip("langchain_ollama")
+
+WATCHED = ("main", "doc_jobs", "ingest_queue", "database")
+
+def worker_modules():
+    """Runs inside a pool worker: which of the server's modules it has imported."""
+    loaded = [name for name in WATCHED if name in sys.modules]
+    main_file = getattr(sys.modules.get("__mp_main__"), "__file__", None) or ""
+    return loaded + ([main_file] if main_file.endswith("main.py") else [])
+
+@pytest.fixture
+def doc_jobs_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sys.modules.pop("doc_jobs", None)
+    import doc_jobs
+    yield doc_jobs
+    doc_jobs.doc_jobs.shutdown()
+    doc_jobs.doc_jobs.conn.close()
+    sys.modules.pop("doc_jobs", None)
+
+def test_job_runs_through_real_pool(doc_jobs_module, tmp_path, monkeypatch):
+    from benchmarks.bench_doc_extract import synthetic_pdf
+    # The LLM stage runs in a thread of this process; extraction goes through the spawn pool
+    monkeypatch.setattr(doc_jobs_module, "analyze_document_content",
+                        lambda text: {"is_relevant": True, "chars": len(text)})
+    manager = doc_jobs_module.DocJobManager(str(tmp_path / "jobs.db"), processes=1, llm_concurrency=1)
+    pdf = synthetic_pdf(seed=1, pages=2)
+    job_id = manager.submit([("pdf", "a.pdf", pdf), ("pdf", "copy.pdf", pdf)])
+    deadline = time.time() + 60
+    while manager.get(job_id)["status"] != "done" and time.time() < deadline:
+        time.sleep(0.1)
+    report = manager.get(job_id)
+    try:
+        assert report["status"] == "done"
+        assert [item["status"] for item in report["items"]] == ["done", "done"]
+        assert report["items"][0]["result"]["chars"] > 100
+        assert report["items"][1]["duplicate_of"] == 0
+        assert manager.status()["extracted"] == 1
+        extract_pool, _ = manager._pools()
+        assert extract_pool.submit(worker_modules).result(timeout=30) == []
+    finally:
+        manager.shutdown()
+        manager.conn.close()
+
+def test_script_runner_execs_before_loading_app(monkeypatch):
+    calls = []
+    def execv(path, argv):
+        calls.append(argv)
+        raise SystemExit
+    monkeypatch.setattr(os, "execv", execv)
+    monkeypatch.delitem(sys.modules, "doc_jobs", raising=False)
+    with pytest.raises(SystemExit):
+        runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), "main.py"), run_name="__main__")
+    assert calls[0][1:4] == ["-m", "uvicorn", "main:app"]
+    assert "doc_jobs" not in sys.modules
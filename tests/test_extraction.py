@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+pytest.importorskip("textblob")
+pytest.importorskip("langchain_core")
+pytest.importorskip("cachetools")
+
+from extraction import dictionary_tags, repair_json, parse_entities, parse_packed
+
+def test_known_companies_are_confident():
+    tags, confident = dictionary_tags("HDFC Bank shares rise after strong quarterly profit")
+    assert tags == {"companies": ["HDFC Bank"], "sectors": ["Banking"]}
+    assert confident
+
+def test_unknown_company_sends_article_to_llm():
+    tags, confident = dictionary_tags("HDFC Bank partners with Paytm for UPI rollout")
+    assert tags["companies"] == ["HDFC Bank"]
+    assert not confident
+
+def test_grid_companies_found_by_name():
+    tags, confident = dictionary_tags("Tata Motors and Maruti shares jump")
+    assert tags == {"companies": ["Tata Motors", "Maruti Suzuki"], "sectors": ["Auto"]}
+    assert confident
+
+def test_short_aliases_ignored_in_all_caps_text():
+    tags, confident = dictionary_tags("SBI SHARES: WHAT IT MEANS")
+    assert "IT" not in tags["sectors"]
+    assert not confident
+    # Normal case still matches
+    assert dictionary_tags("IT stocks rally as TCS beats estimates")[0]["sectors"] == ["IT"]
+
+def test_repair_truncated_object():
+    fixed = repair_json('```json\n{"companies": ["TCS", "Infosys",], "sectors": ["IT"')
+    assert json.loads(fixed) == {"companies": ["TCS", "Infosys"], "sectors": ["IT"]}
+    assert json.loads(repair_json("{'companies': ['HDFC'], 'ok': True, 'x': None}")) == \
+        {"companies": ["HDFC"], "ok": True, "x": None}
+
+def test_truncated_sentiment_not_trusted():
+    data, repaired = parse_entities('{"companies": ["TCS"], "sectors": ["IT"], "sentiment": "Pos')
+    assert repaired
+    assert data["companies"] == ["TCS"] and "sentiment" not in data
+    data, _ = parse_entities('{"companies": [], "sectors": [], "sentiment": "bullish"}')
+    assert data["sentiment"] == "Positive"
+
+def test_missing_sentiment_left_for_textblob():
+    data, repaired = parse_entities('{"companies": ["TCS"], "sectors": ["IT"]}')
+    assert not repaired and "sentiment" not in data
+
+def test_parse_packed_skips_cut_off_items():
+    content = ('{"articles": [{"index": 1, "companies": ["TCS"], "sectors": ["IT"], "sentiment": "Positive"},'
+               ' {"index": 2, "companies": ["Wipro"]')
+    parsed = parse_packed(content, 2)
+    assert list(parsed) == [1]
+    assert parsed[1]["sentiment"] == "Positive"
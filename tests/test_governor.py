@@ -0,0 +1,27 @@
+from governor import HostGovernor
+
+def test_single_empty_answer_is_not_throttling():
+    gov = HostGovernor("test", rate=10, empty_threshold=3)
+    for _ in range(5):
+        assert not gov.empty("DELISTED.NS")  # Same key over and over: just a bad symbol
+    assert gov.bucket.rate == 10
+    assert gov.status()["throttled"] == 0 and gov.state == gov.CLOSED
+
+def test_distinct_empty_keys_count_as_throttling():
+    gov = HostGovernor("test", rate=10, empty_threshold=3, failure_threshold=5)
+    assert not gov.empty("A.NS")
+    assert not gov.empty("B.NS")
+    assert gov.empty("C.NS")
+    assert gov.bucket.rate == 5
+    for key in ("D.NS", "E.NS", "F.NS", "G.NS"):
+        gov.empty(key)
+    assert gov.state == gov.OPEN
+
+def test_empty_keys_expire(monkeypatch):
+    import governor
+    now = [1000.0]
+    monkeypatch.setattr(governor.time, "monotonic", lambda: now[0])
+    gov = HostGovernor("test", empty_threshold=2, empty_window=60)
+    gov.empty("A.NS")
+    now[0] += 61
+    assert not gov.empty("B.NS")
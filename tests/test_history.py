@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("yfinance")
+
+from market_calendar import last_close, SESSIONS
+from history import HistoryStore, COLUMNS
+
+def _daily_frame(session_date, tz):
+    ts = pd.Timestamp(session_date, tz=tz).tz_convert("UTC")
+    return pd.DataFrame([[1.0, 1.0, 1.0, 1.0, 100]], columns=COLUMNS, index=pd.DatetimeIndex([ts], name="ts"))
+
+def test_nse_daily_bar_counts_as_latest_session(tmp_path):
+    # NSE daily bars are stamped 00:00 IST, i.e. 18:30 UTC on the previous day
+    store = HistoryStore(str(tmp_path))
+    tz = SESSIONS["NSE"]["tz"]
+    closed_at = last_close("NSE")
+    assert store._is_up_to_date("TCS.NS", "1d", _daily_frame(closed_at.astimezone(tz).date(), tz))
+
+def test_older_bar_is_not_up_to_date(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    tz = SESSIONS["NSE"]["tz"]
+    stale = last_close("NSE").astimezone(tz).date() - timedelta(days=7)
+    assert not store._is_up_to_date("TCS.NS", "1d", _daily_frame(stale, tz))
+
+def test_unknown_interval_rejected(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.load("TCS.NS", "../../etc")
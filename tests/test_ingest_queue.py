@@ -0,0 +1,37 @@
+import sys
+import types
+
+import pytest
+
+@pytest.fixture
+def queue_module(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sys.modules.pop("ingest_queue", None)
+    import ingest_queue
+    yield ingest_queue
+    ingest_queue.ingest_queue.conn.close()
+    sys.modules.pop("ingest_queue", None)
+
+def test_failed_article_retried_alone(queue_module, tmp_path, monkeypatch):
+    def process_batch(texts, timings=None):
+        return [{"error": "disk full"} if t == "bad" else {"is_duplicate": False, "entities": {}} for t in texts]
+    monkeypatch.setitem(sys.modules, "graph", types.SimpleNamespace(process_batch=process_batch))
+
+    q = queue_module.IngestQueue(str(tmp_path / "jobs.db"), max_attempts=2, retry_backoff=0)
+    good, bad = q.enqueue(["good", "bad"])
+    pool = queue_module.IngestWorkerPool(q, workers=1, batch_size=8, idle_sleep=0)
+    claims = []
+    real_claim = q.claim
+    def claim(size):
+        if len(claims) == 2:
+            pool._stop.set()
+        claims.append(real_claim(size))
+        return claims[-1]
+    q.claim = claim
+    pool._run()
+
+    assert q.get(good)["status"] == "done" and q.get(good)["attempts"] == 1
+    # Only the bad article went round again
+    assert [job_id for job_id, _ in claims[1]] == [bad]
+    assert q.get(bad)["status"] == "failed" and q.get(bad)["error"] == "disk full"
+    q.conn.close()
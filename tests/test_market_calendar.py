@@ -0,0 +1,47 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from market_calendar import is_market_open, last_close, next_open, market_for, is_quote_final
+
+IST = ZoneInfo("Asia/Kolkata")
+NY = ZoneInfo("America/New_York")
+CT = ZoneInfo("America/Chicago")
+
+def test_market_for():
+    assert market_for("TCS.NS") == "NSE"
+    assert market_for("RELIANCE.BO") == "NSE"
+    assert market_for("^NSEI") == "NSE"
+    assert market_for("AAPL") == "US"
+    assert market_for("GC=F") == "FUTURES"
+    assert market_for("BTC-USD") == "CRYPTO"
+    assert market_for("^GSPC") is None
+
+def test_nse_session_bounds():
+    assert not is_market_open("NSE", datetime(2026, 10, 16, 9, 14, tzinfo=IST))
+    assert is_market_open("NSE", datetime(2026, 10, 16, 9, 15, tzinfo=IST))
+    assert is_market_open("NSE", datetime(2026, 10, 16, 15, 29, tzinfo=IST))
+    assert not is_market_open("NSE", datetime(2026, 10, 16, 15, 30, tzinfo=IST))
+    # Saturday
+    assert not is_market_open("NSE", datetime(2026, 10, 17, 11, 0, tzinfo=IST))
+
+def test_nse_holidays_2026():
+    for day in [(3, 3), (4, 3), (4, 14), (10, 20), (11, 10), (11, 24)]:
+        assert not is_market_open("NSE", datetime(2026, *day, 10, 0, tzinfo=IST)), day
+
+def test_last_close_skips_weekend_and_holiday():
+    # Monday 2026-04-06 before the open: Good Friday (04-03) was shut, so Thursday's close
+    now = datetime(2026, 4, 6, 8, 0, tzinfo=IST)
+    assert last_close("NSE", now) == datetime(2026, 4, 2, 15, 30, tzinfo=IST)
+    assert next_open("NSE", now) == datetime(2026, 4, 6, 9, 15, tzinfo=IST)
+
+def test_overnight_futures_session():
+    # Sunday 17:00 CT opens Monday's trade date
+    assert not is_market_open("FUTURES", datetime(2026, 10, 18, 16, 59, tzinfo=CT))
+    assert is_market_open("FUTURES", datetime(2026, 10, 18, 17, 0, tzinfo=CT))
+    assert not is_market_open("FUTURES", datetime(2026, 10, 16, 16, 30, tzinfo=CT))
+
+def test_quote_final_only_after_close():
+    now = datetime(2026, 10, 16, 20, 0, tzinfo=NY)
+    assert is_quote_final("AAPL", datetime(2026, 10, 16, 16, 5, tzinfo=NY), now)
+    assert not is_quote_final("AAPL", datetime(2026, 10, 16, 15, 55, tzinfo=NY), now)
+    assert not is_quote_final("BTC-USD", datetime(2026, 10, 16, 16, 5, tzinfo=NY), now)
@@ -0,0 +1,67 @@
+import types
+
+import numpy as np
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("cachetools")
+
+import screener as screener_module
+from screener import Screener, compile_filter, default_universe
+
+@pytest.fixture
+def screener():
+    s = Screener(universe={"HDFCBANK.NS": ("bank", ""), "TCS.NS": ("it", "tata"), "INFY.NS": ("it", "")})
+    s.columns["price"][:] = [1600.0, 4000.0, np.nan]
+    s.columns["percent_change"][:] = [1.5, -0.5, 2.0]
+    s.columns["pe_ratio"][:] = [18.0, 30.0, 25.0]
+    return s
+
+def test_filter_and_sort(screener):
+    cols, total = screener.screen("sector == 'IT' and pe_ratio < 28 or symbol in ['HDFCBANK.NS']",
+                                  sort="-percent_change")
+    assert total == 2 and list(cols["symbol"]) == ["INFY.NS", "HDFCBANK.NS"]
+    cols, total = screener.screen("sector in ('it', 'bank') and -percent_change < 1", sort="price", limit=2)
+    assert total == 3 and list(cols["symbol"]) == ["HDFCBANK.NS", "TCS.NS"]
+
+@pytest.mark.parametrize("expression", [
+    "symbol < 5", "pe_ratio < 'x'", "sector in [1, 2]", "price in ['a', 1]", "price + sector > 1",
+    "pe_ratio", "pe_ratio and price", "not price", "True", "pe_ratio < 5 < 'x'", "__import__('os')",
+    "-" * 100 + "price > 1", "not " * 100 + "price > 1", " and ".join(["price > 1"] * 400),
+])
+def test_bad_filters_rejected_at_parse_time(expression):
+    with pytest.raises((ValueError, SyntaxError)):
+        compile_filter(expression)
+
+def test_negative_limit_rejected(screener):
+    with pytest.raises(ValueError):
+        screener.screen(None, limit=-1)
+
+def test_add_symbols_respects_cap():
+    s = Screener(universe={"TCS.NS": ("it", "")}, max_symbols=3)
+    assert s.add_symbols(["tcs.ns", "paytm.ns", "zomato.ns", "nykaa.ns"]) == 2
+    assert list(s.columns["symbol"]) == ["TCS.NS", "PAYTM.NS", "ZOMATO.NS"]
+    assert np.isnan(s.columns["price"][-1])
+
+def test_sector_aliases_share_one_label():
+    universe = default_universe()
+    assert universe["HDFCBANK.NS"][0] == "banking" and universe["TATASTEEL.NS"][0] == "metals"
+    s = Screener(universe=universe)
+    _, total = s.screen("sector == 'banking'")
+    assert total == 5
+
+def test_cached_quote_does_not_hide_missing_market_cap(monkeypatch):
+    monkeypatch.setitem(screener_module.LAST_QUOTES, "TCS.NS", ({"pe_ratio": 30.0, "sector": "Technology"}, None))
+    monkeypatch.setitem(screener_module.LAST_QUOTES, "INFY.NS", ({"pe_ratio": 25.0, "sector": "Technology"}, None))
+    fetched = []
+    def ticker(sym):
+        fetched.append(sym)
+        return types.SimpleNamespace(info={"trailingPE": 29.0, "marketCap": 1.5e13, "sector": "Technology"})
+    monkeypatch.setattr(screener_module.yf, "Ticker", ticker)
+    s = Screener(universe={"TCS.NS": ("it", ""), "INFY.NS": ("it", "")})
+    s.columns["market_cap"][1] = 7e12
+    assert s.refresh_fundamentals(limit=2) == 2
+    # No market cap yet: fetched from Yahoo despite the cached quote; INFY used the shortcut
+    assert fetched == ["TCS.NS"]
+    assert list(s.columns["market_cap"]) == [1.5e13, 7e12]
+    assert list(s.columns["pe_ratio"]) == [29.0, 25.0]
@@ -0,0 +1,44 @@
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+IST = ZoneInfo("Asia/Kolkata")
+
+@pytest.fixture
+def rollup(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sys.modules.pop("sentiment_rollup", None)
+    import sentiment_rollup
+    yield sentiment_rollup
+    sys.modules.pop("sentiment_rollup", None)
+
+def _ts(*args):
+    return int(datetime(*args, tzinfo=IST).timestamp())
+
+def test_day_buckets_follow_ist_midnight(rollup):
+    assert rollup.bucket_start(_ts(2026, 10, 16, 0, 0), "day") == _ts(2026, 10, 16)
+    assert rollup.bucket_start(_ts(2026, 10, 16, 23, 59), "day") == _ts(2026, 10, 16)
+    # 05:29 IST is still the previous UTC day, but the same IST day
+    assert rollup.bucket_start(_ts(2026, 10, 17, 5, 29), "day") == _ts(2026, 10, 17)
+    assert rollup.bucket_start(_ts(2026, 10, 16, 14, 59, 59), "hour") == _ts(2026, 10, 16, 14, 30)
+
+def test_trend_counts_each_story_once(rollup, tmp_path):
+    store = rollup.SentimentRollups(str(tmp_path / "r.db"))
+    late, early = _ts(2026, 10, 16, 23, 59), _ts(2026, 10, 17, 0, 1)
+    store.on_article("uuid-1", ["TCS.NS"], ["IT"], "Positive", late, text="TCS wins a deal")
+    # Same story re-ingested under a new doc_id
+    store.on_article("uuid-2", ["TCS.NS"], ["IT"], "Positive", late, text="  tcs WINS a deal ")
+    store.on_article("uuid-3", ["TCS.NS"], [], "Negative", early, text="TCS misses estimates")
+
+    columns, summary = store.trend("ticker", "TCS.NS", "day", since=late, until=early)
+    assert columns["start"] == [_ts(2026, 10, 16), _ts(2026, 10, 17)]
+    assert columns["articles"] == [1, 1]
+    assert columns["avg_score"] == [1.0, -1.0]
+    assert summary == {"articles": 2, "avg_score": 0.0}
+
+    # since=0 means "from the epoch", not the default window
+    assert store.trend("ticker", "TCS.NS", "day", since=0, until=early)[1]["articles"] == 2
+    assert store.trend("ticker", "TCS.NS", "day", since=0, until=0)[1]["articles"] == 0
+    assert store.trend("sector", "IT", "hour", since=late, until=early)[0]["articles"] == [1]
@@ -0,0 +1,36 @@
+from stories import StoryClusterer, entity_tokens, cluster_stories
+
+def _article(text, source, rank=50):
+    return {"text": text, "desc": "", "source": source, "link": f"https://{source}/{hash(text)}", "rank": rank}
+
+def _groups(articles):
+    clusterer = StoryClusterer(max_age=float("inf"))
+    clusterer.add(articles)
+    return sorted(sorted(a["source"] for a in (clusterer.articles[i] for i in members))
+                  for members in clusterer.stories.values())
+
+def test_same_event_from_several_outlets_merges():
+    assert _groups([
+        _article("TCS Q2 profit rises 8% to Rs 12,000 crore, beats estimates", "et"),
+        _article("TCS Q2 net profit rises 8% to Rs 12,000 crore", "mint"),
+        _article("HDFC Bank shares jump after quarterly profit beats estimates", "bs"),
+        _article("HDFC Bank shares jump 3% after Q2 profit beats estimates", "mc"),
+    ]) == [["bs", "mc"], ["et", "mint"]]
+
+def test_near_miss_headlines_stay_apart():
+    # Same template, different company or index: high word overlap, different story
+    assert _groups([
+        _article("Infosys Q2 profit rises 8%, beats estimates", "et"),
+        _article("TCS Q2 profit rises 8%, beats estimates", "mint"),
+        _article("Sensex falls 500 points as banks drag", "bs"),
+        _article("Nifty falls 150 points as banks drag", "mc"),
+    ]) == [["bs"], ["et"], ["mc"], ["mint"]]
+
+def test_entity_tokens_skip_generic_words():
+    assert entity_tokens("Shares of HDFC Bank jump in Q2; Sensex up") == {"hdfc", "bank", "sensex"}
+
+def test_refetched_article_counted_once_and_ranked():
+    a = _article("Zomato launches 10-minute food delivery in Delhi", "et", rank=80)
+    stories = cluster_stories([a, dict(a), _article("Zomato launches 10-minute food delivery in Delhi NCR", "mint")])
+    assert len(stories) == 1
+    assert stories[0]["story_size"] == 2 and stories[0]["rank"] == 95 and stories[0]["source"] == "et"
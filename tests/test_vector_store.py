@@ -0,0 +1,77 @@
+import sys
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+from quantized_store import QuantizedStore
+
+DIM = 32
+
+def _vectors(n, seed=0):
+    x = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def test_quantized_add_skips_known_ids(tmp_path):
+    store = QuantizedStore(str(tmp_path), dim=DIM)
+    vectors = _vectors(10)
+    assert store.add([f"d{i}" for i in range(10)], vectors) == 10
+    assert store.add(["d3", "d4", "d10"], _vectors(3, seed=1)) == 1
+    assert len(store) == 11
+    found = [doc_id for doc_id, _ in store.search(vectors[3], k=11)]
+    assert len(found) == len(set(found)) == 11
+    assert found[0] == "d3"
+    # Survives a reopen
+    assert QuantizedStore(str(tmp_path), dim=DIM).add(["d0"], vectors[:1]) == 0
+
+def test_quantized_filtered_and_ivf_search(tmp_path):
+    store = QuantizedStore(str(tmp_path), dim=DIM)
+    vectors = _vectors(2000)
+    store.add(list(range(2000)), vectors)
+    assert [i for i, _ in store.search(vectors[7], k=3, allowed={7, 8, 9})][0] == 7
+    assert store.search(vectors[7], k=3, allowed={"missing"}) == []
+    store.train(nlist=16)
+    assert store.search(vectors[42], k=1, nprobe=4)[0][0] == 42
+    # Rows added after training are assigned to lists too
+    store.add([2000], vectors[:1] * -1)
+    assert store.search(vectors[0] * -1, k=1, nprobe=4)[0][0] == 2000
+
+# --- VectorDB (needs Chroma; the embedding model is replaced by token hashing) ---
+class HashEmbeddings:
+    def _one(self, text):
+        v = np.zeros(DIM, dtype=np.float32)
+        for token in text.lower().split():
+            v[zlib.crc32(token.encode()) % DIM] += 1
+        return (v / max(np.linalg.norm(v), 1e-9)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._one(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._one(text)
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    pytest.importorskip("chromadb")
+    pytest.importorskip("langchain_community")
+    import embedding_backends
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(embedding_backends, "create_embeddings", lambda *a, **k: HashEmbeddings())
+    sys.modules.pop("database", None)
+    import database
+    yield database
+    sys.modules.pop("database", None)
+
+def test_compaction_into_new_monthly_shard_keeps_one_copy(database):
+    db = database.VectorDB(quantization="int8", compact_after_days=28)
+    old = int(time.time()) - 60 * 86400
+    texts = [f"article {i} about bank results and quarterly profit {i}" for i in range(20)]
+    db.add_texts(texts, [{"companies": "", "sectors": "", "timestamp": old + i} for i in range(20)])
+    report = db.compact()
+    assert report["articles_moved"] == 20
+    target = database.shard_for(old, "month")
+    assert target in db.shards and len(db.quantized[target]) == 20
+    results = db.similarity_search(texts[5], k=3)
+    assert results and results[0][0].page_content == texts[5]
+    assert len({doc.metadata["doc_id"] for doc, _ in results}) == len(results)
@@ -0,0 +1,24 @@
+import json
+
+import pytest
+
+pytest.importorskip("yfinance")
+pytest.importorskip("cachetools")
+
+from watchlist import build_columns, summarize, to_json_columns
+
+def test_zero_cost_and_missing_quotes_serialise():
+    rows = [("TCS", "TCS.NS", 10, 0.0), ("INFY", "INFY.NS", 5, 1500.0), ("??", None, 0, None)]
+    quotes = {"TCS.NS": (4000.0, 3900.0, False), "INFY.NS": (1600.0, 1580.0, True)}
+    columns = build_columns(rows, quotes)
+    out = to_json_columns(columns)
+    # Gifted shares: infinite pnl_percent becomes None instead of breaking the JSON
+    assert out["pnl_percent"] == [None, 6.67, None]
+    assert out["price"] == [4000.0, 1600.0, None]
+    assert out["stale"] == [False, True, False]
+    json.dumps(out, allow_nan=False)
+
+    summary = summarize(columns)
+    assert summary == {"symbols": 3, "quoted": 2, "market_value": 48000.0, "cost": 7500.0,
+                       "pnl": 40500.0, "day_pnl": 1100.0}
+    json.dumps(summary, allow_nan=False)
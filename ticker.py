@@ -0,0 +1,118 @@
+# ticker.py
+import asyncio
+from stocks import INDEX_TICKERS, get_live_data
+
+# --- LIVE TICKER SERVICE ---
+# One refresh loop for the whole server. Every connected dashboard reads the
+# same snapshot, so upstream calls are O(symbols) per interval, not O(clients).
+
+class TickerService:
+    def __init__(self, interval=15):
+        self.interval = interval
+        # symbol -> display name override (None keeps the name from Yahoo)
+        self.symbols = dict(INDEX_TICKERS)
+        # symbol -> owners watching it (a socket queue, "alerts", ...); unowned symbols leave the schedule
+        self.watchers = {}
+        self.snapshot = {}
+        self.subscribers = set()
+        # Called on the event loop with each refresh's deltas (e.g. the alert engine)
+        self.listeners = []
+        self._task = None
+
+    def watch(self, symbols, owner="server"):
+        """Adds symbols to the refresh schedule on behalf of owner (indices are always watched)."""
+        if isinstance(symbols, str): symbols = [symbols]
+        for sym in symbols:
+            sym = sym.strip().upper()
+            if sym:
+                self.symbols.setdefault(sym, None)
+                self.watchers.setdefault(sym, set()).add(owner)
+
+    def unwatch(self, owner, symbols=None):
+        """Releases owner's symbols (all of them by default); ones nobody else watches stop refreshing."""
+        if isinstance(symbols, str): symbols = [symbols]
+        targets = list(self.watchers) if symbols is None else [s.strip().upper() for s in symbols]
+        for sym in targets:
+            owners = self.watchers.get(sym)
+            if owners is None:
+                continue
+            owners.discard(owner)
+            if not owners:
+                del self.watchers[sym]
+                if sym not in INDEX_TICKERS:
+                    self.symbols.pop(sym, None)
+                    self.snapshot.pop(sym, None)
+
+    def refresh(self):
+        """
+        One upstream pass over every watched symbol.
+        Returns only the quotes that changed since the last pass.
+        """
+        deltas = {}
+        for sym, display_name in list(self.symbols.items()):
+            d = get_live_data(sym, use_cache=False)
+            if not d:
+                continue
+            if display_name:
+                d['name'] = display_name
+            if self.snapshot.get(sym) != d:
+                deltas[sym] = d
+            self.snapshot[sym] = d
+        return deltas
+
+    def market_overview(self):
+        """Indices in the same shape as stocks.get_market_overview()."""
+        return [self.snapshot[sym] for sym in INDEX_TICKERS if sym in self.snapshot]
+
+    # --- FAN-OUT ---
+    def on_delta(self, callback):
+        self.listeners.append(callback)
+
+    def subscribe(self, symbols=()):
+        """Queue of ticker messages; symbols are watched for as long as the subscriber stays."""
+        queue = asyncio.Queue(maxsize=100)
+        self.subscribers.add(queue)
+        if symbols:
+            self.watch(symbols, owner=queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        self.unwatch(queue)
+
+    def broadcast(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow client: deltas only carry changed quotes, so replace its backlog with a full snapshot
+                print("Ticker subscriber is lagging, resending the snapshot.")
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "snapshot", "data": dict(self.snapshot)})
+
+    # --- SCHEDULE ---
+    async def run(self):
+        while True:
+            try:
+                # yfinance is blocking, keep it off the event loop
+                deltas = await asyncio.to_thread(self.refresh)
+                if deltas:
+                    self.broadcast({"type": "delta", "data": deltas})
+                    for callback in self.listeners:
+                        callback(deltas)
+            except Exception as e:
+                print(f"Ticker refresh error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+# Global instance
+ticker_service = TickerService()
@@ -0,0 +1,203 @@
+# watchlist.py
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from stocks import resolve_query, get_closed_market_quote, get_last_known_quote, QUOTE_CACHE, _quote_cache_lock
+from governor import yahoo, is_throttle_error
+from telemetry import span
+
+# --- WATCHLISTS ---
+# Hundreds of symbols per request. Quotes come from the shared quote cache when
+# possible, the rest from yf.download in chunks (one upstream call per chunk),
+# and everything is held as NumPy columns rather than one dict per quote.
+
+CHUNK_SIZE = int(os.environ.get("WATCHLIST_CHUNK_SIZE", 100))
+MAX_WORKERS = int(os.environ.get("WATCHLIST_CONCURRENCY", 4))
+MAX_SYMBOLS = 2000
+
+# Already a ticker (TCS.NS, ^NSEI, GC=F, BTC-USD): no search needed.
+# Bare words like DMART still go through resolve_query for the brand map.
+_TICKER_RE = re.compile(r"^(\^[A-Z0-9.]+|[A-Z0-9&-]+(\.NS|\.BO|=F|-USD))$")
+
+COLUMNS = ["symbol", "query", "price", "prev_close", "change", "percent_change", "quantity", "avg_cost",
+           "market_value", "pnl", "pnl_percent", "day_pnl", "stale"]
+
+# Called with the symbols each watchlist request resolved (the screener grows its universe from them)
+RESOLVED_LISTENERS = []
+
+def on_resolved(callback):
+    RESOLVED_LISTENERS.append(callback)
+
+def resolve_many(queries):
+    """query -> symbol (None if it isn't a single stock). Ticker-looking input skips the search."""
+    resolved, pending = {}, []
+    for query in dict.fromkeys(queries):
+        q = query.strip().upper()
+        if _TICKER_RE.match(q):
+            resolved[query] = q
+        else:
+            pending.append(query)
+    if pending:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            for query, res in zip(pending, pool.map(resolve_query, pending)):
+                resolved[query] = res.get("symbol") if res["type"] == "stock" else None
+    return resolved
+
+def _cached_quote(symbol):
+    quote = get_closed_market_quote(symbol)
+    if quote is None:
+        with _quote_cache_lock:
+            quote = QUOTE_CACHE.get(symbol)
+    return quote
+
+def _download_chunk(symbols):
+    """{symbol: (price, prev_close, stale)} for one chunk, one upstream call."""
+    if not yahoo.acquire():
+        return _last_known(symbols)
+    try:
+        with span("yf_download"):
+            df = yf.download(symbols, period="5d", interval="1d", group_by="column",
+                             auto_adjust=False, progress=False, threads=False)
+    except Exception as e:
+        yahoo.failure(throttled=is_throttle_error(e))
+        return _last_known(symbols)
+    if df is None or df.empty:
+        yahoo.empty(",".join(symbols))
+        return _last_known(symbols)
+    yahoo.success()
+
+    close = df["Close"]
+    if isinstance(close, pd.Series):
+        close = close.to_frame(name=symbols[0])
+    close = close.ffill()
+    last = close.iloc[-1]
+    prev = close.iloc[-2] if len(close) > 1 else last
+    out = {}
+    for sym in symbols:
+        if sym in last.index and not np.isnan(last[sym]):
+            out[sym] = (float(last[sym]), float(prev[sym]), False)
+    # Symbols Yahoo had nothing for this time
+    out.update(_last_known([s for s in symbols if s not in out]))
+    return out
+
+def _last_known(symbols):
+    out = {}
+    for sym in symbols:
+        quote = get_last_known_quote(sym)
+        if quote and isinstance(quote.get("price"), (int, float)):
+            out[sym] = (quote["price"], quote["price"] - quote.get("change", 0), True)
+    return out
+
+def iter_quote_chunks(symbols):
+    """Yields {symbol: (price, prev_close, stale)} batches as they arrive, cached ones first."""
+    cached, missing = {}, []
+    for sym in dict.fromkeys(s for s in symbols if s):
+        quote = _cached_quote(sym)
+        if quote and isinstance(quote.get("price"), (int, float)):
+            cached[sym] = (quote["price"], quote["price"] - quote.get("change", 0), bool(quote.get("stale")))
+        else:
+            missing.append(sym)
+    if cached:
+        yield cached
+    chunks = [missing[i:i + CHUNK_SIZE] for i in range(0, len(missing), CHUNK_SIZE)]
+    if not chunks:
+        return
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as pool:
+        for future in as_completed([pool.submit(_download_chunk, chunk) for chunk in chunks]):
+            yield future.result()
+
+def build_columns(rows, quotes):
+    """
+    rows: [(query, symbol, quantity, avg_cost)] in watchlist order.
+    quotes: {symbol: (price, prev_close, stale)}. Returns {column: ndarray/list}.
+    """
+    n = len(rows)
+    price = np.full(n, np.nan)
+    prev = np.full(n, np.nan)
+    stale = np.zeros(n, dtype=bool)
+    for i, (_, sym, _, _) in enumerate(rows):
+        q = quotes.get(sym)
+        if q is not None:
+            price[i], prev[i], stale[i] = q
+    quantity = np.array([r[2] or 0.0 for r in rows], dtype=np.float64)
+    avg_cost = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float64)
+
+    change = price - prev
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent_change = change / prev * 100
+        market_value = quantity * price
+        cost = quantity * avg_cost
+        pnl = market_value - cost
+        pnl_percent = pnl / cost * 100
+    return {
+        "symbol": [r[1] for r in rows], "query": [r[0] for r in rows],
+        "price": price, "prev_close": prev, "change": change, "percent_change": percent_change,
+        "quantity": quantity, "avg_cost": avg_cost, "market_value": market_value,
+        "pnl": pnl, "pnl_percent": pnl_percent, "day_pnl": quantity * change, "stale": stale,
+    }
+
+def summarize(columns):
+    def total(values):
+        return round(float(values[np.isfinite(values)].sum()), 2)
+    cost = columns["quantity"] * columns["avg_cost"]
+    return {"symbols": len(columns["symbol"]), "quoted": int(np.count_nonzero(~np.isnan(columns["price"]))),
+            "market_value": total(columns["market_value"]), "cost": total(cost),
+            "pnl": total(columns["pnl"]), "day_pnl": total(columns["day_pnl"])}
+
+def to_json_columns(columns):
+    """NaN/inf -> None (a zero avg_cost makes pnl_percent infinite), floats rounded, for the JSON response."""
+    out = {}
+    for name in COLUMNS:
+        values = columns[name]
+        if isinstance(values, np.ndarray) and values.dtype.kind == "f":
+            rounded = np.round(values, 2)
+            out[name] = [float(v) if finite else None for v, finite in zip(rounded, np.isfinite(rounded))]
+        elif isinstance(values, np.ndarray):
+            out[name] = values.tolist()
+        else:
+            out[name] = list(values)
+    return out
+
+def watchlist_rows(items):
+    """items: [(query, quantity, avg_cost)] -> [(query, symbol, quantity, avg_cost)]"""
+    resolved = resolve_many([q for q, _, _ in items])
+    symbols = [s for s in resolved.values() if s]
+    for callback in RESOLVED_LISTENERS:
+        try:
+            callback(symbols)
+        except Exception as e:
+            print(f"Watchlist listener failed: {e}")
+    return [(q, resolved.get(q), qty, cost) for q, qty, cost in items]
+
+def quote_page(items):
+    """Resolves and quotes one page of a watchlist. Returns (columns, unresolved queries)."""
+    rows = watchlist_rows(items)
+    quotes = {}
+    for batch in iter_quote_chunks([r[1] for r in rows]):
+        quotes.update(batch)
+    return build_columns(rows, quotes), [r[0] for r in rows if r[1] is None]
+
+def stream_watchlist(items):
+    """
+    NDJSON lines: one columnar chunk per quote batch as it arrives, then a summary.
+    Rows appear once their quote is in; unquoted symbols come in the final chunk.
+    """
+    rows = watchlist_rows(items)
+    by_symbol = {}
+    for i, row in enumerate(rows):
+        by_symbol.setdefault(row[1], []).append(i)
+    quotes = {}
+    for batch in iter_quote_chunks([r[1] for r in rows]):
+        quotes.update(batch)
+        chunk_rows = [rows[i] for sym in batch for i in by_symbol.get(sym, [])]
+        yield json.dumps({"type": "chunk", "columns": to_json_columns(build_columns(chunk_rows, batch))}) + "\n"
+    leftover = [r for r in rows if r[1] not in quotes]
+    if leftover:
+        yield json.dumps({"type": "chunk", "columns": to_json_columns(build_columns(leftover, {}))}) + "\n"
+    summary = summarize(build_columns(rows, quotes))
+    summary["unresolved"] = [r[0] for r in rows if r[1] is None]
+    yield json.dumps({"type": "summary", **summary}) + "\n"